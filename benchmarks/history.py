@@ -0,0 +1,76 @@
+import json
+import os
+import platform
+import subprocess
+
+from datetime import datetime
+
+
+def create_entry(results: dict) -> dict:
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def load_history(path: str) -> list:
+    if not os.path.isfile(path):
+        return []
+
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def append_to_history(path: str, entry: dict):
+    history = load_history(path)
+    history.append(entry)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(history, file, indent=2)
+
+
+def find_regressions(previous: dict, current: dict, tolerance: float, prefix: str = '') -> list:
+    """ Compares two (nested) result dicts and lists all numeric values that grew by more than the tolerance. """
+    regressions = []
+
+    for key, value in current.items():
+        if key not in previous:
+            continue
+
+        if isinstance(value, dict) and isinstance(previous[key], dict):
+            regressions += find_regressions(previous[key], value, tolerance, prefix=f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and isinstance(previous[key], (int, float)) and previous[key] > 0:
+            # all benchmarked values are costs (time, memory), hence, only an increase is a regression
+            if value > previous[key] * (1.0 + tolerance):
+                regressions.append(f"{prefix}{key}: {previous[key]} -> {value}")
+
+    return regressions
+
+
+def report_regressions(history_path: str, results: dict, tolerance: float) -> list:
+    history = load_history(history_path)
+
+    if len(history) == 0:
+        return []
+
+    regressions = find_regressions(history[-1]['results'], results, tolerance)
+
+    if len(regressions) > 0:
+        print(f"Warning: regressions (> {tolerance * 100:.0f} %) compared to {history[-1]['date']}:")
+        for regression in regressions:
+            print(f" - {regression}")
+
+    return regressions
+
+
+def _get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
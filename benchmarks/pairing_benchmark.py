@@ -0,0 +1,170 @@
+""" Headless benchmark of the pairing and ranking of the swiss system based on synthetic tournaments.
+
+Run from the repository root:
+    python -m benchmarks.pairing_benchmark [--sizes 8 16 32 64 128 256 512] [--seed 0] [--exact-pairing]
+
+For each field size, with and without handicaps and for both game modes a complete tournament is simulated. Reported
+are the latencies of the individual steps per round, the peak memory (separate run with tracemalloc) and the quality
+of the pairings (repeated pairings, accumulated win difference of the paired players, failed rounds). Large fields are
+paired by the anytime optimizer unless `--exact-pairing` is given.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.history import create_entry, append_to_history, report_regressions
+from benchmarks.synthetic import generate_players
+from model.data_classes import GameMode
+from model.simulation import StrengthModel, simulate_match
+from model.swiss_system import Tournament
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'pairing_history.json')
+
+
+def recommended_number_of_rounds(num_players: int) -> int:
+    # upper end of the recommendation shown in the settings
+    return min(math.ceil(math.log2(num_players)) + 2, num_players - 1)
+
+
+def run_tournament(num_players: int, with_handicaps: bool, game_mode: GameMode, num_rounds: int, seed: int,
+                   pairing_time_budget: float = 0.2):
+    rng = random.Random(seed)
+    strength_model = StrengthModel()
+
+    players = generate_players(num_players, rng)
+
+    start = time.perf_counter()
+    tournament = Tournament(game_mode, players, with_handicaps, seed=seed, pairing_time_budget=pairing_time_budget)
+    setup_time = time.perf_counter() - start
+
+    stats = {
+        'setup_ms': setup_time * 1000,
+        'generate_next_round_ms': [],
+        'update_player_statistics_ms': [],
+        'get_ranking_ms': [],
+        'repeat_pairings': 0,
+        'win_diff_cost': 0,
+        'failed_rounds': 0,
+    }
+
+    played_pairs = set()
+
+    for _ in range(num_rounds):
+        start = time.perf_counter()
+        generated = tournament.generate_next_round()
+        stats['generate_next_round_ms'].append((time.perf_counter() - start) * 1000)
+
+        if not generated:
+            stats['failed_rounds'] += 1
+            break
+
+        # quality of the pairings (win counts are up to date after the generation of the round)
+        tournament_players = tournament.get_players()
+        for match in tournament.get_running_matches():
+            p1 = tournament_players[match.first_player_id]
+            p2 = tournament_players[match.second_player_id]
+
+            pair = (min(p1.id, p2.id), max(p1.id, p2.id))
+            if pair in played_pairs:
+                stats['repeat_pairings'] += 1
+            played_pairs.add(pair)
+
+            if not p2.is_bye():
+                stats['win_diff_cost'] += abs(len(p1.wins) - len(p2.wins))
+
+            simulate_match(match, p1, p2, strength_model, rng)
+
+        start = time.perf_counter()
+        tournament.update_player_statistics(tournament.get_running_matches())
+        stats['update_player_statistics_ms'].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        tournament.get_ranking()
+        stats['get_ranking_ms'].append((time.perf_counter() - start) * 1000)
+
+    return stats
+
+
+def summarize(values: list) -> dict:
+    if len(values) == 0:
+        return {}
+
+    return {
+        'median': round(statistics.median(values), 3),
+        'max': round(max(values), 3),
+        'total': round(sum(values), 3),
+    }
+
+
+def benchmark_configuration(num_players: int, with_handicaps: bool, game_mode: GameMode, num_rounds: int, seed: int,
+                            measure_memory: bool, pairing_time_budget: float = 0.2) -> dict:
+    stats = run_tournament(num_players, with_handicaps, game_mode, num_rounds, seed, pairing_time_budget)
+
+    result = {
+        'setup_ms': round(stats['setup_ms'], 3),
+        'generate_next_round_ms': summarize(stats['generate_next_round_ms']),
+        'update_player_statistics_ms': summarize(stats['update_player_statistics_ms']),
+        'get_ranking_ms': summarize(stats['get_ranking_ms']),
+        'repeat_pairings': stats['repeat_pairings'],
+        'win_diff_cost': stats['win_diff_cost'],
+        'failed_rounds': stats['failed_rounds'],
+    }
+
+    if measure_memory:
+        # separate run as tracing the allocations distorts the timings
+        tracemalloc.start()
+        run_tournament(num_players, with_handicaps, game_mode, num_rounds, seed, pairing_time_budget)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result['peak_memory_kb'] = round(peak / 1024, 1)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 16, 32, 64, 128, 256, 512])
+    parser.add_argument('--rounds', type=int, default=None, help='defaults to the recommended number of rounds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    parser.add_argument('--pairing-time-budget', type=float, default=0.2, help='seconds of the pairing optimizer')
+    parser.add_argument('--exact-pairing', action='store_true', help='large fields are paired exactly as well')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative increase reported as regression')
+    parser.add_argument('--no-store', action='store_true', help='do not append the results to the history')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = {}
+    pairing_time_budget = None if args.exact_pairing else args.pairing_time_budget
+
+    for num_players in args.sizes:
+        num_rounds = args.rounds if args.rounds is not None else recommended_number_of_rounds(num_players)
+
+        for with_handicaps in [True, False]:
+            for game_mode in [GameMode.BEST_OF_TWO, GameMode.BEST_OF_THREE]:
+                key = f"{num_players}_players/{'handicap' if with_handicaps else 'ttr'}/best_of_{int(game_mode)}"
+
+                results[key] = benchmark_configuration(num_players, with_handicaps, game_mode, num_rounds,
+                                                       args.seed, not args.no_memory, pairing_time_budget)
+
+                print(f"{key}: {json.dumps(results[key])}")
+
+    regressions = report_regressions(args.history, results, args.tolerance)
+
+    if not args.no_store:
+        append_to_history(args.history, create_entry(results))
+
+    if args.fail_on_regression and len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+""" Load test of the score entry server with many concurrent stand-in clients.
+
+Run from the repository root:
+    python -m benchmarks.score_server_load [--clients 100] [--duplicates 0.2] [--viewers 50] [--max-p95-ms 500]
+    python benchmarks/score_server_load.py ...
+
+Each client plays the role of a player's phone: it fetches the running matches and submits the results of its match
+set by set over a keep-alive connection (a part of the clients uses the websocket instead). For a share of the matches
+both players submit, which exercises the conflict resolution. The tournament is only touched by a stand-in of the
+kivy main loop that applies the queued submissions in batches. Meanwhile, spectators follow the scoreboard's event
+stream, which must not add any work to the main loop apart from one serialization per change.
+
+The run fails (exit code 1) if a match that has been assigned to a client is not finished, if the server answers with
+a 5xx status or if the 95th percentile of the latency exceeds the given bound.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import struct
+import sys
+import threading
+import time
+
+# runnable as a script as well (the repository root is not on the path then)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_players
+from model.data_classes import GameMode, Score
+from model.swiss_system import Tournament
+from server.http_server import HttpServer
+from server.score_server import ScoreServer, get_match_key
+from server.scoreboard import Scoreboard
+
+
+class HttpClient:
+    def __init__(self, host: str, port: int):
+        self._host = host
+        self._port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        # a snapshot of a big field is sent as a single line of the event stream (longer than the default limit)
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port, limit=2 ** 22)
+
+    async def request(self, method: str, path: str, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self._host}\r\nContent-Length: {len(body)}\r\n"
+                           f"Content-Type: application/json\r\n\r\n".encode('latin-1') + body)
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split(b' ')[1])
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        response_body = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        return status, json.loads(response_body) if response_body else None
+
+    async def open_websocket(self, path: str):
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        self._writer.write(f"GET {path} HTTP/1.1\r\nHost: {self._host}\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+                           .encode('latin-1'))
+        await self._writer.drain()
+
+        while (await self._reader.readline()) not in (b'\r\n', b''):
+            pass
+
+    async def send_websocket(self, text: str):
+        # clients have to mask their frames
+        payload = text.encode('utf-8')
+        mask = os.urandom(4)
+        length = len(payload)
+        header = struct.pack('!BB', 0x81, 0x80 | length) if length < 126 else struct.pack('!BBH', 0x81, 0xFE, length)
+        self._writer.write(header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+        await self._writer.drain()
+
+    async def receive_websocket(self):
+        header = await self._reader.readexactly(2)
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await self._reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await self._reader.readexactly(8))[0]
+        return json.loads(await self._reader.readexactly(length))
+
+    async def read_events(self, path: str, stop_event: asyncio.Event):
+        """ Counts the server-sent events until `stop_event` is set. """
+        self._writer.write(f"GET {path} HTTP/1.1\r\nHost: {self._host}\r\nAccept: text/event-stream\r\n\r\n"
+                           .encode('latin-1'))
+        await self._writer.drain()
+
+        while (await self._reader.readline()) not in (b'\r\n', b''):
+            pass
+
+        num_events = 0
+        read_task = None
+        stop_task = asyncio.ensure_future(stop_event.wait())
+
+        while True:
+            read_task = asyncio.ensure_future(self._reader.readline())
+            done, _ = await asyncio.wait([read_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+
+            if stop_task in done:
+                read_task.cancel()
+                return num_events
+
+            line = read_task.result()
+            if line == b'':
+                stop_task.cancel()
+                return num_events
+
+            if line.startswith(b'event: snapshot'):
+                num_events += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def generate_set_results(game_mode: GameMode, rng: random.Random):
+    results = []
+    sets_won = 0
+    sets_lost = 0
+
+    while sets_won < int(game_mode) and sets_lost < int(game_mode):
+        value = float(rng.choice([0, 3, 5, 7, 9, 10, 12]))
+        if rng.random() < 0.5:
+            value = -1.0 * value
+            sets_lost += 1
+        else:
+            sets_won += 1
+
+        results.append(Score.to_str(value).replace(' ', ''))
+
+    return results
+
+
+async def run_client(client_id: int, match: dict, game_mode: GameMode, use_websocket: bool, port: int,
+                     stats: dict):
+    rng = random.Random(client_id)
+    target_results = generate_set_results(game_mode, rng)
+    num_sets = len(match['set_results'])
+
+    client = HttpClient('127.0.0.1', port)
+    await client.connect()
+
+    try:
+        if use_websocket:
+            await client.open_websocket('/ws')
+            snapshot = await client.receive_websocket()
+            match = next(m for m in snapshot['matches'] if m['id'] == match['id'])
+        else:
+            start = time.perf_counter()
+            status, snapshot = await client.request('GET', '/api/matches')
+            stats['latencies'].append(time.perf_counter() - start)
+            match = next(m for m in snapshot['matches'] if m['id'] == match['id'])
+
+        # submit the results set by set as a player would do after each set
+        for i in range(1, len(target_results) + 1):
+            results = target_results[:i] + [None] * (num_sets - i)
+
+            start = time.perf_counter()
+            if use_websocket:
+                await client.send_websocket(json.dumps({'match': match['id'], 'version': match['version'],
+                                                        'set_results': results}))
+
+                # broadcasts of the snapshot may arrive before the answer
+                while True:
+                    response = await client.receive_websocket()
+                    if response.get('type') == 'result':
+                        break
+                status = response['status']
+            else:
+                status, response = await client.request('POST', f"/api/matches/{match['id']}",
+                                                        {'version': match['version'], 'set_results': results})
+            stats['latencies'].append(time.perf_counter() - start)
+
+            stats['status'][status] = stats['status'].get(status, 0) + 1
+
+            if response is not None and 'match' in response:
+                match = response['match']
+
+            if status == 409:
+                # somebody else has entered a different result, the player would now check the shown results
+                break
+
+            await asyncio.sleep(rng.uniform(0.0, 0.05))
+    finally:
+        client.close()
+
+
+async def run_viewer(port: int, stop_event: asyncio.Event, stats: dict):
+    client = HttpClient('127.0.0.1', port)
+    await client.connect()
+
+    try:
+        stats['viewer_events'].append(await client.read_events('/api/scoreboard/events', stop_event))
+    finally:
+        client.close()
+
+
+async def run_clients(matches: list, num_clients: int, duplicate_ratio: float, websocket_ratio: float,
+                      num_viewers: int, game_mode: GameMode, port: int, stats: dict):
+    rng = random.Random(0)
+    tasks = []
+
+    stop_event = asyncio.Event()
+    viewers = [asyncio.ensure_future(run_viewer(port, stop_event, stats)) for _ in range(num_viewers)]
+
+    for client_id in range(num_clients):
+        # a share of the clients reports a match that has already been assigned to another client
+        if client_id < len(matches) and rng.random() >= duplicate_ratio:
+            match = matches[client_id]
+        else:
+            match = rng.choice(matches[:max(1, min(client_id, len(matches)))])
+
+        stats['assigned'].add(match['id'])
+        tasks.append(run_client(client_id, match, game_mode, rng.random() < websocket_ratio, port, stats))
+
+    await asyncio.gather(*tasks)
+
+    # the last snapshot has to reach the viewers as well
+    await asyncio.sleep(0.5)
+    stop_event.set()
+    await asyncio.gather(*viewers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='share of clients reporting a known match')
+    parser.add_argument('--websockets', type=float, default=0.3, help='share of clients using the websocket')
+    parser.add_argument('--viewers', type=int, default=50, help='number of scoreboard event streams')
+    parser.add_argument('--interval', type=float, default=0.1, help='interval of the main loop stand-in (s)')
+    parser.add_argument('--max-p95-ms', type=float, default=500, help='bound of the 95th percentile of the latency')
+    args = parser.parse_args()
+
+    game_mode = GameMode.BEST_OF_THREE
+    rng = random.Random(0)
+
+    # (at least) one match per client
+    tournament = Tournament(game_mode, generate_players(2 * args.clients, rng), True, seed=0)
+    tournament.generate_next_round()
+
+    http_server = HttpServer(port=0)
+    scoreboard = Scoreboard(tournament, http_server=http_server)
+
+    applied_batches = []
+    publish_times = []
+
+    def on_results_applied(matches):
+        applied_batches.append(len(matches))
+
+        start = time.perf_counter()
+        scoreboard.publish()
+        publish_times.append(time.perf_counter() - start)
+
+    server = ScoreServer(tournament, on_results_applied=on_results_applied, http_server=http_server)
+    scoreboard.publish()
+    server.start()
+
+    # stand-in of the kivy main loop which owns the tournament
+    stop_event = threading.Event()
+
+    def main_loop():
+        while not stop_event.is_set():
+            server.process_pending()
+            time.sleep(args.interval)
+
+    main_loop_thread = threading.Thread(target=main_loop, daemon=True)
+    main_loop_thread.start()
+
+    matches = [m for m in json.loads(server.get_snapshot_json())['matches'] if not m['finished']]
+
+    stats = {'latencies': [], 'status': {}, 'viewer_events': [], 'assigned': set()}
+
+    start = time.perf_counter()
+    asyncio.run(run_clients(matches, args.clients, args.duplicates, args.websockets, args.viewers, game_mode,
+                            server.get_port(), stats))
+    duration = time.perf_counter() - start
+
+    stop_event.set()
+    main_loop_thread.join()
+    server.stop()
+
+    latencies = sorted(stats['latencies'])
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+
+    # matches without any client are not expected to be finished
+    assigned_matches = [m for m in tournament.get_running_matches() if get_match_key(m) in stats['assigned']]
+    finished = sum(1 for m in assigned_matches if m.is_finished())
+    server_errors = sum(num for status, num in stats['status'].items() if status >= 500)
+
+    print(json.dumps({
+        'clients': args.clients,
+        'requests': len(latencies),
+        'duration_s': round(duration, 2),
+        'requests_per_s': round(len(latencies) / duration, 1),
+        'latency_ms': {
+            'median': round(statistics.median(latencies) * 1000, 1),
+            'p95': round(p95 * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1),
+        },
+        'status_codes': stats['status'],
+        'applied_batches': len(applied_batches),
+        'mean_batch_size': round(statistics.mean(applied_batches), 1) if len(applied_batches) > 0 else 0,
+        'finished_matches': f"{finished} / {len(assigned_matches)} assigned "
+                            f"({len(tournament.get_running_matches())} in total)",
+        'scoreboard': {
+            'versions': scoreboard.get_version(),
+            'mean_publish_ms': round(statistics.mean(publish_times) * 1000, 2) if len(publish_times) > 0 else 0,
+            'viewers': len(stats['viewer_events']),
+            'min_events_per_viewer': min(stats['viewer_events'], default=0),
+        },
+    }, indent=2))
+
+    failures = []
+    if finished < len(assigned_matches):
+        failures.append(f"{len(assigned_matches) - finished} assigned matches have not been finished")
+    if server_errors > 0:
+        failures.append(f"{server_errors} responses with a 5xx status")
+    if p95 * 1000 > args.max_p95_ms:
+        failures.append(f"95th percentile of the latency ({p95 * 1000:.1f} ms) exceeds {args.max_p95_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"Error: {failure}", file=sys.stderr)
+
+    if len(failures) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
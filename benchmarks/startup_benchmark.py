@@ -0,0 +1,156 @@
+""" Import time and cold start benchmark of the app.
+
+Run from the repository root:
+    python -m benchmarks.startup_benchmark [--repetitions 5] [--headless]
+
+Each measurement is done in a fresh interpreter as otherwise modules would already be cached. The results are
+appended to a json history and compared against the previous entry to catch regressions before a release.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.history import create_entry, append_to_history, report_regressions
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HISTORY_PATH = os.path.join(REPOSITORY_ROOT, 'benchmarks', 'results', 'startup_history.json')
+
+MODULES = [
+    'networkx',
+    'kivy',
+    'model.data_classes',
+    'model.swiss_system',
+    'gui.settings_window',
+    'gui.tournament_window',
+    'gui.game_overview_window',
+    'gui.results_window',
+    'main',
+]
+
+# prefix of the line the child process uses to report its results
+RESULT_PREFIX = 'BENCHMARK_RESULT:'
+
+IMPORT_SCRIPT = f"""
+import os, time
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+start = time.perf_counter()
+import {{module}}
+print('{RESULT_PREFIX}' + str(time.perf_counter() - start))
+"""
+
+COLD_START_SCRIPT = f"""
+import os
+os.environ['KIVY_NO_ARGS'] = '1'
+os.environ['KIVY_NO_CONSOLELOG'] = '1'
+
+import startup_timing
+import json
+
+from kivy.clock import Clock
+from main import TournamentApp
+
+
+def get_max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report(_):
+    marks = dict(startup_timing.get_marks())
+
+    # wait until the app itself has reported its first frame
+    if 'first frame' not in marks:
+        return
+
+    print('{RESULT_PREFIX}' + json.dumps({{'marks': marks, 'max_rss_mb': get_max_rss_mb()}}))
+    app.stop()
+    return False
+
+
+app = TournamentApp()
+Clock.schedule_interval(report, 0)
+app.run()
+"""
+
+
+def run_child(script: str, env: dict):
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPOSITORY_ROOT, env=env, capture_output=True,
+                            text=True, timeout=120)
+
+    for line in output.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return line[len(RESULT_PREFIX):]
+
+    raise RuntimeError(f"Benchmark child failed:\n{output.stderr}")
+
+
+def measure_import_times(repetitions: int, env: dict) -> dict:
+    import_times = {}
+
+    for module in MODULES:
+        try:
+            durations = [float(run_child(IMPORT_SCRIPT.format(module=module), env)) for _ in range(repetitions)]
+        except RuntimeError as e:
+            print(f"Warning: could not import '{module}': {e}")
+            continue
+
+        import_times[module] = round(statistics.median(durations) * 1000, 1)
+
+    return import_times
+
+
+def measure_cold_start(repetitions: int, env: dict) -> dict:
+    runs = [json.loads(run_child(COLD_START_SCRIPT, env)) for _ in range(repetitions)]
+
+    marks = {label: round(statistics.median(run['marks'][label] for run in runs) * 1000, 1)
+             for label in runs[0]['marks']}
+
+    max_rss = [run['max_rss_mb'] for run in runs if run['max_rss_mb'] is not None]
+
+    return {
+        'marks_ms': marks,
+        'max_rss_mb': round(statistics.median(max_rss), 1) if len(max_rss) > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative increase reported as regression')
+    parser.add_argument('--headless', action='store_true', help='render into an offscreen window')
+    parser.add_argument('--no-store', action='store_true', help='do not append the results to the history')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.headless:
+        env.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+    results = {
+        'import_ms': measure_import_times(args.repetitions, env),
+        'cold_start': measure_cold_start(args.repetitions, env),
+    }
+
+    print(json.dumps(results, indent=2))
+
+    regressions = report_regressions(args.history, results, args.tolerance)
+
+    if not args.no_store:
+        append_to_history(args.history, create_entry(results))
+
+    if args.fail_on_regression and len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+""" Generation of synthetic fields of participants for the benchmarks. """
+import random
+
+from model.data_classes import Player
+
+SYLLABLES = ['an', 'ben', 'chri', 'da', 'el', 'fe', 'gun', 'han', 'in', 'jo', 'ka', 'lu', 'ma', 'ni', 'ol', 'pe',
+             'ro', 'sa', 'te', 'ul', 'vi', 'wal', 'xa', 'yo', 'ze']
+
+
+def generate_players(num_players: int, rng: random.Random):
+    players = []
+    names = set()
+
+    while len(players) < num_players:
+        first_name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        last_name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        name = f"{first_name} {last_name}"
+
+        if name in names:
+            continue
+        names.add(name)
+
+        ttr = int(min(max(rng.gauss(1400, 200), 800), 2200))
+
+        # roughly the relationship of the club's player database
+        handicap = max(0, round((1600 - ttr) / 90))
+
+        players.append(Player(name=name, ttr=ttr, handicap=handicap))
+
+    return players
+
@@ -22,7 +22,7 @@ source.include_exts = py,png,jpg,kv,atlas
 #source.exclude_exts = spec
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-source.exclude_dirs = test, bin, kivy_venv, buildozer_venv, __pycache__, runtime_storage
+source.exclude_dirs = test, tests, bin, kivy_venv, buildozer_venv, __pycache__, runtime_storage, benchmarks
 
 # (list) List of exclusions using pattern matching
 # Do not prefix with './'
@@ -96,7 +96,7 @@ android.presplash_color = white
 # (list) Permissions
 # (See https://python-for-android.readthedocs.io/en/latest/buildoptions/#build-options-1 for all the supported syntaxes and properties)
 #android.permissions = android.permission.INTERNET, (name=android.permission.WRITE_EXTERNAL_STORAGE;maxSdkVersion=18)
-android.permissions = MANAGE_EXTERNAL_STORAGE
+android.permissions = MANAGE_EXTERNAL_STORAGE, INTERNET, ACCESS_NETWORK_STATE
 
 # (list) features (adds uses-feature -tags to manifest)
 #android.features = android.hardware.usb.host
@@ -0,0 +1,372 @@
+""" Headless command line interface for running tournaments without the GUI (e.g. batch processing on a server).
+
+The complete state is kept in a json file which is replaced atomically after each command:
+    python cli.py new resources/players.json tournament.json --best-of 3
+    python cli.py show tournament.json
+    python cli.py results tournament.json results.txt    (or from stdin: ... | python cli.py results tournament.json -)
+    python cli.py next tournament.json
+    python cli.py standings tournament.json --json --output standings.json
+    python cli.py add tournament.json "Erika Musterfrau" --ttr 1350 --handicap 2    (late entry)
+    python cli.py withdraw tournament.json "Max Mustermann"
+    python cli.py ratings runtime_storage/tournaments --players resources/players.json
+    python cli.py calibrate runtime_storage/tournaments resources/players.json --output proposed_players.json
+    python cli.py convert runtime_storage/tournaments    (records of old text reports, done automatically otherwise)
+    python cli.py export runtime_storage/tournaments export --from 2024-09-01 --to 2025-08-31 --format csv html
+    python cli.py --profile profiling.json next tournament.json    (timing of the pairing, ranking, ...)
+
+The results files use the format of the bulk import (see model/bulk_import.py), e.g.:
+    1; 11:5 8:11 11:7 11:3
+    Max Mustermann; Erika Musterfrau; 11:9 11:4 11:2
+"""
+import argparse
+import json
+import sys
+
+from datetime import date
+
+from model.archive import convert_text_archive, list_unconverted_files, read_previous_pairings
+from model.bulk_import import import_results
+from model.data_classes import GameMode, Player, Score
+from model.export import FORMATS, export_archive
+from model.handicap_calibration import calibrate_handicaps, propose_player_database
+from model.persistence import write_atomically
+from model.profiling import store_report
+from model.rating import RatingEngine, load_match_store
+from model.seeding import PortfolioSeeding, default_metrics
+from model.swiss_system import Tournament
+
+
+def save_tournament(tournament: Tournament, path: str):
+    write_atomically(path, json.dumps(tournament.to_dict(), indent=2))
+
+
+def load_tournament(path: str) -> Tournament:
+    with open(path, 'r') as file:
+        return Tournament.from_dict(json.load(file))
+
+
+def format_matches(tournament: Tournament) -> str:
+    lines = [f"Runde: {tournament.get_current_round()}"]
+
+    for i, m in enumerate(tournament.get_running_matches(), 1):
+        results = ' '.join(Score.to_str(r).replace(' ', '') for r in m.set_results if r is not None)
+        lines.append(f"{i:3d}. {m.first_player_name} vs. {m.second_player_name} | {m.sets_won()}:{m.sets_lost()} | "
+                     f"{results}")
+
+    return '\n'.join(lines)
+
+
+def get_standings(tournament: Tournament) -> list:
+    return [{
+        'rank': rank,
+        'name': p.name,
+        'wins': len(p.wins),
+        'losses': len(p.losses),
+        'buchholz': p.buchholz,
+    } for rank, p in enumerate(tournament.get_ranking(), 1)]
+
+
+def format_standings(standings: list) -> str:
+    max_name_len = max((len(p['name']) for p in standings), default=0)
+
+    return '\n'.join(f"{p['rank']}. \t {p['name'].ljust(max_name_len)} {p['wins']}:{p['losses']} (B: {p['buchholz']})"
+                     for p in standings)
+
+
+def check_archive(directory: str):
+    # the archive is only read, old text reports have to be converted explicitly
+    num_unconverted = len(list_unconverted_files(directory))
+    if num_unconverted > 0:
+        print(f"Warning: {num_unconverted} text reports without record are skipped, run 'convert' first",
+              file=sys.stderr)
+
+
+def command_new(args):
+    with open(args.players, 'r') as file:
+        players = [Player(**p) for p in json.load(file)]
+
+    if args.select is not None:
+        selection = {name.strip() for name in args.select.split(',')}
+        players = [p for p in players if p.name in selection]
+
+    if len(players) < 2:
+        print('Error: at least two players are required', file=sys.stderr)
+        return 1
+
+    seeding = None
+    if args.optimized_seeding:
+        previous_pairings = set()
+        if args.archive is not None:
+            check_archive(args.archive)
+            previous_pairings = read_previous_pairings(args.archive)
+        seeding = PortfolioSeeding(default_metrics(not args.no_handicap, previous_pairings),
+                                   time_budget=args.seeding_time_budget)
+
+    tie_breaks = None
+    if args.tie_breaks is not None:
+        tie_breaks = [name.strip() for name in args.tie_breaks.split(',') if name.strip()]
+
+    try:
+        tournament = Tournament(GameMode(args.best_of), players, not args.no_handicap, seed=args.seed,
+                                rolling_rounds=args.rolling, seeding=seeding, tie_breaks=tie_breaks)
+    except ValueError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    tournament.generate_next_round()
+
+    save_tournament(tournament, args.tournament)
+    print(format_matches(tournament))
+    return 0
+
+
+def command_show(args):
+    print(format_matches(load_tournament(args.tournament)))
+    return 0
+
+
+def command_results(args):
+    tournament = load_tournament(args.tournament)
+
+    lines = []
+    for path in args.files:
+        if path == '-':
+            lines += sys.stdin.readlines()
+        else:
+            with open(path, 'r') as file:
+                lines += file.readlines()
+
+    _, errors = import_results(tournament, lines)
+
+    if len(errors) > 0:
+        for line_number, message in errors:
+            print(f"Error in line {line_number}: {message}", file=sys.stderr)
+        return 1
+
+    save_tournament(tournament, args.tournament)
+    print(format_matches(tournament))
+    return 0
+
+
+def command_next(args):
+    tournament = load_tournament(args.tournament)
+
+    if not tournament.is_rolling():
+        if any(not m.is_finished() for m in tournament.get_running_matches()):
+            print('Error: not all matches of the current round are finished', file=sys.stderr)
+            return 1
+
+        if tournament.get_current_round() >= tournament.get_max_number_of_rounds():
+            print('Error: maximum number of rounds reached', file=sys.stderr)
+            return 1
+
+    if not tournament.generate_next_round():
+        print('Error: no new pairings could be generated', file=sys.stderr)
+        return 1
+
+    for player in tournament.get_stalled_players():
+        print(f"Warning: no opponent left for '{player.name}', a bye has been assigned instead", file=sys.stderr)
+
+    save_tournament(tournament, args.tournament)
+    print(format_matches(tournament))
+    return 0
+
+
+def command_add(args):
+    tournament = load_tournament(args.tournament)
+
+    if any(p.name == args.name for p in tournament.get_players()):
+        print(f"Error: '{args.name}' is already taking part", file=sys.stderr)
+        return 1
+
+    tournament.add_player(Player(args.name, args.ttr, args.handicap, nickname=args.nickname, club=args.club))
+
+    save_tournament(tournament, args.tournament)
+    print(format_matches(tournament))
+    return 0
+
+
+def command_withdraw(args):
+    tournament = load_tournament(args.tournament)
+
+    player = next((p for p in tournament.get_players() if p.name == args.name and not p.is_bye()), None)
+    if player is None or tournament.is_withdrawn(player.id):
+        print(f"Error: '{args.name}' is not taking part", file=sys.stderr)
+        return 1
+
+    tournament.withdraw_player(player.id)
+
+    save_tournament(tournament, args.tournament)
+    print(format_matches(tournament))
+    return 0
+
+
+def command_standings(args):
+    standings = get_standings(load_tournament(args.tournament))
+    content = json.dumps(standings, indent=2) if args.json else format_standings(standings)
+
+    if args.output is None:
+        print(content)
+    else:
+        write_atomically(args.output, content + '\n')
+
+    return 0
+
+
+def command_ratings(args):
+    initial_ratings = {}
+    if args.players is not None:
+        with open(args.players, 'r') as file:
+            initial_ratings = {p['name']: p['ttr'] for p in json.load(file)}
+
+    check_archive(args.archive)
+    store = load_match_store(args.archive)
+    engine = RatingEngine(store, initial_ratings, k_factor=args.k_factor, provisional_k_factor=args.provisional_k_factor)
+
+    ratings = sorted(({'name': name, 'rating': round(engine.get_rating(name), 1)} for name in store.names),
+                     key=lambda r: r['rating'], reverse=True)
+
+    if args.json:
+        print(json.dumps(ratings, indent=2))
+    else:
+        max_name_len = max((len(r['name']) for r in ratings), default=0)
+        print('\n'.join(f"{r['name'].ljust(max_name_len)} {r['rating']:.0f}" for r in ratings))
+
+    return 0
+
+
+def command_calibrate(args):
+    with open(args.players, 'r') as file:
+        players = [Player(**p) for p in json.load(file)]
+
+    check_archive(args.archive)
+    proposals = calibrate_handicaps(args.archive, players, regularization=args.regularization,
+                                    half_life_days=args.half_life)
+
+    max_name_len = max((len(p.name) for p in proposals), default=0)
+    for p in sorted(proposals, key=lambda p: p.name):
+        print(f"{p.name.ljust(max_name_len)} {p.handicap:3d} -> {p.proposed_handicap:3d} "
+              f"({p.adjustment:+.1f}, {p.num_sets} sets)")
+
+    if args.output is not None:
+        database = propose_player_database(players, proposals, min_sets=args.min_sets)
+        write_atomically(args.output, json.dumps(database, indent=4, ensure_ascii=False) + '\n')
+
+    return 0
+
+
+def command_convert(args):
+    converted = convert_text_archive(args.archive)
+    print(f"{converted} tournaments converted")
+
+    return 0
+
+
+def command_export(args):
+    check_archive(args.archive)
+
+    for path in export_archive(args.archive, args.output, args.first_day, args.last_day, args.format):
+        print(path)
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', default=None,
+                        help='timing histograms of the pairing, ranking, ... (json) written after the command')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    new_parser = subparsers.add_parser('new', help='create a tournament and generate the first round')
+    new_parser.add_argument('players', help='player database (json)')
+    new_parser.add_argument('tournament', help='tournament state (json) to create')
+    new_parser.add_argument('--select', default=None, help='comma separated names of the participating players')
+    new_parser.add_argument('--best-of', type=int, choices=[2, 3], default=3)
+    new_parser.add_argument('--no-handicap', action='store_true')
+    new_parser.add_argument('--rolling', type=int, default=0, help='number of rounds in the rolling mode')
+    new_parser.add_argument('--seed', type=int, default=None)
+    new_parser.add_argument('--optimized-seeding', action='store_true', help='first round: best of many random draws')
+    new_parser.add_argument('--seeding-time-budget', type=float, default=0.5, help='seconds')
+    new_parser.add_argument('--archive', default=None,
+                            help='folder of the stored tournaments, pairings of the previous one are avoided')
+    new_parser.add_argument('--tie-breaks', default=None,
+                            help='comma separated order of the tie-breaks, e.g. buchholz,median_buchholz,progressive,'
+                                 'sonneborn_berger,set_quotient,point_quotient,direct_encounter,ttr')
+    new_parser.set_defaults(function=command_new)
+
+    show_parser = subparsers.add_parser('show', help='list the running matches')
+    show_parser.add_argument('tournament')
+    show_parser.set_defaults(function=command_show)
+
+    results_parser = subparsers.add_parser('results', help='enter the results of running matches')
+    results_parser.add_argument('tournament')
+    results_parser.add_argument('files', nargs='*', default=['-'], help="result files ('-': stdin)")
+    results_parser.set_defaults(function=command_results)
+
+    next_parser = subparsers.add_parser('next', help='generate the next round (rolling mode: pair free players)')
+    next_parser.add_argument('tournament')
+    next_parser.set_defaults(function=command_next)
+
+    add_parser = subparsers.add_parser('add', help='late entry of a player (paired from the next round on)')
+    add_parser.add_argument('tournament')
+    add_parser.add_argument('name')
+    add_parser.add_argument('--ttr', type=int, required=True)
+    add_parser.add_argument('--handicap', type=int, default=0)
+    add_parser.add_argument('--nickname', default=None)
+    add_parser.add_argument('--club', default=None)
+    add_parser.set_defaults(function=command_add)
+
+    withdraw_parser = subparsers.add_parser('withdraw', help='withdrawal of a player (running match lost by walkover)')
+    withdraw_parser.add_argument('tournament')
+    withdraw_parser.add_argument('name')
+    withdraw_parser.set_defaults(function=command_withdraw)
+
+    standings_parser = subparsers.add_parser('standings', help='write the current standings')
+    standings_parser.add_argument('tournament')
+    standings_parser.add_argument('--json', action='store_true')
+    standings_parser.add_argument('--output', default=None)
+    standings_parser.set_defaults(function=command_standings)
+
+    ratings_parser = subparsers.add_parser('ratings', help='ratings learned from all stored tournaments')
+    ratings_parser.add_argument('archive', help='folder of the stored tournaments')
+    ratings_parser.add_argument('--players', default=None, help='player database (json), the ttr is the initial rating')
+    ratings_parser.add_argument('--k-factor', type=float, default=16)
+    ratings_parser.add_argument('--provisional-k-factor', type=float, default=32)
+    ratings_parser.add_argument('--json', action='store_true')
+    ratings_parser.set_defaults(function=command_ratings)
+
+    calibrate_parser = subparsers.add_parser('calibrate', help='handicaps fitted to the point differences of all sets')
+    calibrate_parser.add_argument('archive', help='folder of the stored tournaments')
+    calibrate_parser.add_argument('players', help='player database (json)')
+    calibrate_parser.add_argument('--output', default=None, help='proposed player database (json)')
+    calibrate_parser.add_argument('--regularization', type=float, default=10,
+                                  help='weight pulling players with only a few sets towards their current handicap')
+    calibrate_parser.add_argument('--half-life', type=float, default=365, help='days after which a set counts half')
+    calibrate_parser.add_argument('--min-sets', type=int, default=10)
+    calibrate_parser.set_defaults(function=command_calibrate)
+
+    convert_parser = subparsers.add_parser('convert', help='structured records (json) of all old text reports')
+    convert_parser.add_argument('archive', help='folder of the stored tournaments')
+    convert_parser.set_defaults(function=command_convert)
+
+    export_parser = subparsers.add_parser('export', help='matches, placements and season ranking as csv, json, html')
+    export_parser.add_argument('archive', help='folder of the stored tournaments')
+    export_parser.add_argument('output', help='folder of the exported files')
+    export_parser.add_argument('--from', dest='first_day', type=date.fromisoformat, default=None,
+                               help='first day (YYYY-MM-DD), inclusive')
+    export_parser.add_argument('--to', dest='last_day', type=date.fromisoformat, default=None,
+                               help='last day (YYYY-MM-DD), inclusive')
+    export_parser.add_argument('--format', nargs='+', choices=FORMATS, default=FORMATS)
+    export_parser.set_defaults(function=command_export)
+
+    args = parser.parse_args(argv)
+    result = args.function(args)
+
+    if args.profile is not None:
+        store_report(args.profile)
+
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
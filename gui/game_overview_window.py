@@ -5,6 +5,7 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.image import Image
 from kivy.properties import ObjectProperty
 from model.data_classes import Score
+from model.profiling import timed
 
 
 class FinishedMatchWidget(BoxLayout):
@@ -73,9 +74,10 @@ class GameOverviewWindow(Screen):
         self._row_height = 70
 
     def on_pre_enter(self):
-        self._games = self.parent.ids['tournament_window'].get_played_games()
+        self._games = self.manager.tournaments.get_active().get_played_games()
         self.update_visualization()
 
+    @timed('game_overview_window.update_visualization')
     def update_visualization(self):
         num_rounds = len(self._games)
 
@@ -0,0 +1,66 @@
+""" Timing histograms of the critical operations (see model/profiling.py) on top of all screens.
+
+The overlay is refreshed once per second, a tap writes the json report (e.g. to be analyzed after a slow evening).
+"""
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.graphics import Color, Rectangle
+from kivy.uix.label import Label
+
+from model.profiling import report
+
+
+class PerformanceOverlay(Label):
+    def __init__(self, on_dump=None, max_entries: int = 12, **kwargs):
+        super(PerformanceOverlay, self).__init__(font_name='RobotoMono-Regular', font_size=14, halign='left',
+                                                 valign='top', size_hint=(None, None), **kwargs)
+        self._on_dump = on_dump
+        self._max_entries = max_entries
+        self._refresh_event = None
+
+        # semi-transparent background, hence, the screen below stays usable
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self._background = Rectangle(pos=self.pos, size=self.size)
+
+        self.bind(texture_size=self._update_layout, pos=self._update_background, size=self._update_background)
+        Window.bind(size=self._update_layout)
+
+    def show(self):
+        if self._refresh_event is not None:
+            return
+
+        Window.add_widget(self)
+        self.refresh()
+        self._refresh_event = Clock.schedule_interval(self.refresh, 1.0)
+
+    def hide(self):
+        if self._refresh_event is None:
+            return
+
+        self._refresh_event.cancel()
+        self._refresh_event = None
+        Window.remove_widget(self)
+
+    def is_visible(self) -> bool:
+        return self._refresh_event is not None
+
+    def refresh(self, *args):
+        self.text = report(self._max_entries) + '\n(Tippen: Bericht speichern)'
+
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return False
+
+        if self._on_dump is not None:
+            self._on_dump()
+
+        return True
+
+    def _update_layout(self, *args):
+        self.size = self.texture_size
+        self.pos = (0, Window.height - self.height)
+
+    def _update_background(self, *args):
+        self._background.pos = self.pos
+        self._background.size = self.size
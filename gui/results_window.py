@@ -1,53 +1,24 @@
-import functools
-import math
-import glob
+import json
 import os
-import string
+import threading
 
+from kivy.clock import Clock
 from kivy.uix.label import Label
+from kivy.uix.popup import Popup
 from kivy.uix.screenmanager import Screen
 from kivy.uix.gridlayout import GridLayout
 from kivy.properties import ObjectProperty
 
-from collections import OrderedDict
-from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List
-
-# only first five players are awared with points
-CONSIDERED_RANKS = 5
-
-
-@dataclass
-class PlayerStatistics:
-    sets_won: int = 0
-    sets_lost: int = 0
-
-    points_won: int = 0
-    points_lost: int = 0
-
-    # accumulated point difference within sets (ignoring bye)
-    acc_point_diff_won: int = 0
-    acc_point_diff_lost: int = 0
-
-    has_played_bye: bool = False
-
-@dataclass
-@functools.total_ordering
-class SeasonRanking:
-    total_points: int = 0
-
-    placement_histogram: List[int] = field(default_factory=list)
-
-    def __lt__(self, other):
-        return self.total_points < other.total_points
-
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.total_points == other.total_points
+from model.export import export_archive
+from model.handicap_calibration import MIN_SETS, calibrate_handicaps, propose_player_database
+from model.persistence import write_atomically
+from model.profiling import timed
+from model.season import get_season, read_season_ranking
 
 
 class ResultsWindow(Screen):
     grid_layout = ObjectProperty(None)
+    export_button = ObjectProperty(None)
 
     def __init__(self, **kwargs):
         super(ResultsWindow, self).__init__(**kwargs)
@@ -56,122 +27,130 @@ class ResultsWindow(Screen):
         self._spacing = 5
         self._row_height = 70
         self._tournament = None
+        self._ratings = None
+
+        # handicap proposals of the current visit (None as long as they are being calculated in the background)
+        self._handicap_proposals = None
+        self._calibration = None
+        self._add_handicap_rows = None
 
     def on_pre_enter(self):
-        self._tournament = self.parent.ids['tournament_window'].get_tournament()
-        self._storage_path = self.parent.ids['tournament_window'].get_tournament_storage_path()
+        # the season ranking is read from the stored files, hence, the current tournament has to be written first
+        tournament_window = self.manager.tournaments.get_active()
+        tournament_window.flush_storage()
+
+        self._tournament = tournament_window.get_tournament()
+        self._ratings = tournament_window.get_ratings()
+        self._storage_path = tournament_window.get_tournament_storage_path()
+
+        # the whole archive is fitted, hence, only once per visit and on a background thread (like the export)
+        self._handicap_proposals = None
+        self._add_handicap_rows = None
+        self._calibration = object()
+        all_players = self.manager.get_screen('settings').get_all_players()
+
+        threading.Thread(target=self._calibrate_handicaps, args=(self._calibration, self._storage_path, all_players),
+                         name='HandicapCalibration', daemon=True).start()
+
         self.update_visualization()
-        pass
-
-    def _extract_statistics(self):
-        statistics = {}
-
-        # create a statistics entry for each player
-        bye_id = None
-        for p in self._tournament.get_players():
-            if p.is_bye():
-                bye_id = p.id
-
-            statistics[p.id] = PlayerStatistics()
-
-        # iterate over all matches and extract statistics
-        for round in self._tournament.get_all_matches():
-            for match in round:
-                p1 = match.first_player_id
-                p2 = match.second_player_id
-
-                for res in match.set_results:
-                    if res is None:
-                        break
-
-                    sign = math.copysign(1, res) # needed for 11:0 and 0:11 edge case
-
-                    abs_res = abs(res)
-
-                    set_difference = int(11 - abs_res if abs_res <= 9 else 2)
-                    winner_points = int(max(11, abs_res + 2))
-                    loser_points = int(abs_res)
-
-                    # the average set difference is intended to give an impression whether the handicaps
-                    # are fairly distributed, hence, it ignores any 'bye' matches
-                    if match.second_player_id == bye_id:
-                        statistics[p1].has_played_bye = True
-                        set_difference = 0
-
-                    if sign > 0:
-                        statistics[p1].sets_won += 1
-                        statistics[p1].points_won += winner_points
-                        statistics[p1].points_lost += loser_points
-                        statistics[p1].acc_point_diff_won += set_difference
-
-                        statistics[p2].sets_lost += 1
-                        statistics[p2].points_won += loser_points
-                        statistics[p2].points_lost += winner_points
-                        statistics[p2].acc_point_diff_lost += set_difference
-                    else:
-                        statistics[p1].sets_lost += 1
-                        statistics[p1].points_won += loser_points
-                        statistics[p1].points_lost += winner_points
-                        statistics[p1].acc_point_diff_lost += set_difference
-
-                        statistics[p2].sets_won += 1
-                        statistics[p2].points_won += winner_points
-                        statistics[p2].points_lost += loser_points
-                        statistics[p2].acc_point_diff_won += set_difference
-
-        return statistics
 
     def _extract_season_ranking(self):
         # determine valid date range
-        cur_date = datetime.today()
+        start_date, end_date = get_season()
 
-        threshold_date = datetime.strptime(f"{cur_date.year}-09-01", '%Y-%m-%d')
+        return read_season_ranking(self._storage_path, start_date, end_date)
 
-        if cur_date < threshold_date:
-            start_date = datetime.strptime(f"{cur_date.year - 1}-09-01", '%Y-%m-%d')
-            end_date = datetime.strptime(f"{cur_date.year}-08-31", '%Y-%m-%d')
-        else:
-            start_date = datetime.strptime(f"{cur_date.year}-09-01", '%Y-%m-%d')
-            end_date = datetime.strptime(f"{cur_date.year + 1}-08-31", '%Y-%m-%d')
+    def export(self):
+        """ Exports the tournaments of the current season (csv, json, html) next to the player database. The archive
+        is streamed on a background thread, hence, the screen stays responsive for large archives.
+        """
+        self.export_button.disabled = True
+
+        output_directory = os.path.join(os.path.dirname(self._storage_path), 'export')
+        start_date, end_date = get_season()
 
-        # extract ranking from the stored tournament history
-        season_ranking = {}
-        for file in glob.glob(self._storage_path + '/*.txt'):
-            file_date = datetime.strptime(os.path.basename(file).rstrip(".txt"), '%Y-%m-%d')
+        threading.Thread(target=self._export, args=(self._storage_path, output_directory, start_date, end_date),
+                         name='Export', daemon=True).start()
 
-            if file_date < start_date or file_date > end_date:
-                continue
+    def _export(self, storage_path, output_directory, start_date, end_date):
+        try:
+            export_archive(storage_path, output_directory, start_date, end_date)
+            title, text = 'Export abgeschlossen', f'Die Turniere der Saison wurden exportiert nach:\n{output_directory}'
+        except (OSError, ValueError) as e:
+            print(f"Warning: export failed: {e}")
+            title, text = 'Export fehlgeschlagen', str(e)
 
-            with open(file, 'r') as tournament:
-                ranking_found = False
-                rank = 1
-                for line in tournament:
-                    # skip all lines before the ranking
-                    if not ranking_found and not line.startswith('Ranking'):
-                        continue
+        # widgets must only be changed on the main thread
+        Clock.schedule_once(lambda dt: self._on_export_finished(title, text), 0)
 
-                    ranking_found = True
+    def _on_export_finished(self, title, text):
+        self.export_button.disabled = False
+        Popup(title=title, content=Label(text=text, halign='left'), size_hint=(0.8, 0.4)).open()
 
-                    if line[0].isdigit():
-                        # extract name (a bit more complicated since the text files have initially only been intended
-                        # as backup with a focus on human readability)
-                        player_name = line.split('.')[-1].lstrip().split(':')[0].rstrip(string.digits).rstrip()
-                        if player_name not in season_ranking:
-                            season_ranking[player_name] = SeasonRanking()
-                            season_ranking[player_name].placement_histogram = [0] * CONSIDERED_RANKS
 
-                        if rank <= 5:
-                            season_ranking[player_name].total_points += CONSIDERED_RANKS + 1 - rank
-                            season_ranking[player_name].placement_histogram[rank - 1] += 1
+    def _calibrate_handicaps(self, calibration, storage_path, all_players):
+        # handicaps fitted to the point differences of all stored sets (including today's tournament)
+        try:
+            proposals = {p.name: p for p in calibrate_handicaps(storage_path, all_players)}
+        except (OSError, ValueError) as e:
+            print(f"Warning: handicaps could not be calibrated: {e}")
+            proposals = {}
 
-                        rank += 1
+        # the player database itself is never changed, the proposal is stored next to it
+        path = os.path.join(os.path.dirname(storage_path), 'handicap_vorschlag.json')
+        try:
+            write_atomically(path, json.dumps(propose_player_database(all_players, list(proposals.values())),
+                                              indent=4, ensure_ascii=False))
+        except OSError as e:
+            print(f"Warning: handicap proposal could not be written: {e}")
 
-        # sort the dict based on total points
-        sorted_dict = OrderedDict(sorted(season_ranking.items(), key=lambda elem: elem[1].total_points, reverse=True))
+        # widgets must only be changed on the main thread
+        Clock.schedule_once(lambda dt: self._on_calibration_finished(calibration, proposals), 0)
 
-        return sorted_dict
+    def _on_calibration_finished(self, calibration, proposals):
+        # the screen may have been left and entered again in the meantime
+        if calibration is not self._calibration:
+            return
 
+        self._handicap_proposals = proposals
 
+        if self._add_handicap_rows is not None:
+            self._add_handicap_rows(proposals)
+
+    def _add_handicap_proposals(self, ranking, row_height, spacing, text_size, heading_text_size):
+        self.box_layout.add_widget(Label(text=f'[b][size={heading_text_size}][/size][/b]', markup=True,
+                                         halign='left', valign='bottom', size_hint=(1, None), height=2*row_height))
+        self.box_layout.add_widget(Label(text=f'[b][size={heading_text_size}]Handicap-Vorschlag[/size][/b]',
+                                         markup=True, halign='left', valign='bottom', size_hint=(1, None),
+                                         height=row_height))
+
+        layout = GridLayout(cols=4, rows=len(ranking) + 1, spacing=spacing, size_hint_y=None, size_hint_x=1,
+                            height=(row_height + spacing) * (len(ranking) + 1))
+
+        for heading in ['Spieler', 'Handicap', 'Vorschlag', 'Sätze']:
+            layout.add_widget(Label(text=f'[b][size={text_size}]{heading}[/size][/b]', markup=True, halign='left',
+                                    valign='bottom', size_hint=(1, None), height=row_height))
+
+        def add_rows(proposals):
+            for p in ranking:
+                proposal = proposals.get(p.name)
+                num_sets = 0 if proposal is None else proposal.num_sets
+                proposed_handicap = '-' if num_sets < MIN_SETS else f'{proposal.proposed_handicap}'
+
+                for text in [p.display_name, p.handicap, proposed_handicap, num_sets]:
+                    layout.add_widget(Label(text=f'[size={text_size}]{text}[/size]', markup=True, halign='left',
+                                            valign='bottom', size_hint=(1, None), height=row_height))
+
+        # the rows are added as soon as the calibration has finished
+        if self._handicap_proposals is None:
+            self._add_handicap_rows = add_rows
+        else:
+            self._add_handicap_rows = None
+            add_rows(self._handicap_proposals)
+
+        self.box_layout.add_widget(layout)
+
+    @timed('results_window.update_visualization')
     def update_visualization(self):
         # constants
         spacing = 0
@@ -181,9 +160,6 @@ class ResultsWindow(Screen):
 
         ranking = self._tournament.get_ranking()
 
-        # extract more detailed information not included in the ranking
-        player_statistics = self._extract_statistics()
-
         self.box_layout.clear_widgets()
         self.box_layout.add_widget(Label(text=f'[b][size={heading_text_size}]Heutiges Turnier[/size][/b]', markup=True,
                                          halign='left', valign='bottom', size_hint=(1, None), height=row_height))
@@ -191,7 +167,7 @@ class ResultsWindow(Screen):
                                          halign='left', valign='bottom', size_hint=(1, None), height=row_height))
         
         
-        layout = GridLayout(cols=8, rows=len(ranking) + 1, spacing=spacing, size_hint_y=None, size_hint_x=1,
+        layout = GridLayout(cols=9, rows=len(ranking) + 1, spacing=spacing, size_hint_y=None, size_hint_x=1,
                                       height=(row_height + spacing) * (len(ranking) + 1))
 
         layout.add_widget(
@@ -207,6 +183,8 @@ class ResultsWindow(Screen):
                                 valign='bottom', size_hint=(1, None), height=row_height))
         layout.add_widget(Label(text=f'[b][size={text_size}]BHZ[/size][/b]', markup=True, halign='left',
                                 valign='bottom', size_hint=(1, None), height=row_height))
+        layout.add_widget(Label(text=f'[b][size={text_size}]Wertung[/size][/b]', markup=True, halign='left',
+                                valign='bottom', size_hint=(1, None), height=row_height))
         layout.add_widget(Label(text=f'[b][size={text_size}]mittl. Diff. +[/size][/b]', markup=True, halign='left',
                                 valign='bottom', size_hint=(1, None), height=row_height))
         layout.add_widget(Label(text=f'[b][size={text_size}]mittl. Diff. -[/size][/b]', markup=True, halign='left',
@@ -215,7 +193,8 @@ class ResultsWindow(Screen):
         bye_offset = self._tournament.num_sets_for_win()
 
         for i, p in enumerate(ranking, 1):
-            statistics = player_statistics[p.id]
+            # more detailed information not included in the ranking (maintained along with the tie-breaks)
+            statistics = self._tournament.get_player_statistics(p.id)
 
             avg_diff_won_str = "-"
             avg_diff_lost_str = "-"
@@ -246,6 +225,9 @@ class ResultsWindow(Screen):
                                     markup=True, halign='left', valign='bottom', size_hint=(1, None), height=row_height))
             layout.add_widget(Label(text=f'[size={text_size}]{p.buchholz}[/size]',  markup=True, halign='left',
                                     valign='bottom', size_hint=(1, None), height=row_height))
+            layout.add_widget(Label(text=f'[size={text_size}]{self._ratings.get_rating(p.name):.0f} '
+                                         f'({self._ratings.get_change(p.name):+.0f})[/size]', markup=True,
+                                    halign='left', valign='bottom', size_hint=(1, None), height=row_height))
             layout.add_widget(Label(text=f'[size={text_size}]{avg_diff_won_str}[/size]', markup=True, halign='left',
                                     valign='bottom', size_hint=(1, None), height=row_height))
             layout.add_widget(Label(text=f'[size={text_size}]{avg_diff_lost_str}[/size]', markup=True, halign='left',
@@ -253,6 +235,8 @@ class ResultsWindow(Screen):
 
         self.box_layout.add_widget(layout)
 
+        self._add_handicap_proposals(ranking, row_height, spacing, text_size, heading_text_size)
+
         # accumulated ranking over all tournaments in the current season (september - august of next year)
         # --> points are assigned for the first CONSIDERED_RANKS places (points = CONSIDERED_RANKS + 1 - place)
         season_ranking = self._extract_season_ranking()
@@ -2,6 +2,7 @@ import math
 import os
 import json
 
+from kivy.app import App
 from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.label import Label
 from kivy.uix.button import Button
@@ -12,10 +13,9 @@ from kivy.uix.popup import Popup
 from kivy.properties import ObjectProperty, StringProperty, ListProperty
 from kivy.clock import Clock
 
-from plyer import filechooser
-
 from settings import GameMode, Settings
 from model.data_classes import Player
+from model.profiling import timed
 
 
 def request_access_to_all_files():
@@ -34,6 +34,14 @@ def request_access_to_all_files():
         mActivity.startActivity(intent)
 
 
+def parse_count(text: str) -> int:
+    """ Number of an input field with `input_filter: 'int'` (which still allows e.g. '-' or negative numbers). """
+    try:
+        return max(0, int(text))
+    except ValueError:
+        return 0
+
+
 class SettingsWindow(Screen):
     player_path_label = ObjectProperty(None)
     scroll_view = ObjectProperty(None)
@@ -52,24 +60,27 @@ class SettingsWindow(Screen):
         self._all_players = None
         self._player_toggle_buttons = []
 
-        # set up a folder for storing information between different app runs
-        if os.path.exists('/storage/self/'):
-            # seems to be an android system
+        # folder for storing information between different app runs
+        self._is_android = os.path.exists('/storage/self/')
+
+        if self._is_android:
             self._settings.storage_path = '/storage/self/primary/Documents/handicap_tournament'
+        else:
+            self._settings.storage_path = './runtime_storage'
 
+        # has to be delayed as otherwise the connection to the kv labels is not yet available (also keeps the
+        # file system accesses out of the app startup)
+        Clock.schedule_once(self.initial_loading, 0)
+
+    def initial_loading(self, _):
+        if self._is_android:
             # necessary to be able to write to documents
             request_access_to_all_files()
-        else:
-            self._settings.storage_path = './runtime_storage'
 
         os.makedirs(self._settings.storage_path, exist_ok=True)
         os.makedirs(os.path.join(self._settings.storage_path, 'players'), exist_ok=True)
         os.makedirs(os.path.join(self._settings.storage_path, 'tournaments'), exist_ok=True)
 
-        # has to be delayed as otherwise the connection to the kv labels is not yet available
-        Clock.schedule_once(self.initial_loading, 0)
-
-    def initial_loading(self, _):
         # try loading the first player file
         path = os.path.join(self._settings.storage_path, 'players')
 
@@ -81,7 +92,14 @@ class SettingsWindow(Screen):
     def get_settings(self):
         return self._settings
 
+    def get_all_players(self):
+        # whole player database (not only the selected players), e.g. the initial ratings of all archived players
+        return self._all_players or []
+
     def show_load(self):
+        # plyer is only needed once the file dialog is opened
+        from plyer import filechooser
+
         filechooser.open_file(on_selection=self.load, path=self._settings.storage_path)
 
     def load(self, paths):
@@ -113,7 +131,7 @@ class SettingsWindow(Screen):
         self.update_player_selection()
 
     def save_settings(self):
-        self.get_root_window().manager.current = 'tournament'
+        self.manager.tournaments.show_active()
 
     def update_handicap_buttons(self, toggled_button, connected_button, state):
         # we want to ignore clicks that toggle a button from 'down' back to 'normal' as this should be triggered by
@@ -138,6 +156,51 @@ class SettingsWindow(Screen):
 
         self._settings.match_mode = GameMode(num_sets)
 
+    def update_score_server_buttons(self, toggled_button, connected_button, state):
+        # we want to ignore clicks that toggle a button from 'down' back to 'normal' as this should be triggered by
+        # clicking on the other button
+        if toggled_button.state == 'normal':
+            toggled_button.state = 'down'
+            connected_button.state = 'normal'
+        else:
+            connected_button.state = 'normal'
+
+        self._settings.score_server_enabled = state
+
+    def update_scoreboard_buttons(self, toggled_button, connected_button, state):
+        if toggled_button.state == 'normal':
+            toggled_button.state = 'down'
+            connected_button.state = 'normal'
+        else:
+            connected_button.state = 'normal'
+
+        self._settings.scoreboard_enabled = state
+
+    def update_seeding_buttons(self, toggled_button, connected_button, state):
+        if toggled_button.state == 'normal':
+            toggled_button.state = 'down'
+            connected_button.state = 'normal'
+        else:
+            connected_button.state = 'normal'
+
+        self._settings.optimized_seeding = state
+
+    def update_overlay_buttons(self, toggled_button, connected_button, state):
+        if toggled_button.state == 'normal':
+            toggled_button.state = 'down'
+            connected_button.state = 'normal'
+        else:
+            connected_button.state = 'normal'
+
+        self._settings.performance_overlay = state
+        App.get_running_app().show_performance_overlay(state)
+
+    def update_num_tables(self, text):
+        self._settings.num_tables = parse_count(text)
+
+    def update_rolling_rounds(self, text):
+        self._settings.rolling_rounds = parse_count(text)
+
     def update_system_buttons(self, toggled_button, connected_button, system):
         # we want to ignore clicks that toggle a button from 'down' back to 'normal' as this should be triggered by
         # clicking on the other button
@@ -149,6 +212,7 @@ class SettingsWindow(Screen):
 
         self.update_selected_players(None)
 
+    @timed('settings_window.update_player_selection')
     def update_player_selection(self):
         spacing = 0
         row_height = 100
@@ -0,0 +1,153 @@
+""" Several tournaments running in parallel within one app instance (e.g. A and B class on big evenings).
+
+Each tournament has its own screen (`TournamentWindow`) with its own settings, history and files, the game overview
+and the results always show the active one. Everything that does not belong to a single tournament is shared instead
+of being loaded once per tournament: the player database (settings screen), the background writer (one thread for all
+files) and the rating store of the archive.
+
+Only the active tournament is drawn, the others are not updated until they are shown again (except for results
+submitted via their score server).
+"""
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.popup import Popup
+
+import startup_timing
+
+
+class TournamentRegistry:
+    def __init__(self, manager):
+        self._manager = manager
+
+        # screen names of the tournaments in the order they have been started (the first one is 'tournament')
+        self._names = []
+        self.active_name = None
+
+        # the next confirmation of the settings starts a further tournament
+        self._new_requested = False
+
+        self._writer = None
+
+        # tournaments folder -> rating store (see `load_match_store`)
+        self._match_stores = {}
+
+        # tournaments folders whose old text reports have been converted (see `prepare_archive`)
+        self._prepared_archives = set()
+
+    def __len__(self):
+        return len(self._names)
+
+    def get_all(self) -> list:
+        return [self._manager.get_screen(name) for name in self._names]
+
+    def get_active(self):
+        """ Screen of the active tournament (None as long as no tournament has been started). """
+        if self.active_name is None:
+            return None
+
+        return self._manager.get_screen(self.active_name)
+
+    def get_index(self, name: str) -> int:
+        return self._names.index(name)
+
+    def get_title(self, name: str) -> str:
+        return f'Turnier {self.get_index(name) + 1}'
+
+    def get_file_suffix(self, name: str) -> str:
+        # the first tournament of a day keeps the plain file name (see model/archive.py)
+        index = self.get_index(name)
+        return '' if index == 0 else f'_{index + 1}'
+
+    def request_new(self):
+        """ Opens the settings, the next confirmation starts a further tournament. """
+        self._new_requested = True
+
+        self._manager.transition.direction = 'right'
+        self._manager.current = 'settings'
+
+    def show_active(self):
+        """ Called once the settings have been confirmed. """
+        if self.active_name is None or self._new_requested:
+            self._new_requested = False
+            self.active_name = self._create()
+
+        self._manager.transition.direction = 'left'
+        self._manager.current = self.active_name
+
+    def activate(self, name: str):
+        self.active_name = name
+
+        self._manager.transition.direction = 'up'
+        self._manager.current = name
+
+    def show_selection(self):
+        """ Popup to switch between the tournaments or to start a further one. """
+        layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        popup = Popup(title='Turniere', content=layout, size_hint=(0.6, 0.2 + 0.1 * len(self._names)))
+
+        def on_release(callback, *args):
+            popup.dismiss()
+            callback(*args)
+
+        for screen in self.get_all():
+            button = Button(text=f'[size=25]{screen.get_summary()}[/size]', markup=True,
+                            disabled=screen.name == self.active_name)
+            button.bind(on_release=lambda _, name=screen.name: on_release(self.activate, name))
+            layout.add_widget(button)
+
+        button = Button(text='[size=25]Weiteres Turnier starten[/size]', markup=True)
+        button.bind(on_release=lambda _: on_release(self.request_new))
+        layout.add_widget(button)
+
+        popup.open()
+
+    def get_writer(self):
+        # the model (and its heavy dependencies) is only imported once the first tournament is started
+        if self._writer is None:
+            from model.persistence import DebouncedFileWriter
+
+            self._writer = DebouncedFileWriter()
+
+        return self._writer
+
+    def prepare_archive(self, directory: str):
+        """ Converts the old text reports once before the first tournament reads the archive (afterwards, it is only
+        read, e.g. by the export on a background thread).
+        """
+        if directory in self._prepared_archives:
+            return
+
+        from model.archive import convert_text_archive
+
+        self._prepared_archives.add(directory)
+        convert_text_archive(directory)
+
+    def get_match_store(self, directory: str):
+        # the store only contains the tournaments before today, hence, it is the same for all tournaments of the day
+        if directory not in self._match_stores:
+            from model.rating import load_match_store
+
+            self._match_stores[directory] = load_match_store(directory)
+
+        return self._match_stores[directory]
+
+    def flush_storage(self):
+        # each tournament writes its outdated record first
+        for screen in self.get_all():
+            screen.flush_storage()
+
+    def stop_servers(self):
+        for screen in self.get_all():
+            screen.stop_server()
+
+    def _create(self) -> str:
+        # imported on demand as the tournament window imports the heavy dependencies (e.g. networkx)
+        from gui.tournament_window import TournamentWindow
+
+        name = 'tournament' if len(self._names) == 0 else f'tournament_{len(self._names) + 1}'
+        self._names.append(name)
+
+        self._manager.add_widget(TournamentWindow(name=name))
+        startup_timing.mark(f"screen '{name}' constructed")
+
+        return name
@@ -1,3 +1,5 @@
+import copy
+import json
 import math
 import os
 
@@ -7,10 +9,22 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.image import Image
 from kivy.uix.textinput import TextInput
 from kivy.uix.label import Label
+from kivy.uix.popup import Popup
 from kivy.properties import ObjectProperty
+from kivy.clock import Clock
 
 from model.swiss_system import Tournament
+from model.archive import get_record_path, read_previous_pairings, record_from_tournament
+from model.bulk_import import import_results
 from model.data_classes import GameMode, Score
+from model.history import TournamentHistory
+from model.profiling import measure, timed
+from model.rating import RatingEngine
+from model.seeding import PortfolioSeeding, default_metrics
+from model.table_scheduler import TableScheduler
+from server.http_server import DEFAULT_PORT, HttpServer
+from server.score_server import ScoreServer
+from server.scoreboard import Scoreboard
 
 from datetime import datetime
 
@@ -58,7 +72,7 @@ class SetResultInput(TextInput):
 
 
 class MatchWidget(BoxLayout):
-    def __init__(self, parent, match):
+    def __init__(self, parent, match, number=None):
         super(MatchWidget, self).__init__(orientation='vertical', padding=0, spacing=0)
         self._parent = parent
         self._match = match
@@ -95,7 +109,9 @@ class MatchWidget(BoxLayout):
         self._center_layout.add_widget(self._set_label)
         self._center_layout.add_widget(self._right_image)
 
-        self._top_spacer = Label(text='', size_hint=(1, 0.03))
+        # without tables, the results of the bulk import refer to the number of the match
+        number_str = '' if number is None else f'[size=20]Nr. {number}[/size]'
+        self._top_spacer = Label(text=number_str, markup=True, size_hint=(1, 0.03))
         self._spacer = Label(text='', size_hint=(1, 0.03))
         self._bottom_spacer = Label(text='', size_hint=(1, 0.1))
         self._left_spacer = Label(text='', size_hint=(0.05, 0.05), width=5)
@@ -141,7 +157,30 @@ class MatchWidget(BoxLayout):
     def is_match_finished(self):
         return self._match.is_finished()
 
-    def update(self):
+    def get_match(self):
+        return self._match
+
+    def set_table(self, table):
+        if self._match.is_finished():
+            self._top_spacer.text = ''
+        elif table is None:
+            self._top_spacer.text = '[size=20]wartet auf Tisch[/size]'
+        else:
+            self._top_spacer.text = f'[size=20]Tisch {table}[/size]'
+
+    def load_results(self):
+        # results that have been changed outside of the widget (i.e. entered on a player's device)
+        for i, result in enumerate(self._match.set_results):
+            if result is None:
+                self._text_inputs[i].text = ''
+                self._text_inputs[i].disabled = True
+            else:
+                self._text_inputs[i].text = Score.to_str(result)
+                self._text_inputs[i].disabled = False
+
+        self.update(notify=False)
+
+    def update(self, notify=True):
         # update match instance
         was_finished = self._match.is_finished()
 
@@ -178,7 +217,9 @@ class MatchWidget(BoxLayout):
 
         self._set_label.text = f'[size={self._set_size}]{sets_won} : {sets_lost}[/size]'
 
-        self._parent.check_for_updates(match_finished=self.is_match_finished() or was_finished)
+        if notify:
+            self._parent.record_results([self._match])
+            self._parent.check_for_updates(match_finished=self.is_match_finished() or was_finished)
 
 
 class TournamentWindow(Screen):
@@ -188,6 +229,10 @@ class TournamentWindow(Screen):
     next_round_button = ObjectProperty(None)
     finish_tournament_button = ObjectProperty(None)
     game_overview_button = ObjectProperty(None)
+    server_label = ObjectProperty(None)
+    undo_button = ObjectProperty(None)
+    redo_button = ObjectProperty(None)
+    regenerate_round_button = ObjectProperty(None)
 
     def __init__(self, **kwargs):
         super(TournamentWindow, self).__init__(**kwargs)
@@ -199,19 +244,69 @@ class TournamentWindow(Screen):
         self._player_string = None
         self._finished_matches_string = ""
         self._ranking_string = ""
+        self._ranking = []
         self._settings_string = ""
         self._max_player_name_len = 0
+        self._table_scheduler = None
+        self._history = None
+        self._ratings = None
+        self._http_server = None
+        self._score_server = None
+        self._score_server_event = None
+        self._scoreboard = None
+
+        # avoids nested pairings while the match widgets are rebuilt
+        self._pairing_trigger = Clock.create_trigger(self.pair_free_players)
+
+        # score edits arrive in bursts, hence, the text file is written in the background (shared by all tournaments)
+        self._writer = None
+
+        # the structured record is only rebuilt once a match has finished or the files are flushed (see `write_record`)
+        self._record_outdated = False
+
+        # the last generation of the next round has failed (see `generate_next_round`)
+        self._no_valid_draw = False
 
     def on_pre_enter(self):
         if self._settings is None:
-            self._settings = self.parent.ids['settings_window'].get_settings()
+            registry = self.manager.tournaments
+
+            # the settings screen is reused for further tournaments, hence, the tournament keeps a copy
+            self._settings = copy.copy(self.manager.get_screen('settings').get_settings())
+            self._settings.players = list(self._settings.players)
+
+            self._writer = registry.get_writer()
+
+            # file for storing the tournament data (further tournaments of the same day with a suffix)
+            self._date = datetime.today().date()
+            suffix = registry.get_file_suffix(self.name)
+            self._file_path = os.path.join(self._settings.storage_path,
+                                           f"tournaments/{self._date.strftime('%Y-%m-%d')}{suffix}.txt")
+
+            # structured record next to the text report, read by all analytics (see model/archive.py)
+            self._record_path = get_record_path(os.path.dirname(self._file_path), self._date, suffix)
+            registry.prepare_archive(os.path.dirname(self._file_path))
+
+            seeding = None
+            if self._settings.optimized_seeding:
+                previous_pairings = read_previous_pairings(os.path.dirname(self._file_path))
+                seeding = PortfolioSeeding(default_metrics(self._settings.handicap_enabled, previous_pairings))
+
             self._tournament = Tournament(self._settings.match_mode, self._settings.players,
-                                          self._settings.handicap_enabled)
+                                          self._settings.handicap_enabled,
+                                          rolling_rounds=self._settings.rolling_rounds, seeding=seeding)
             self._tournament.generate_next_round()
 
-            # file for storing the tournament data
-            self._file_path = os.path.join(self._settings.storage_path,
-                                           f"tournaments/{datetime.today().strftime('%Y-%m-%d')}.txt")
+            # undo / redo of result entries and generated rounds
+            self._history = TournamentHistory(self._tournament)
+
+            # ratings learned from the stored tournaments (only read once, cached within the tournaments folder)
+            all_players = self.manager.get_screen('settings').get_all_players() + self._settings.players
+            self._ratings = RatingEngine(registry.get_match_store(os.path.dirname(self._file_path)),
+                                         initial_ratings={p.name: p.ttr for p in all_players})
+
+            if self._settings.num_tables > 0:
+                self._table_scheduler = TableScheduler(self._tournament, self._settings.num_tables)
 
             self._max_player_name_len = max(len(p.name) for p in self._settings.players)
 
@@ -220,8 +315,16 @@ class TournamentWindow(Screen):
                 self._player_string += f"{p.name.ljust(self._max_player_name_len)}, TTR: {p.ttr}, {p.handicap}\n"
 
             self._settings_string = f"Handicap: {self._settings.handicap_enabled}\n"
+            if self._tournament.is_rolling():
+                self._settings_string += f"Rollierend: {self._settings.rolling_rounds} Runden\n"
+
+            if self._settings.score_server_enabled or self._settings.scoreboard_enabled:
+                self.start_server()
 
             self.update_visualization()
+        else:
+            # further tournaments may have been started in the meantime
+            self.update_round_label()
 
 
     def generate_next_round(self):
@@ -231,30 +334,44 @@ class TournamentWindow(Screen):
                 # shouldn't occur as button is only enabled once all games have been finished
                 return
 
-        self.game_overview_button.disabled = False
+        state = self._tournament.get_state()
 
-        # add finished matches to the pre-generated string for updating the text output
-        self._finished_matches_string += f"\nRunde: {self._tournament.get_current_round()}\n"
+        if not self._tournament.generate_next_round():
+            # the model is left unchanged (restored nevertheless, the snapshot is cheap), another attempt would fail
+            # as well until the results have been changed (undo)
+            print("Warning: no pairings could be generated for the next round")
+            self._tournament.restore_state(state)
 
-        for m in self._tournament.get_running_matches():
-            self._finished_matches_string += f" - {m.first_player_name.ljust(self._max_player_name_len)} vs. {m.second_player_name.ljust(self._max_player_name_len)} | {m.sets_won()}:{m.sets_lost()} | "
-            for result in m.set_results:
-                if result is None:
-                    break
+            self._no_valid_draw = True
+            self.next_round_button.disabled = True
 
-                self._finished_matches_string += f" {Score.to_str(result).replace(' ', '')}"
+            Popup(title='Keine weitere Runde möglich',
+                  content=Label(text='Die verbleibenden Spieler haben bereits gegeneinander gespielt.\n'
+                                     'Das Turnier kann beendet werden.', halign='center'),
+                  size_hint=(0.6, 0.4)).open()
+            return
 
-            self._finished_matches_string += '\n'
+        self._history.record_round(state)
+        self._record_outdated = True
+
+        self.game_overview_button.disabled = False
+
+        # add finished matches to the pre-generated string for updating the text output
+        self._finished_matches_string += self._round_string(state.round_count, state.round_matches)
 
-        self._tournament.generate_next_round()
         self.update_visualization()
 
+        # ensure that the finished round is on disk before the next one starts
+        self.flush_storage()
+
         self.next_round_button.disabled = True
         self.finish_tournament_button.disabled = True
 
+    @timed('tournament_window.check_for_updates')
     def check_for_updates(self, match_finished):
         if match_finished:
             self.update_ranking_visualization()
+            self.update_table_assignment()
 
         # check whether we can enable the button for the next round
         all_finished = True
@@ -264,33 +381,244 @@ class TournamentWindow(Screen):
                 break
 
         # with n players we can play at most n-1 round if not pairing should occur twice...
-        if self._tournament.get_current_round() < self._tournament.get_max_number_of_rounds():
+        if self._tournament.is_rolling():
+            # new pairings are generated automatically as soon as players are available
+            self.next_round_button.disabled = True
+
+            if match_finished:
+                self._pairing_trigger()
+        elif self._tournament.get_current_round() < self._tournament.get_max_number_of_rounds() and \
+                not self._no_valid_draw:
             self.next_round_button.disabled = not all_finished
         else:
             self.next_round_button.disabled = True
 
         self.finish_tournament_button.disabled = not all_finished or self._tournament.get_current_round() == 1
 
-        # store current state in text file
-        open_matches_string = f"\nRunde: {self._tournament.get_current_round()}\n"
+        self.update_history_buttons()
+
+        # finished matches are rated immediately (a single set does not change the ratings)
+        if match_finished:
+            self.sync_ratings()
+
+        # store current state in text file (the actual write happens on the writer thread, see 'file_write')
+        with measure('check_for_updates.write'):
+            if self._tournament.is_rolling():
+                # running matches may belong to different rounds
+                matches_string = ''.join(self._round_string(round_number, matches) for round_number, matches
+                                         in enumerate(self._tournament.get_all_matches(), 1))
+            else:
+                matches_string = self._finished_matches_string + self._round_string(
+                    self._tournament.get_current_round(), self._tournament.get_running_matches())
+
+            self._writer.write(self._file_path, self._settings_string + self._player_string + matches_string +
+                               self._ranking_string)
+
+        # the text report already contains each entered set, the record is only needed for the analytics
+        self._record_outdated = True
+        if match_finished:
+            self.write_record()
+
+        self.publish_results()
+
+    def sync_ratings(self):
+        # undone matches are removed again
+        self._ratings.sync([m for matches in self._tournament.get_all_matches() for m in matches])
 
-        for m in self._tournament.get_running_matches():
-            open_matches_string += f" - {m.first_player_name.ljust(self._max_player_name_len)} vs. {m.second_player_name.ljust(self._max_player_name_len)} | {m.sets_won()}:{m.sets_lost()} | "
+    @timed('tournament_window.write_record')
+    def write_record(self):
+        self._writer.write(self._record_path, json.dumps(
+            record_from_tournament(self._tournament, self._date, self._ranking), ensure_ascii=False))
+        self._record_outdated = False
+
+    def _round_string(self, round_number, matches):
+        round_string = f"\nRunde: {round_number}\n"
+
+        for m in matches:
+            round_string += f" - {m.first_player_name.ljust(self._max_player_name_len)} vs. {m.second_player_name.ljust(self._max_player_name_len)} | {m.sets_won()}:{m.sets_lost()} | "
             for result in m.set_results:
                 if result is None:
                     break
 
-                open_matches_string += f" {Score.to_str(result).replace(' ', '')}"
+                round_string += f" {Score.to_str(result).replace(' ', '')}"
+
+            round_string += '\n'
+
+        return round_string
+
+    def pair_free_players(self, *args):
+        # rolling mode: triggered (i.e. delayed to the next frame) whenever a match has been finished
+        state = self._tournament.get_state()
+        if len(self._tournament.pair_free_players()) == 0:
+            return
+
+        # undone together with the result that has triggered the pairing
+        self._history.record_round(state, merge=True)
+        self._record_outdated = True
+
+        self.game_overview_button.disabled = False
+        self.finish_tournament_button.disabled = True
+        self.update_visualization()
+
+        stalled_players = self._tournament.get_stalled_players()
+        if len(stalled_players) > 0:
+            # the bye counts as won, hence, the director has to know about it (it may still be undone)
+            text = '\n'.join(p.name for p in stalled_players)
+            Popup(title='Kein Gegner mehr frei - Freilos vergeben',
+                  content=Label(text=f"Alle verbleibenden Gegner wurden bereits gespielt:\n{text}", halign='center'),
+                  size_hint=(0.6, 0.4)).open()
+
+    def flush_storage(self):
+        # not yet started
+        if self._writer is None:
+            return
+
+        if self._record_outdated:
+            self.write_record()
 
-            open_matches_string += '\n'
+        self._writer.flush()
 
-        with open(self._file_path, 'w') as file:
-            file.write(self._settings_string)
-            file.write(self._player_string)
-            file.write(self._finished_matches_string)
-            file.write(open_matches_string)
-            file.write(self._ranking_string)
+    def record_results(self, matches):
+        self._history.record_results(matches)
 
+    def undo(self):
+        if self._history.undo():
+            self.apply_history()
+
+    def redo(self):
+        if self._history.redo():
+            self.apply_history()
+
+    def regenerate_round(self):
+        # e.g. after a result of the previous round had to be corrected
+        if self._history.undo_round():
+            self.apply_history()
+            self.generate_next_round()
+
+    def apply_history(self):
+        # a different round may be drawn from the restored state
+        self._no_valid_draw = False
+
+        # the previous rounds may have changed as well, hence, everything is rebuilt
+        self._finished_matches_string = ''.join(
+            self._round_string(round_number, matches) for round_number, matches
+            in enumerate(self._tournament.get_all_matches()[:-1], 1))
+
+        self.update_visualization()
+        self.check_for_updates(match_finished=False)
+
+        # finished matches may have been undone or restored
+        self.sync_ratings()
+        self.write_record()
+
+    def update_history_buttons(self):
+        self.undo_button.disabled = not self._history.can_undo()
+        self.redo_button.disabled = not self._history.can_redo()
+
+        # only as long as no result of the current round has been entered (byes are entered automatically)
+        players = self._tournament.get_players()
+        results_entered = any(m.set_results[0] is not None and not players[m.second_player_id].is_bye()
+                              for m in self._tournament.get_running_matches())
+
+        self.regenerate_round_button.disabled = (self._tournament.is_rolling() or results_entered or
+                                                 not self._history.can_undo_round())
+
+    def start_server(self):
+        # score entry and scoreboard share a single server (and port), further tournaments use the following ports
+        self._http_server = HttpServer(port=DEFAULT_PORT + self.manager.tournaments.get_index(self.name))
+
+        if self._settings.score_server_enabled:
+            self._score_server = ScoreServer(self._tournament, on_results_applied=self.apply_external_results,
+                                             http_server=self._http_server)
+
+        if self._settings.scoreboard_enabled:
+            self._scoreboard = Scoreboard(self._tournament, http_server=self._http_server,
+                                          table_scheduler=self._table_scheduler)
+
+        self.publish_results()
+
+        try:
+            self._http_server.start()
+        except OSError as e:
+            print(f"Warning: could not start server: {e}")
+            self._http_server = None
+            self._score_server = None
+            self._scoreboard = None
+            return
+
+        if self._score_server is not None:
+            self.server_label.text = f'[size=25]Eingabe per Handy: {self._score_server.get_url()}[/size]'
+
+            # submissions are applied by the main loop only, as kivy and the model are not thread-safe
+            self._score_server_event = Clock.schedule_interval(lambda dt: self._score_server.process_pending(), 0.25)
+        else:
+            self.server_label.text = f'[size=25]Live-Anzeige: {self._scoreboard.get_url()}[/size]'
+
+    def stop_server(self):
+        if self._http_server is None:
+            return
+
+        if self._score_server_event is not None:
+            self._score_server_event.cancel()
+
+        self._http_server.stop()
+        self._http_server = None
+        self._score_server = None
+        self._scoreboard = None
+
+    def publish_results(self):
+        if self._score_server is not None:
+            self._score_server.publish()
+
+        if self._scoreboard is not None:
+            self._scoreboard.publish()
+
+    def show_import(self):
+        # plyer is only needed once the file dialog is opened
+        from plyer import filechooser
+
+        filechooser.open_file(on_selection=self.import_results, path=self._settings.storage_path)
+
+    def import_results(self, paths):
+        if len(paths) == 0:
+            return
+
+        try:
+            with open(paths[0], 'r') as file:
+                lines = file.readlines()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Warning: could not read '{paths[0]}': {e}")
+            return
+
+        get_table = self._table_scheduler.get_table if self._table_scheduler is not None else None
+        changed_matches, errors = import_results(self._tournament, lines, get_table)
+
+        if len(errors) > 0:
+            # nothing has been applied, the file can be corrected and imported again
+            max_errors = 15
+            text = '\n'.join(f"Zeile {line_number}: {message}" for line_number, message in errors[:max_errors])
+            if len(errors) > max_errors:
+                text += f"\n... ({len(errors) - max_errors} weitere)"
+
+            Popup(title='Import fehlgeschlagen', content=Label(text=text, halign='left'), size_hint=(0.8, 0.6)).open()
+            return
+
+        self.apply_external_results(changed_matches)
+
+        # all results of the file end up on disk with a single write
+        self.flush_storage()
+
+    def apply_external_results(self, matches):
+        # results entered on the players' devices or imported from a file, the model has already been updated, hence,
+        # the ranking is simply recomputed once for all changed matches
+        for widget in self._grid_layout.children:
+            if widget.get_match() in matches:
+                widget.load_results()
+
+        self.record_results(matches)
+        self.check_for_updates(match_finished=len(matches) > 0)
+
+    @timed('tournament_window.update_match_visualization')
     def update_match_visualization(self):
         spacing = 1
         num_matches = len(self._tournament.get_running_matches())
@@ -302,11 +630,14 @@ class TournamentWindow(Screen):
         self._grid_layout = GridLayout(cols=num_cols, rows=num_rows, spacing=spacing, size_hint_y=None, size_hint_x=1,
                                        height=row_height * num_rows + num_rows * spacing)
 
-        for m in self._tournament.get_running_matches():
-            self._grid_layout.add_widget(MatchWidget(parent=self, match=m))
+        # same numbering as the bulk import (only used if there are no tables)
+        for number, m in enumerate(self._tournament.get_running_matches(), 1):
+            self._grid_layout.add_widget(MatchWidget(parent=self, match=m,
+                                                     number=number if self._table_scheduler is None else None))
 
         self.match_scroll_view.add_widget(self._grid_layout)
 
+    @timed('tournament_window.update_ranking_visualization')
     def update_ranking_visualization(self):
         # constants
         spacing = 0
@@ -316,6 +647,7 @@ class TournamentWindow(Screen):
         self._ranking_string = "\nRanking:\n"
 
         ranking = self._tournament.get_ranking()
+        self._ranking = ranking
 
         self.ranking_scroll_view.clear_widgets()
         layout = GridLayout(cols=3, rows=len(ranking) + 1, spacing=spacing, size_hint_y=None, size_hint_x=1,
@@ -340,12 +672,49 @@ class TournamentWindow(Screen):
 
         self.ranking_scroll_view.add_widget(layout)
 
+    def update_table_assignment(self):
+        if self._table_scheduler is None or self._grid_layout is None:
+            return
+
+        self._table_scheduler.update()
+
+        for widget in self._grid_layout.children:
+            widget.set_table(self._table_scheduler.get_table(widget.get_match()))
+
+        self.update_round_label()
+
+    def update_round_label(self):
+        text = f'Runde: {self._tournament.get_current_round()}'
+
+        # tournaments running in parallel have to be distinguishable
+        if len(self.manager.tournaments) > 1:
+            text = f'{self.manager.tournaments.get_title(self.name)}, {text}'
+
+        if self._table_scheduler is not None:
+            completion = datetime.fromtimestamp(self._table_scheduler.get_expected_round_completion())
+            text += f" (voraussichtliches Ende: {completion.strftime('%H:%M')})"
+
+        self.round_label.text = f'[size=25]{text}[/size]'
+
+    @timed('tournament_window.update_visualization')
     def update_visualization(self):
-        self.round_label.text = f'[size=25]Runde: {self._tournament.get_current_round()}[/size]'
+        self.update_round_label()
 
         self.update_match_visualization()
+        self.update_table_assignment()
 
         self.update_ranking_visualization()
+        self.update_history_buttons()
+
+        self.publish_results()
+
+    def get_summary(self):
+        title = self.manager.tournaments.get_title(self.name)
+        if self._tournament is None:
+            return title
+
+        return (f'{title}: Runde {self._tournament.get_current_round()}, '
+                f'{len(self._tournament.get_active_players())} Spieler')
 
     def get_played_games(self):
         return self._tournament.get_all_matches()
@@ -353,5 +722,8 @@ class TournamentWindow(Screen):
     def get_tournament(self):
         return self._tournament
 
+    def get_ratings(self):
+        return self._ratings
+
     def get_tournament_storage_path(self):
         return os.path.dirname(self._file_path)
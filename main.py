@@ -1,19 +1,107 @@
+# has to be imported first as it defines the reference point of the startup timing
+import startup_timing
+
+import importlib
+import os
+
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.screenmanager import ScreenManager
 
-# may seem unused but are required as usage is only hidden in the '.kv' file
+startup_timing.mark('kivy imported')
+
+# may seem unused but is required as usage is only hidden in the '.kv' file
 from gui.settings_window import SettingsWindow
-from gui.tournament_window import TournamentWindow
-from gui.game_overview_window import GameOverviewWindow
-from gui.results_window import ResultsWindow
+from gui.tournament_registry import TournamentRegistry
+from model.profiling import store_report
+
+# timing histograms of the critical operations, written next to the startup timing (see model/profiling.py)
+PROFILING_REPORT_NAME = 'profiling_report.json'
+
+startup_timing.mark('settings window imported')
+
+# all other screens (and their heavy dependencies like networkx) are only imported and constructed once they are
+# shown for the first time (the screens of the tournaments are created by the TournamentRegistry)
+LAZY_SCREENS = {
+    'game_overview': ('gui.game_overview_window', 'GameOverviewWindow'),
+    'results': ('gui.results_window', 'ResultsWindow'),
+}
+
 
 class WindowManager(ScreenManager):
-    pass
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        # tournaments running in parallel, the game overview and the results show the active one
+        self.tournaments = TournamentRegistry(self)
+
+    def get_screen(self, name):
+        if not self.has_screen(name) and name in LAZY_SCREENS:
+            module_name, class_name = LAZY_SCREENS[name]
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+
+            self.add_widget(screen_class())
+            startup_timing.mark(f"screen '{name}' constructed")
+
+        return super().get_screen(name)
 
 
 class TournamentApp(App):
-    pass
+    def build(self):
+        # only constructed once it is enabled within the settings
+        self._performance_overlay = None
+
+        root = super().build()
+        startup_timing.mark('app built')
+        return root
+
+    def on_start(self):
+        # called before the first frame is drawn, hence, the report is delayed until the next frame
+        Clock.schedule_once(self._report_startup_timing, 0)
+
+    def on_pause(self):
+        # android may terminate paused apps without further notice
+        self._flush_storage()
+        self.store_profiling_report()
+        return True
+
+    def on_stop(self):
+        self._flush_storage()
+        self.root.tournaments.stop_servers()
+        self.store_profiling_report()
+
+    def show_performance_overlay(self, visible: bool):
+        if self._performance_overlay is None:
+            from gui.performance_overlay import PerformanceOverlay
+
+            self._performance_overlay = PerformanceOverlay(on_dump=self.store_profiling_report)
+
+        if visible:
+            self._performance_overlay.show()
+        else:
+            self._performance_overlay.hide()
+
+    def store_profiling_report(self):
+        storage_path = self.root.get_screen('settings').get_settings().storage_path
+        startup = {label: round(elapsed * 1000, 1) for label, elapsed in startup_timing.get_marks()}
+
+        try:
+            store_report(os.path.join(storage_path, PROFILING_REPORT_NAME), {'startup_ms': startup})
+        except OSError as e:
+            print(f"Warning: could not store profiling report: {e}")
+
+    def _flush_storage(self):
+        self.root.tournaments.flush_storage()
+
+    def _report_startup_timing(self, _):
+        startup_timing.mark('first frame')
+        print(startup_timing.report())
+
+        try:
+            startup_timing.store_report(self.root.get_screen('settings').get_settings().storage_path)
+        except OSError as e:
+            print(f"Warning: could not store startup timing: {e}")
 
 
 if __name__ == '__main__':
-    TournamentApp().run()
\ No newline at end of file
+    TournamentApp().run()
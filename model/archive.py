@@ -0,0 +1,345 @@
+""" Archive of the stored tournaments (one file per tournament within the tournaments folder, see TournamentWindow).
+
+The files are named after the day of the tournament, further tournaments of the same day (running in parallel) get a
+suffix, e.g. 2024-01-26.txt and 2024-01-26_2.txt.
+
+Each tournament is stored as human readable text report and as structured record (json), e.g.:
+    Runde: 1
+     - Max Mustermann    vs. Erika Musterfrau  | 2:1 |  11:5 8:11 11:7
+
+    {"format": 1, "date": "2024-01-26", "game_mode": 2, "with_handicaps": true, "rolling_rounds": 0,
+     "players": [{"id": 0, "name": "Max Mustermann", "ttr": 1500, "handicap": 2, ...}, ...],
+     "rounds": [[{"first": 0, "second": 1, "start_offset": 1, "sets": [[11, 5], [8, 11], [11, 7]]}, ...], ...],
+     "ranking": [1, 0, ...]}
+
+The players are referenced by their id, matches against the bye have no second player. Matches decided by the
+withdrawal of a player are marked with "walkover": true (the remaining sets are recorded as 11:0). All analytics read
+the records (`iter_records`), the text reports of older tournaments are converted once (`convert_text_archive`).
+"""
+import glob
+import json
+import os
+import re
+
+from datetime import date, datetime
+from typing import Iterator, List
+
+from model.data_classes import Score
+
+MATCH_PATTERN = re.compile(r'^ - (.+?) vs\. (.+?) \| (\d+):(\d+) \|(.*)$')
+ROUND_PATTERN = re.compile(r'^Runde: (\d+)$')
+PARTICIPANT_PATTERN = re.compile(r'^(.+?)\s*, TTR: (-?\d+), (-?\d+)$')
+HANDICAP_PATTERN = re.compile(r'^Handicap: (True|False)$')
+ROLLING_PATTERN = re.compile(r'^Rollierend: (\d+) Runden$')
+RANKING_PATTERN = re.compile(r'^(\d+)\.\s+(.+?)\s+(\d+):(\d+) \(B: -?\d+\)$')
+FILE_NAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})(_\d+)?$')
+
+BYE_NAME = 'Freilos'
+
+RECORD_FORMAT = 1
+
+
+def get_file_date(path: str) -> date or None:
+    """ Day of the tournament stored within the given file (None if the file is not part of the archive). """
+    found = FILE_NAME_PATTERN.match(os.path.splitext(os.path.basename(path))[0])
+    if found is None:
+        return None
+
+    try:
+        return datetime.strptime(found.group(1), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def list_tournament_files(directory: str, extension: str = '.txt') -> List[tuple]:
+    """ (date, path) of all stored tournaments, oldest first (tournaments of the same day in the order of their
+    suffix).
+    """
+    files = []
+
+    for path in glob.glob(os.path.join(directory, '*' + extension)):
+        file_date = get_file_date(path)
+        if file_date is None:
+            continue
+
+        # without suffix first, i.e. sorted by the number of the suffix
+        suffix = os.path.splitext(os.path.basename(path))[0][len('YYYY-MM-DD_'):]
+        files.append((file_date, int(suffix or 0), path))
+
+    return [(file_date, path) for file_date, _, path in sorted(files)]
+
+
+def read_matches(path: str, include_bye: bool = False) -> List[tuple]:
+    """ (round, first name, second name, sets won, sets lost, set results e.g. ['11:5', '8:11']) of all matches within
+    the given text report, in the order of the file (matches against the bye are skipped by default).
+    """
+    matches = []
+    round_number = 0
+
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+
+            found = ROUND_PATTERN.match(line)
+            if found is not None:
+                round_number = int(found.group(1))
+                continue
+
+            found = MATCH_PATTERN.match(line)
+            if found is None:
+                continue
+
+            first_name = found.group(1).strip()
+            second_name = found.group(2).strip()
+
+            if not include_bye and BYE_NAME in (first_name, second_name):
+                continue
+
+            matches.append((round_number, first_name, second_name, int(found.group(3)), int(found.group(4)),
+                            found.group(5).split()))
+
+    return matches
+
+
+def read_participants(path: str) -> tuple:
+    """ Whether the handicaps have been enabled and name -> (ttr, handicap) of the participants of the given report. """
+    with_handicaps = False
+    participants = {}
+
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+
+            found = HANDICAP_PATTERN.match(line)
+            if found is not None:
+                with_handicaps = found.group(1) == 'True'
+                continue
+
+            # the participants are listed before the first round
+            if ROUND_PATTERN.match(line) is not None:
+                break
+
+            found = PARTICIPANT_PATTERN.match(line)
+            if found is not None:
+                participants[found.group(1)] = (int(found.group(2)), int(found.group(3)))
+
+    return with_handicaps, participants
+
+
+def get_set_points(result: float) -> List[int]:
+    """ Points of both players, e.g. [11, 5] for 5.0 and [0, 11] for -0.0. """
+    return [int(points) for points in Score.to_str(result).split(' : ')]
+
+
+def record_from_tournament(tournament, day: date, ranking: List = None) -> dict:
+    """ Structured record of the given tournament (ranking: players as returned by `Tournament.get_ranking`). """
+    players = tournament.get_players()
+
+    def match_record(match):
+        second = players[match.second_player_id]
+
+        record = {
+            'first': match.first_player_id,
+            'second': None if second.is_bye() else second.id,
+            'start_offset': match.start_offset,
+            'sets': [get_set_points(r) for r in match.set_results if r is not None],
+        }
+
+        # the sets are not (or only partially) played, i.e. they do not tell anything about the strength of the players
+        if match.walkover:
+            record['walkover'] = True
+
+        return record
+
+    return {
+        'format': RECORD_FORMAT,
+        'date': day.isoformat(),
+        'game_mode': tournament.num_sets_for_win(),
+        'with_handicaps': tournament.has_handicaps(),
+        'rolling_rounds': tournament.get_rolling_rounds(),
+        'players': [dict(p, id=p.id) for p in players if not p.is_bye()],
+        'withdrawn': [p.id for p in players if tournament.is_withdrawn(p.id)],
+        'rounds': [[match_record(m) for m in matches] for matches in tournament.get_all_matches()],
+        'ranking': [p.id for p in ranking] if ranking is not None else [],
+    }
+
+
+def record_from_text(path: str) -> dict:
+    """ Structured record of an old text report (ids in the order of the participants). """
+    with_handicaps, participants = read_participants(path)
+
+    players = {}
+
+    def get_player(name, ttr=0, handicap=0):
+        # players missing within the participants (e.g. late entries) are added on their first match
+        if name not in players:
+            players[name] = {'name': name, 'ttr': ttr, 'handicap': handicap, 'nickname': None, 'club': None,
+                             'id': len(players)}
+
+        return players[name]
+
+    for name, (ttr, handicap) in participants.items():
+        get_player(name, ttr, handicap)
+
+    rounds = []
+    game_mode = 0
+
+    for round_number, first_name, second_name, sets_won, sets_lost, set_results in read_matches(path, include_bye=True):
+        while len(rounds) < max(round_number, 1):
+            rounds.append([])
+
+        first = get_player(first_name)
+        second = None if second_name == BYE_NAME else get_player(second_name)
+
+        start_offset = 0
+        if with_handicaps and second is not None:
+            start_offset = first['handicap'] - second['handicap']
+
+        sets = []
+        for set_result in set_results:
+            try:
+                sets.append([int(points) for points in set_result.split(':')])
+            except ValueError:
+                continue
+
+        rounds[max(round_number, 1) - 1].append({
+            'first': first['id'],
+            'second': None if second is None else second['id'],
+            'start_offset': start_offset,
+            'sets': sets,
+        })
+
+        game_mode = max(game_mode, sets_won, sets_lost)
+
+    rolling_rounds = 0
+    ranking = []
+
+    with open(path, 'r') as file:
+        ranking_found = False
+
+        for line in file:
+            line = line.rstrip('\r\n')
+
+            found = ROLLING_PATTERN.match(line)
+            if found is not None:
+                rolling_rounds = int(found.group(1))
+                continue
+
+            if line.startswith('Ranking'):
+                ranking_found = True
+                continue
+
+            # names are matched as a whole, i.e. they may contain dots and digits
+            found = RANKING_PATTERN.match(line)
+            if ranking_found and found is not None:
+                ranking.append(get_player(found.group(2))['id'])
+
+    file_date = get_file_date(path)
+
+    return {
+        'format': RECORD_FORMAT,
+        'date': file_date.isoformat(),
+        'game_mode': game_mode,
+        'with_handicaps': with_handicaps,
+        'rolling_rounds': rolling_rounds,
+        'players': list(players.values()),
+        'withdrawn': [],
+        'rounds': rounds,
+        'ranking': ranking,
+    }
+
+
+def get_record_path(directory: str, day: date, suffix: str = '') -> str:
+    return os.path.join(directory, f"{day.isoformat()}{suffix}.json")
+
+
+def read_record(path: str) -> dict:
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def list_unconverted_files(directory: str) -> List[str]:
+    """ Text reports without a record (i.e. not yet part of the analytics, see `convert_text_archive`). """
+    return [path for _, path in list_tournament_files(directory)
+            if not os.path.exists(os.path.splitext(path)[0] + '.json')]
+
+
+def convert_text_archive(directory: str) -> int:
+    """ Writes the records of all text reports without a record (one-time conversion), returns the number of records.
+
+    Has to be called explicitly (once at the start of a tournament or via the command line), the archive is only read
+    otherwise, e.g. by several threads at the same time.
+    """
+    # imported here as the persistence imports the tournament, which does not depend on the archive
+    from model.persistence import write_atomically
+
+    converted = 0
+
+    for path in list_unconverted_files(directory):
+        record_path = os.path.splitext(path)[0] + '.json'
+
+        try:
+            write_atomically(record_path, json.dumps(record_from_text(path), ensure_ascii=False))
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            print(f"Warning: tournament {path} could not be converted: {e}")
+            continue
+
+        converted += 1
+
+    return converted
+
+
+def iter_records(directory: str, after: date = None, before: date = None, skip_days: set = None) -> Iterator[tuple]:
+    """ (date, record) of the stored tournaments between the given days (both exclusive), oldest first.
+
+    Only a single record is kept in memory at a time. Text reports without a record are skipped (see
+    `convert_text_archive`). Records of the days to skip are not even read (e.g. as they have already been processed).
+    """
+    for file_date, path in list_tournament_files(directory, '.json'):
+        if (after is not None and file_date <= after) or (before is not None and file_date >= before):
+            continue
+
+        if skip_days is not None and file_date in skip_days:
+            continue
+
+        try:
+            record = read_record(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: tournament {path} could not be read: {e}")
+            continue
+
+        yield file_date, record
+
+
+def get_names(record: dict) -> dict:
+    """ Player id -> name of the given record. """
+    return {p['id']: p['name'] for p in record['players']}
+
+
+def get_winner(record: dict, match: dict) -> int or None:
+    """ Id of the winner of the given match of the record (None as long as the match is not finished). """
+    sets_won = sum(1 for points_1, points_2 in match['sets'] if points_1 > points_2)
+    sets_lost = len(match['sets']) - sets_won
+
+    if max(sets_won, sets_lost) < record['game_mode'] or sets_won == sets_lost:
+        return None
+
+    return match['first'] if sets_won > sets_lost else match['second']
+
+
+def read_previous_pairings(directory: str, before: date = None) -> set:
+    """ Pairings (frozensets of both names) of the most recent tournament before the given day (default: today). """
+    if before is None:
+        before = date.today()
+
+    previous = None
+    for _, record in iter_records(directory, before=before):
+        previous = record
+
+    if previous is None:
+        return set()
+
+    names = get_names(previous)
+
+    return {frozenset((names[m['first']], names[m['second']])) for matches in previous['rounds'] for m in matches
+            if m['second'] is not None}
@@ -0,0 +1,240 @@
+""" Import of the results of many matches at once (e.g. from the paper score sheets collected after a round).
+
+Each line of a CSV or plain text file identifies a running match and lists its set results:
+    3, 11:5, 8:11, 11:7, 11:3               (table number, or the number shown on the match if there are no tables)
+    Max Mustermann; 11:9 11:4 11:2          (one of the players, sets from this player's view)
+    Max Mustermann, Erika Musterfrau, 11:9, 11:4, 11:2
+Empty lines and lines starting with '#' are ignored.
+
+Results are only applied if the whole file is valid, so a file can simply be corrected and imported again.
+"""
+import csv
+import functools
+import math
+import re
+
+from typing import Callable, List
+
+from model.data_classes import Match, check_set_results
+
+SCORE_PATTERN = re.compile(r'^(\d{1,2})\s*:\s*(\d{1,2})$')
+
+# anything that is meant to be a set result (e.g. '11-5'), hence, reported as invalid set instead of unknown player
+SCORE_LIKE_PATTERN = re.compile(r'^\d+\s*[:\-/]\s*\d+$')
+
+
+def is_score_like(token: str) -> bool:
+    return ':' in token or SCORE_LIKE_PATTERN.match(token) is not None
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_score(value: str) -> tuple:
+    """ Same conversion as `Score.from_str` but returns (result, None) or (None, reason) instead of failing silently.
+
+    Score sheets repeat the same few results over and over, hence, the results are cached.
+    """
+    found = SCORE_PATTERN.match(value.strip())
+    if found is None:
+        return None, f"'{value}' hat nicht das Format 'x:y'"
+
+    points_1 = int(found.group(1))
+    points_2 = int(found.group(2))
+
+    sign = 1.0 if points_1 > points_2 else -1.0
+    winner = max(points_1, points_2)
+    loser = min(points_1, points_2)
+
+    if winner == 11 and loser <= 9:
+        return sign * loser, None
+
+    if loser >= 10 and winner - loser == 2:
+        return sign * loser, None
+
+    if winner < 11:
+        return None, f"'{value}': kein Spieler hat 11 Punkte erreicht"
+
+    return None, f"'{value}': ab 10:10 muss ein Satz mit genau 2 Punkten Vorsprung enden"
+
+
+def parse_scores(values: List[str]) -> List[float]:
+    """ Parses all given set results, the ValueError lists every invalid one. """
+    results = []
+    reasons = []
+
+    for value in values:
+        result, reason = parse_score(value)
+        results.append(result)
+
+        if reason is not None:
+            reasons.append(reason)
+
+    if len(reasons) > 0:
+        raise ValueError(', '.join(reasons))
+
+    return results
+
+
+def split_line(line: str, delimiter: str) -> List[str]:
+    if delimiter is None:
+        fields = line.split()
+    else:
+        fields = [field.strip() for field in next(csv.reader([line], delimiter=delimiter))]
+
+    # sets may also be separated by spaces within a single field
+    tokens = []
+    for field in fields:
+        if is_score_like(field) or any(is_score_like(token) for token in field.split()):
+            tokens += field.split()
+        elif len(field) > 0:
+            tokens.append(field)
+
+    return tokens
+
+
+def detect_delimiter(lines: List[str]):
+    for delimiter in [';', '\t', ',']:
+        if any(delimiter in line for line in lines):
+            return delimiter
+
+    # plain text: names and sets separated by spaces
+    return None
+
+
+class ResultImport:
+    def __init__(self, tournament, get_table: Callable[[Match], int] = None):
+        self._tournament = tournament
+
+        # maps matches to their table number (if tables are assigned)
+        self._get_table = get_table
+
+        # (match, set results) to be applied, at most one entry per match
+        self.updates = []
+
+        # (line number, message)
+        self.errors = []
+
+    def read(self, lines: List[str]):
+        """ Parses all lines, the errors are collected instead of stopping at the first invalid line. """
+        lines = [line.rstrip('\r\n') for line in lines]
+        content_lines = [line for line in lines if len(line.strip()) > 0 and not line.strip().startswith('#')]
+        delimiter = detect_delimiter(content_lines)
+
+        known_results = {}
+
+        for line_number, line in enumerate(lines, 1):
+            if len(line.strip()) == 0 or line.strip().startswith('#'):
+                continue
+
+            try:
+                match, results = self._read_line(line, delimiter)
+            except ValueError as e:
+                self.errors.append((line_number, str(e)))
+                continue
+
+            if match in known_results:
+                if known_results[match] != [self._to_key(r) for r in results]:
+                    self.errors.append((line_number, 'abweichendes Ergebnis für dieselbe Begegnung'))
+                continue
+
+            known_results[match] = [self._to_key(r) for r in results]
+            self.updates.append((match, results))
+
+        return self
+
+    def apply(self) -> List[Match]:
+        """ Applies all results at once and returns the changed matches (nothing is applied if there were errors). """
+        if len(self.errors) > 0:
+            return []
+
+        changed_matches = []
+        for match, results in self.updates:
+            if [self._to_key(r) for r in match.set_results] == [self._to_key(r) for r in results]:
+                continue
+
+            for i, result in enumerate(results):
+                match.update_set_result(i, result)
+            changed_matches.append(match)
+
+        return changed_matches
+
+    def _read_line(self, line: str, delimiter):
+        tokens = split_line(line, delimiter)
+
+        num_identifiers = next((i for i, token in enumerate(tokens) if is_score_like(token)), len(tokens))
+        if num_identifiers == 0:
+            raise ValueError('Begegnung fehlt (Tisch, Nummer oder Spieler)')
+
+        if delimiter is None:
+            # names contain spaces as well
+            identifiers = [' '.join(tokens[:num_identifiers])]
+        else:
+            identifiers = tokens[:num_identifiers]
+
+        match, swapped = self._find_match(identifiers)
+        results = parse_scores(tokens[num_identifiers:])
+
+        if swapped:
+            results = [-1.0 * r for r in results]
+
+        results = check_set_results(match, results)
+
+        for current, new in zip(match.set_results, results):
+            if current is not None and self._to_key(current) != self._to_key(new):
+                raise ValueError('weicht vom bereits eingetragenen Ergebnis ab')
+
+        return match, results
+
+    def _find_match(self, identifiers: List[str]):
+        """ Returns the running match and whether the sets are given from the second player's perspective. """
+        matches = self._tournament.get_running_matches()
+
+        if len(identifiers) == 1 and identifiers[0].isdigit():
+            number = int(identifiers[0])
+
+            if self._get_table is not None:
+                match = next((m for m in matches if self._get_table(m) == number), None)
+                if match is None:
+                    raise ValueError(f"an Tisch {number} wird derzeit nicht gespielt")
+            else:
+                if not 1 <= number <= len(matches):
+                    raise ValueError(f"es gibt keine Begegnung {number}")
+                match = matches[number - 1]
+
+            return match, False
+
+        if len(identifiers) > 2:
+            raise ValueError(f"unerwartete Angaben: {', '.join(identifiers)}")
+
+        candidates = []
+        for match in matches:
+            first_names = {match.first_player_name.lower(), match.first_player_display_name.lower()}
+            second_names = {match.second_player_name.lower(), match.second_player_display_name.lower()}
+            names = [identifier.lower() for identifier in identifiers]
+
+            if names[0] in first_names and (len(names) == 1 or names[1] in second_names):
+                candidates.append((match, False))
+            elif names[0] in second_names and (len(names) == 1 or names[1] in first_names):
+                candidates.append((match, True))
+
+        if len(candidates) == 0:
+            raise ValueError(f"keine laufende Begegnung von '{' - '.join(identifiers)}'")
+
+        if len(candidates) > 1:
+            # rolling mode: finished matches are kept until their players are paired again
+            candidates = [c for c in candidates if not c[0].is_finished()] or candidates
+
+        if len(candidates) > 1:
+            raise ValueError(f"'{' - '.join(identifiers)}' ist nicht eindeutig")
+
+        return candidates[0]
+
+    @staticmethod
+    def _to_key(result):
+        # special comparison needed for 11:0 and 0:11
+        return None if result is None else (result, math.copysign(1, result))
+
+
+def import_results(tournament, lines: List[str], get_table: Callable[[Match], int] = None):
+    """ Reads and applies the results in one go, returns (changed matches, errors). """
+    result_import = ResultImport(tournament, get_table).read(lines)
+    return result_import.apply(), result_import.errors
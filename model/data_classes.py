@@ -1,7 +1,7 @@
 import functools
 import math
 
-from typing import List
+from typing import List, Tuple
 from enum import IntEnum
 
 
@@ -16,19 +16,24 @@ class Player(dict):
     nickname: str
     ttr: int
     handicap: int
+    club: str
 
-    def __init__(self, name: str, ttr: int, handicap: int, nickname=None):
-        dict.__init__(self, name=name, ttr=ttr, handicap=handicap, nickname=nickname)
+    def __init__(self, name: str, ttr: int, handicap: int, nickname=None, club=None):
+        dict.__init__(self, name=name, ttr=ttr, handicap=handicap, nickname=nickname, club=club)
         self.name = name
         self.ttr = ttr
         self.handicap = handicap
         self.nickname = nickname
 
+        # optional: players of the same club (or family) should not be paired with each other if possible
+        self.club = club
+
 @functools.total_ordering
 class TournamentPlayer(Player):
     """ Representation of a player extended with the tournament information (e.g. previous opponents, results, ...). """
-    def __init__(self, identifier: int, name: str, display_name: str, ttr: int, handicap: int = 0, nickname: str = None):
-        super().__init__(name, ttr, handicap, nickname)
+    def __init__(self, identifier: int, name: str, display_name: str, ttr: int, handicap: int = 0, nickname: str = None,
+                 club: str = None):
+        super().__init__(name, ttr, handicap, nickname, club)
         self.display_name = display_name
         self.id = identifier
         self.hadByeInRound = -1
@@ -147,8 +152,9 @@ class Score:
 
 class Match:
     def __init__(self, game_mode: GameMode, first_player: TournamentPlayer, second_player: TournamentPlayer,
-                 start_offset: int = 0):
+                 start_offset: int = 0, round_number: int = 0):
         self.game_mode = game_mode
+        self.round_number = round_number
         self.first_player_id: int = first_player.id
         self.first_player_name: str = first_player.name
         self.first_player_display_name: str = first_player.display_name
@@ -156,10 +162,14 @@ class Match:
         self.second_player_name: str = second_player.name
         self.second_player_display_name: str = second_player.display_name
 
-        # stored as float since we need the negative zero as well...
-        self.set_results: List[float or None] = [None] * (2*int(self.game_mode) - 1)
+        # stored as float since we need the negative zero as well... (immutable, i.e. a snapshot of the results is simply
+        # a reference to the tuple, see model/history.py)
+        self.set_results: Tuple[float or None, ...] = (None,) * (2*int(self.game_mode) - 1)
         self.start_offset: int = start_offset # necessary for tournaments with handicaps
 
+        # the remaining sets have been recorded as won 11:0 as a player has withdrawn (see `Tournament.withdraw_player`)
+        self.walkover: bool = False
+
     def sets_won(self) -> int:
         sets_won = 0
         for res in self.set_results:
@@ -207,97 +217,249 @@ class Match:
         return (sets_won == required_sets) or (sets_lost == required_sets)
 
     def update_set_result(self, index: int, result: int or None):
-        self.set_results[index] = result
+        self.set_results = self.set_results[:index] + (result,) + self.set_results[index + 1:]
+
+    def restore_results(self, results: Tuple[float or None, ...]):
+        self.set_results = results
+
+    def to_dict(self) -> dict:
+        return {
+            'round': self.round_number,
+            'first_player': self.first_player_id,
+            'second_player': self.second_player_id,
+            'start_offset': self.start_offset,
+            'set_results': [None if r is None else Score.to_str(r) for r in self.set_results],
+            'walkover': self.walkover,
+        }
+
+    @staticmethod
+    def from_dict(data: dict, game_mode: GameMode, players: List[TournamentPlayer]):
+        match = Match(game_mode, players[data['first_player']], players[data['second_player']],
+                      start_offset=data['start_offset'], round_number=data['round'])
+
+        for i, result in enumerate(data['set_results']):
+            match.update_set_result(i, None if result is None else Score.from_str(result))
+
+        match.walkover = data.get('walkover', False)
+
+        return match
 
 # utility functions
-def initialize_field_of_participants(players: List[Player], add_bye: bool=True, use_nicknames=True):
-    def levenshtein_distance(a, b):
-        a = a.lower()
-        b = b.lower()
+def is_same_result(a, b):
+    if a is None or b is None:
+        return a is b
 
-        n = len(a)
-        m = len(b)
+    # special comparison needed for 11:0 and 0:11
+    return a == b and math.copysign(1, a) == math.copysign(1, b)
 
-        # without numpy since buildozer had some problems with it...
-        lev_matrix = []
-        for i in range(0, n+1):
-            lev_matrix.append([0] * (m+1))
 
-        for i in range(0, n + 1):
-            lev_matrix[i][0] = i
+def parse_set_results(match: Match, values: list) -> List[float or None]:
+    """ Converts the given set results (strings like '11:5', empty entries for sets not yet played) into the format of
+    `Match.set_results`. Raises a ValueError if the results are invalid.
+    """
+    if not isinstance(values, list):
+        raise ValueError('Ungültige Anzahl an Sätzen.')
 
-        for i in range(0, m + 1):
-            lev_matrix[0][i] = i
+    parsed = []
+    for value in values:
+        if value is None or value == '':
+            parsed.append(None)
+            continue
 
-        for i in range(1, n + 1):
-            for j in range(1, m + 1):
-                insertion = lev_matrix[i - 1][j] + 1
-                deletion = lev_matrix[i][j - 1] + 1
-                substitution = lev_matrix[i - 1][j - 1] + (1 if a[i - 1] != b[j - 1] else 0)
-                lev_matrix[i][j] = min(insertion, deletion, substitution)
+        result = Score.from_str(str(value))
+        if result is None:
+            raise ValueError(f"Ungültiges Satzergebnis: '{value}'")
 
-        return lev_matrix[n][m]
+        parsed.append(result)
 
-    def get_display_name(player, level, use_nicknames):
-        # levels define length of name
-        # 0 -> only prename
-        # 1 -> prename + first letter of name
-        # 2 -> full name
+    return check_set_results(match, parsed)
 
-        # assumes that nicknames are usually distinguishable
-        if use_nicknames and player.nickname is not None:
-            return player.nickname
 
-        split = player.name.split(' ')
+def check_set_results(match: Match, results: list) -> List[float or None]:
+    """ Checks already parsed set results against the match and pads them to the length of `Match.set_results`. """
+    if len(results) > len(match.set_results):
+        raise ValueError('Ungültige Anzahl an Sätzen.')
 
-        if level == 0:
-            return split[0]
-        elif level == 1:
-            if len(split) == 2:
-                return f"{split[0]} {split[-1][0]}."
+    for previous, result in zip(results, results[1:]):
+        if previous is None and result is not None:
+            raise ValueError('Sätze müssen der Reihe nach eingetragen werden.')
 
-        return player.name
+    parsed = list(results) + [None] * (len(match.set_results) - len(results))
 
-    def check_for_colliding_display_names(players, levels, use_nicknames):
-        colliding_display_names = set()
+    # no further sets after the match has been decided
+    sets_won = 0
+    sets_lost = 0
+    for result in parsed:
+        if result is None:
+            break
 
-        for i, p1 in enumerate(players):
-            for k, p2 in enumerate(players):
-                if i == k:
-                    continue
+        if sets_won == int(match.game_mode) or sets_lost == int(match.game_mode):
+            raise ValueError('Das Spiel ist bereits entschieden.')
 
-                p1_name = get_display_name(p1, levels[i], use_nicknames=use_nicknames)
-                p2_name = get_display_name(p2, levels[k], use_nicknames=use_nicknames)
+        if math.copysign(1, result) > 0:
+            sets_won += 1
+        else:
+            sets_lost += 1
 
-                # Levenshtein distance is intended for cases like 'Stephan' vs. 'Stefan'
-                if p1_name == p2_name or levenshtein_distance(p1_name, p2_name) <= 2:
-                    colliding_display_names.add(i)
-                    colliding_display_names.add(k)
+    return parsed
 
-        return colliding_display_names
 
-    # shorten names for a cleaner visualization
-    name_levels = [0] * len(players)
+def levenshtein_distance(a, b):
+    a = a.lower()
+    b = b.lower()
+
+    n = len(a)
+    m = len(b)
 
-    # three levels of name length:
+    # without numpy since buildozer had some problems with it...
+    lev_matrix = []
+    for i in range(0, n+1):
+        lev_matrix.append([0] * (m+1))
+
+    for i in range(0, n + 1):
+        lev_matrix[i][0] = i
+
+    for i in range(0, m + 1):
+        lev_matrix[0][i] = i
+
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            insertion = lev_matrix[i - 1][j] + 1
+            deletion = lev_matrix[i][j - 1] + 1
+            substitution = lev_matrix[i - 1][j - 1] + (1 if a[i - 1] != b[j - 1] else 0)
+            lev_matrix[i][j] = min(insertion, deletion, substitution)
+
+    return lev_matrix[n][m]
+
+
+def get_display_name(player, level, use_nicknames):
+    # levels define length of name
     # 0 -> only prename
     # 1 -> prename + first letter of name
     # 2 -> full name
-    for _ in range(3):
-        colliding_names = check_for_colliding_display_names(players, name_levels, use_nicknames)
 
-        if len(colliding_names) > 0:
+    # assumes that nicknames are usually distinguishable
+    if use_nicknames and player.nickname is not None:
+        return player.nickname
+
+    split = player.name.split(' ')
+
+    if level == 0:
+        return split[0]
+    elif level == 1:
+        if len(split) == 2:
+            return f"{split[0]} {split[-1][0]}."
+
+    return player.name
+
+
+class DisplayNameIndex:
+    """ Shortest distinguishable display names of the players (e.g. only the prename if it is unique).
+
+    The names are indexed by their length: the Levenshtein distance is at least the difference of the lengths, hence,
+    only names of similar length have to be compared. Added players are only checked against this index instead of
+    comparing all players with each other once again.
+    """
+
+    def __init__(self, players: List[Player], use_nicknames=True):
+        self._players = []
+        self._use_nicknames = use_nicknames
+
+        # 0 -> only prename, 1 -> prename + first letter of name, 2 -> full name
+        self._levels = []
+        self._names = []
+
+        # length of the (lower case) display name -> indices of the players
+        self._by_length = {}
+
+        for player in players:
+            self._append(player)
+
+        self._resolve_collisions(range(len(self._players)))
+
+    def get_display_names(self) -> List[str]:
+        return list(self._names)
+
+    def get_display_name(self, index: int) -> str:
+        return self._names[index]
+
+    def add(self, player: Player) -> set:
+        """ Adds a player (next index), returns the indices of the other players whose display name has changed. """
+        index = self._append(player)
+
+        changed = self._resolve_collisions([index])
+        changed.discard(index)
+
+        return changed
+
+    def _append(self, player):
+        self._players.append(player)
+        self._levels.append(0)
+        self._names.append(None)
+
+        index = len(self._players) - 1
+        self._set_level(index, 0)
+
+        return index
+
+    def _set_level(self, index, level):
+        if self._names[index] is not None:
+            self._by_length[len(self._names[index].lower())].remove(index)
+
+        self._levels[index] = level
+        self._names[index] = get_display_name(self._players[index], level, use_nicknames=self._use_nicknames)
+        self._by_length.setdefault(len(self._names[index].lower()), set()).add(index)
+
+    def _find_similar(self, index):
+        name = self._names[index]
+        length = len(name.lower())
+
+        for other_length in range(length - 2, length + 3):
+            for other in self._by_length.get(other_length, ()):
+                if other == index:
+                    continue
+
+                other_name = self._names[other]
+
+                # Levenshtein distance is intended for cases like 'Stephan' vs. 'Stefan'
+                if name == other_name or levenshtein_distance(name, other_name) <= 2:
+                    yield other
+
+    def _resolve_collisions(self, candidates) -> set:
+        changed = set()
+
+        # three levels of name length, colliding names are extended until they can be distinguished
+        for _ in range(3):
+            colliding_names = set()
+
+            for index in candidates:
+                for other in self._find_similar(index):
+                    colliding_names.add(index)
+                    colliding_names.add(other)
+
+            if len(colliding_names) == 0:
+                break
+
             for index in colliding_names:
-                name_levels[index] += 1
-        else:
-            break
+                self._set_level(index, self._levels[index] + 1)
+
+            # names that did not change can only collide with one of the extended names
+            changed |= colliding_names
+            candidates = colliding_names
 
-    display_names = [get_display_name(player, level, use_nicknames) for player, level in zip(players, name_levels)]
+        return changed
+
+
+def initialize_field_of_participants(players: List[Player], add_bye: bool=True, use_nicknames=True,
+                                     display_names: DisplayNameIndex = None):
+    # shorten names for a cleaner visualization
+    if display_names is None:
+        display_names = DisplayNameIndex(players, use_nicknames)
 
     # create field of participants
     tournament_players = []
     for i, p in enumerate(players):
-        tournament_players.append(TournamentPlayer(i, **p, display_name=display_names[i]))
+        tournament_players.append(TournamentPlayer(i, **p, display_name=display_names.get_display_name(i)))
 
     if add_bye and len(tournament_players) % 2 != 0:
         tournament_players.append(PlayerBye(len(tournament_players)))
@@ -0,0 +1,206 @@
+""" Export of the stored tournaments (matches, placements and the season ranking) to csv, json and a static html page,
+e.g. for the club website.
+
+The rows are produced by generators over the records of the archive (see `iter_records`) and written as soon as they
+are produced, hence, the memory does not grow with the size of the archive (only the season ranking is accumulated,
+one entry per player). Files are replaced atomically once they have been written completely.
+"""
+import collections
+import csv
+import html
+import json
+import os
+
+from datetime import date, timedelta
+from typing import Iterator, List
+
+from model.archive import BYE_NAME, get_names, get_winner, iter_records
+from model.persistence import open_atomically
+from model.season import CONSIDERED_RANKS, read_season_ranking
+
+FORMATS = ['csv', 'json', 'html']
+
+# result of a match that has been decided by the withdrawal of a player (the points have not been played)
+WALKOVER_RESULT = 'kampflos'
+
+# name of the table (file name of the csv), heading, (key, heading) of each column, row generator
+Table = collections.namedtuple('Table', ['name', 'title', 'columns', 'rows'])
+
+
+def _get_bounds(first_day: date, last_day: date) -> tuple:
+    # iter_records excludes both days
+    return (None if first_day is None else first_day - timedelta(days=1),
+            None if last_day is None else last_day + timedelta(days=1))
+
+
+def iter_match_rows(directory: str, first_day: date = None, last_day: date = None) -> Iterator[dict]:
+    """ All matches of the tournaments between the given days (both inclusive), in the order they have been played. """
+    after, before = _get_bounds(first_day, last_day)
+
+    for file_date, record in iter_records(directory, after=after, before=before):
+        names = get_names(record)
+
+        for round_number, matches in enumerate(record['rounds'], 1):
+            for match in matches:
+                sets_won = sum(1 for points_1, points_2 in match['sets'] if points_1 > points_2)
+
+                yield {
+                    'date': file_date.isoformat(),
+                    'round': round_number,
+                    'first': names[match['first']],
+                    'second': BYE_NAME if match['second'] is None else names[match['second']],
+                    'sets': f"{sets_won}:{len(match['sets']) - sets_won}",
+                    'result': WALKOVER_RESULT if match.get('walkover', False) else
+                    ' '.join(f'{points_1}:{points_2}' for points_1, points_2 in match['sets']),
+                }
+
+
+def iter_placement_rows(directory: str, first_day: date = None, last_day: date = None) -> Iterator[dict]:
+    """ Final ranking of each tournament between the given days (both inclusive). """
+    after, before = _get_bounds(first_day, last_day)
+
+    for file_date, record in iter_records(directory, after=after, before=before):
+        names = get_names(record)
+
+        wins = collections.Counter()
+        losses = collections.Counter()
+
+        for matches in record['rounds']:
+            for match in matches:
+                winner = get_winner(record, match)
+                if winner is None:
+                    continue
+
+                # a match against the bye counts as won (as within the ranking of the tournament)
+                wins[winner] += 1
+                loser = match['second'] if winner == match['first'] else match['first']
+                if loser is not None:
+                    losses[loser] += 1
+
+        for rank, player_id in enumerate(record['ranking'], 1):
+            yield {
+                'date': file_date.isoformat(),
+                'rank': rank,
+                'name': names[player_id],
+                'balance': f'{wins[player_id]}:{losses[player_id]}',
+            }
+
+
+def iter_season_rows(directory: str, first_day: date = None, last_day: date = None) -> Iterator[dict]:
+    """ Season ranking accumulated over the tournaments between the given days (both inclusive). """
+    season_ranking = read_season_ranking(directory, first_day, last_day)
+
+    for rank, (name, season_stats) in enumerate(season_ranking.items(), 1):
+        row = {'rank': rank, 'name': name}
+        for r in range(CONSIDERED_RANKS):
+            row[f'place_{r + 1}'] = season_stats.placement_histogram[r]
+        row['points'] = season_stats.total_points
+
+        yield row
+
+
+TABLES = [
+    Table('spiele', 'Spiele',
+          [('date', 'Datum'), ('round', 'Runde'), ('first', 'Spieler 1'), ('second', 'Spieler 2'), ('sets', 'Sätze'),
+           ('result', 'Ergebnis')],
+          iter_match_rows),
+    Table('platzierungen', 'Platzierungen',
+          [('date', 'Datum'), ('rank', 'Platz'), ('name', 'Spieler'), ('balance', 'Bilanz')],
+          iter_placement_rows),
+    Table('saison', 'Saisonübersicht',
+          [('rank', 'Platz'), ('name', 'Spieler')] +
+          [(f'place_{r + 1}', f'{r + 1}. Platz') for r in range(CONSIDERED_RANKS)] + [('points', 'Gesamtpunkte')],
+          iter_season_rows),
+]
+
+
+def write_csv(file, table: Table, rows: Iterator[dict]):
+    # semicolons as expected by spreadsheets with german settings
+    writer = csv.writer(file, delimiter=';')
+    writer.writerow([heading for _, heading in table.columns])
+
+    for row in rows:
+        writer.writerow([row[key] for key, _ in table.columns])
+
+
+def write_json(file, tables: List[Table], rows: List[Iterator[dict]]):
+    """ One list of rows per table, e.g. {"spiele": [{"date": "2024-01-26", "round": 1, ...}, ...], ...}. """
+    file.write('{')
+
+    for i, (table, table_rows) in enumerate(zip(tables, rows)):
+        file.write(f'{", " if i > 0 else ""}\n{json.dumps(table.name)}: [')
+
+        for j, row in enumerate(table_rows):
+            file.write(f'{"," if j > 0 else ""}\n  {json.dumps(row, ensure_ascii=False)}')
+
+        file.write('\n]')
+
+    file.write('\n}\n')
+
+
+def write_html(file, title: str, tables: List[Table], rows: List[Iterator[dict]]):
+    """ Static page with one html table per table (without any external resources). """
+    file.write('<!DOCTYPE html>\n<html lang="de">\n<head>\n<meta charset="utf-8">\n'
+               f'<title>{html.escape(title)}</title>\n'
+               '<style>body { font-family: sans-serif; } table { border-collapse: collapse; margin-bottom: 2em; } '
+               'th, td { border: 1px solid #ccc; padding: 0.2em 0.6em; text-align: left; }</style>\n'
+               f'</head>\n<body>\n<h1>{html.escape(title)}</h1>\n')
+
+    for table, table_rows in zip(tables, rows):
+        file.write(f'<h2>{html.escape(table.title)}</h2>\n<table>\n<tr>')
+        file.write(''.join(f'<th>{html.escape(heading)}</th>' for _, heading in table.columns))
+        file.write('</tr>\n')
+
+        for row in table_rows:
+            file.write('<tr>' + ''.join(f'<td>{html.escape(str(row[key]))}</td>' for key, _ in table.columns) +
+                       '</tr>\n')
+
+        file.write('</table>\n')
+
+    file.write('</body>\n</html>\n')
+
+
+def export_archive(directory: str, output_directory: str, first_day: date = None, last_day: date = None,
+                   formats: List[str] = None) -> List[str]:
+    """ Writes all tables of the tournaments between the given days (both inclusive) in the given formats (default:
+    all), returns the paths of the written files. Each file reads the archive once again instead of keeping the rows.
+    """
+    if formats is None:
+        formats = FORMATS
+
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format: {fmt}")
+
+    os.makedirs(output_directory, exist_ok=True)
+
+    def get_rows():
+        return [table.rows(directory, first_day, last_day) for table in TABLES]
+
+    paths = []
+
+    if 'csv' in formats:
+        for table in TABLES:
+            path = os.path.join(output_directory, f'{table.name}.csv')
+            with open_atomically(path, encoding='utf-8', newline='') as file:
+                write_csv(file, table, table.rows(directory, first_day, last_day))
+            paths.append(path)
+
+    if 'json' in formats:
+        path = os.path.join(output_directory, 'turniere.json')
+        with open_atomically(path, encoding='utf-8') as file:
+            write_json(file, TABLES, get_rows())
+        paths.append(path)
+
+    if 'html' in formats:
+        title = 'Turniere'
+        if first_day is not None or last_day is not None:
+            title += f" {'' if first_day is None else first_day.strftime('%d.%m.%Y')} - " \
+                     f"{'' if last_day is None else last_day.strftime('%d.%m.%Y')}"
+
+        path = os.path.join(output_directory, 'turniere.html')
+        with open_atomically(path, encoding='utf-8') as file:
+            write_html(file, title, TABLES, get_rows())
+        paths.append(path)
+
+    return paths
@@ -0,0 +1,190 @@
+""" Calibration of the handicaps based on the point differences of all stored sets.
+
+With fair handicaps each set is expected to be balanced. The point difference of a set (including the head start of
+the player with the larger handicap) is modelled as the difference of the adjustments of both players:
+    point difference - applied start offset + (handicap 1 - handicap 2) = adjustment 1 - adjustment 2
+where the handicaps are the current ones of the player database. A positive adjustment means the player is stronger
+than the current handicap suggests, i.e. the proposed handicap is the current one minus the adjustment.
+
+The adjustments are fitted by least squares over all sets at once: the normal equations only depend on the number of
+sets between each pair of players, hence, they are accumulated in a single pass and solved as one small linear system
+(one row per player). Players with only a few sets are pulled towards no adjustment (regularization), older sets count
+less (half-life). A set is limited to a difference of 11 points, hence, large deviations are underestimated and the
+calibration is meant to be repeated after each event.
+"""
+import collections
+import math
+
+from datetime import date
+from typing import List
+
+from model.archive import iter_records
+from model.data_classes import Player
+from model.pairing_criteria import np
+
+# handicaps of players with fewer sets are not changed
+MIN_SETS = 10
+
+HandicapProposal = collections.namedtuple('HandicapProposal', ['name', 'handicap', 'adjustment', 'proposed_handicap',
+                                                               'num_sets'])
+
+
+class SetObservations:
+    """ Point differences of all sets (from the view of the first player) as columns. """
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+        self.first = []
+        self.second = []
+        self.point_difference = []
+        self.start_offset = []
+        self.weight = []
+
+        # name -> handicap of the most recent tournament (players that are no longer part of the player database)
+        self.last_handicaps = {}
+
+    def __len__(self):
+        return len(self.first)
+
+    def get_index(self, name: str) -> int:
+        if name not in self._index:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+
+        return self._index[name]
+
+
+def read_set_observations(directory: str, today: date = None, half_life_days: float = 365) -> SetObservations:
+    """ Sets of all stored tournaments (including today's), weighted by their age. """
+    if today is None:
+        today = date.today()
+
+    observations = SetObservations()
+
+    for file_date, record in iter_records(directory):
+        weight = 0.5 ** (max((today - file_date).days, 0) / half_life_days)
+
+        indices = {}
+        for p in record['players']:
+            indices[p['id']] = observations.get_index(p['name'])
+            observations.last_handicaps[p['name']] = p['handicap']
+
+        for matches in record['rounds']:
+            for match in matches:
+                # neither the bye nor a walkover (withdrawn player) tell anything about the handicaps
+                if match['second'] is None or match.get('walkover', False):
+                    continue
+
+                first = indices[match['first']]
+                second = indices[match['second']]
+
+                for points_1, points_2 in match['sets']:
+                    observations.first.append(first)
+                    observations.second.append(second)
+                    observations.point_difference.append(points_1 - points_2)
+                    observations.start_offset.append(match['start_offset'])
+                    observations.weight.append(weight)
+
+    return observations
+
+
+def fit_adjustments(observations: SetObservations, handicaps: List[float], regularization: float = 10) -> List[float]:
+    """ Least squares fit of the adjustment of each player (in the order of `observations.names`). """
+    n = len(observations.names)
+
+    if np is not None:
+        first = np.asarray(observations.first, dtype=np.int64)
+        second = np.asarray(observations.second, dtype=np.int64)
+        weight = np.asarray(observations.weight, dtype=np.float64)
+        current = np.asarray(handicaps, dtype=np.float64)
+
+        residual = (np.asarray(observations.point_difference, dtype=np.float64) -
+                    np.asarray(observations.start_offset, dtype=np.float64) + current[first] - current[second])
+
+        # normal equations: weighted laplacian of the played sets (+ regularization)
+        matrix = np.eye(n) * regularization
+        np.add.at(matrix, (first, first), weight)
+        np.add.at(matrix, (second, second), weight)
+        np.add.at(matrix, (first, second), -weight)
+        np.add.at(matrix, (second, first), -weight)
+
+        vector = np.zeros(n)
+        np.add.at(vector, first, weight * residual)
+        np.add.at(vector, second, -weight * residual)
+
+        return np.linalg.solve(matrix, vector).tolist()
+
+    matrix = [[regularization if i == j else 0.0 for j in range(n)] for i in range(n)]
+    vector = [0.0] * n
+
+    for i, j, difference, offset, w in zip(observations.first, observations.second, observations.point_difference,
+                                           observations.start_offset, observations.weight):
+        residual = difference - offset + handicaps[i] - handicaps[j]
+
+        matrix[i][i] += w
+        matrix[j][j] += w
+        matrix[i][j] -= w
+        matrix[j][i] -= w
+        vector[i] += w * residual
+        vector[j] -= w * residual
+
+    return solve_symmetric(matrix, vector)
+
+
+def solve_symmetric(matrix: List[list], vector: List[float]) -> List[float]:
+    """ Gaussian elimination without pivoting (sufficient as the matrix is symmetric positive definite). """
+    n = len(vector)
+    matrix = [list(row) for row in matrix]
+    vector = list(vector)
+
+    for k in range(n):
+        for i in range(k + 1, n):
+            factor = matrix[i][k] / matrix[k][k]
+            if factor == 0:
+                continue
+
+            row_i, row_k = matrix[i], matrix[k]
+            for j in range(k, n):
+                row_i[j] -= factor * row_k[j]
+            vector[i] -= factor * vector[k]
+
+    solution = [0.0] * n
+    for i in reversed(range(n)):
+        solution[i] = (vector[i] - sum(matrix[i][j] * solution[j] for j in range(i + 1, n))) / matrix[i][i]
+
+    return solution
+
+
+def calibrate_handicaps(directory: str, players: List[Player], regularization: float = 10,
+                        half_life_days: float = 365) -> List[HandicapProposal]:
+    """ Proposed handicaps of all players of the archive, players of the given database keep their current handicap as
+    starting point (others the one of their most recent tournament).
+    """
+    observations = read_set_observations(directory, half_life_days=half_life_days)
+
+    database_handicaps = {p.name: p.handicap for p in players}
+    handicaps = [database_handicaps.get(name, observations.last_handicaps.get(name, 0))
+                 for name in observations.names]
+
+    adjustments = fit_adjustments(observations, handicaps, regularization)
+
+    num_sets = collections.Counter(observations.first) + collections.Counter(observations.second)
+
+    return [HandicapProposal(name, handicap, adjustment, max(int(math.floor(handicap - adjustment + 0.5)), 0),
+                             num_sets[i])
+            for i, (name, handicap, adjustment) in enumerate(zip(observations.names, handicaps, adjustments))]
+
+
+def propose_player_database(players: List[Player], proposals: List[HandicapProposal], min_sets: int = MIN_SETS) -> list:
+    """ Copy of the player database (as json data) with the proposed handicaps of players with enough sets. """
+    proposed_handicaps = {p.name: p.proposed_handicap for p in proposals if p.num_sets >= min_sets}
+
+    database = []
+    for player in players:
+        entry = dict(player)
+        entry['handicap'] = proposed_handicaps.get(player.name, player.handicap)
+        database.append(entry)
+
+    return database
@@ -0,0 +1,144 @@
+""" Multi-level undo / redo of the result entries and the generated rounds of a tournament.
+
+The set results of a match are immutable tuples, hence, a result entry is recorded as the old and the new tuple of the
+changed matches only. A generated round is recorded as snapshots of the tournament before and after the generation
+(see `Tournament.get_state`), which share all finished rounds and results with each other. Nothing is ever copied
+deeply.
+
+Every change of the tournament has to be recorded, as the entries are undone in reverse order only.
+"""
+import collections
+
+from typing import List
+
+from model.data_classes import Match, is_same_result
+
+
+class ResultChange:
+    def __init__(self, match: Match, old_results: tuple, new_results: tuple):
+        self.match = match
+        self.old_results = old_results
+        self.new_results = new_results
+
+    def undo(self, tournament):
+        self.match.restore_results(self.old_results)
+        tournament.update_player_statistics([self.match])
+
+    def redo(self, tournament):
+        self.match.restore_results(self.new_results)
+        tournament.update_player_statistics([self.match])
+
+
+class StateChange:
+    """ Generation of a round (rolling mode: pairing of the free players). """
+
+    def __init__(self, old_state, new_state):
+        self.old_state = old_state
+        self.new_state = new_state
+
+    def undo(self, tournament):
+        tournament.restore_state(self.old_state)
+
+    def redo(self, tournament):
+        tournament.restore_state(self.new_state)
+
+
+class TournamentHistory:
+    def __init__(self, tournament, max_entries: int = 200):
+        self._tournament = tournament
+
+        # each entry is a list of changes that are undone together
+        self._undo_entries = collections.deque(maxlen=max_entries)
+        self._redo_entries = []
+
+        # results of the running matches as recorded last, needed to detect which results an entry has changed
+        self._known_results = {}
+        self._remember_running_matches()
+
+    def can_undo(self) -> bool:
+        return len(self._undo_entries) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo_entries) > 0
+
+    def can_undo_round(self) -> bool:
+        return any(isinstance(change, StateChange) for entry in self._undo_entries for change in entry)
+
+    def record_results(self, matches: List[Match]) -> bool:
+        """ Has to be called after results have been entered, returns whether there has been an actual change. """
+        changes = []
+
+        for match in matches:
+            old_results = self._known_results.get(match, (None,) * len(match.set_results))
+
+            if all(is_same_result(a, b) for a, b in zip(old_results, match.set_results)):
+                continue
+
+            changes.append(ResultChange(match, old_results, match.set_results))
+            self._known_results[match] = match.set_results
+
+        if len(changes) == 0:
+            return False
+
+        self._push(changes)
+        return True
+
+    def record_round(self, old_state, merge: bool = False):
+        """ Has to be called after a round has been generated with the state before the generation.
+
+        Merged with the previous entry if requested (rolling mode: the pairing is triggered by the entered result,
+        hence, undoing only the pairing would immediately trigger it once again).
+        """
+        change = StateChange(old_state, self._tournament.get_state())
+        self._remember_running_matches()
+
+        if merge and len(self._undo_entries) > 0:
+            self._undo_entries[-1].append(change)
+            self._redo_entries.clear()
+        else:
+            self._push([change])
+
+    def undo(self) -> bool:
+        if not self.can_undo():
+            return False
+
+        entry = self._undo_entries.pop()
+        for change in reversed(entry):
+            change.undo(self._tournament)
+
+        self._redo_entries.append(entry)
+        self._remember_running_matches()
+
+        return True
+
+    def redo(self) -> bool:
+        if not self.can_redo():
+            return False
+
+        entry = self._redo_entries.pop()
+        for change in entry:
+            change.redo(self._tournament)
+
+        self._undo_entries.append(entry)
+        self._remember_running_matches()
+
+        return True
+
+    def undo_round(self) -> bool:
+        """ Undoes everything up to (and including) the last generated round, e.g. to generate it once again. """
+        if not self.can_undo_round():
+            return False
+
+        while True:
+            entry = self._undo_entries[-1]
+            self.undo()
+
+            if any(isinstance(change, StateChange) for change in entry):
+                return True
+
+    def _push(self, changes: list):
+        self._undo_entries.append(changes)
+        self._redo_entries.clear()
+
+    def _remember_running_matches(self):
+        self._known_results = {m: m.set_results for m in self._tournament.get_running_matches()}
@@ -0,0 +1,259 @@
+""" Criteria that define how good a pairing of two players is (the matching minimizes the sum of the pairing costs).
+
+Each criterion rates a pair of players (0: ideal) and is multiplied by its weight. The enabled criteria are compiled
+into a single cost matrix which is built with numpy broadcasting if numpy is available. Otherwise (buildozer had some
+problems with numpy) the same costs are computed in plain python.
+
+Adding a criterion:
+    class SameNameAvoidance(Criterion):
+        name = 'same_name_avoidance'
+
+        def matrix(self, features):
+            return ...  # n x n array, e.g. based on the (cached) arrays of `PlayerFeatures`
+
+        def cost(self, player, opponent):
+            return ...  # same value for a single pair
+
+    CRITERIA[SameNameAvoidance.name] = SameNameAvoidance
+"""
+import functools
+
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class PlayerFeatures:
+    """ Arrays of the player attributes used by the criteria, each computed only once per cost matrix. """
+
+    def __init__(self, players: List):
+        self.players = players
+
+    @functools.cached_property
+    def wins(self):
+        return np.array([len(p.wins) for p in self.players], dtype=np.int64)
+
+    @functools.cached_property
+    def handicaps(self):
+        return np.array([p.handicap for p in self.players], dtype=np.int64)
+
+    @functools.cached_property
+    def ttr(self):
+        return np.array([p.ttr for p in self.players], dtype=np.int64)
+
+    @functools.cached_property
+    def clubs(self):
+        # -1: no club
+        codes = {}
+        return np.array([-1 if p.club is None else codes.setdefault(p.club, len(codes)) for p in self.players],
+                        dtype=np.int64)
+
+    @functools.cached_property
+    def is_bye(self):
+        return np.array([p.is_bye() for p in self.players], dtype=bool)
+
+    @functools.cached_property
+    def had_bye(self):
+        return np.array([p.had_bye() for p in self.players], dtype=bool)
+
+
+def pairwise_difference(values):
+    return np.abs(values[:, None] - values[None, :])
+
+
+class Criterion:
+    """ Base class of the pairing criteria, a weight of 0 disables the criterion. """
+    name = None
+
+    def __init__(self, weight: float):
+        self.weight = weight
+
+    def matrix(self, features: PlayerFeatures):
+        """ Costs of all pairs of players (numpy array). """
+        raise NotImplementedError
+
+    def cost(self, player, opponent):
+        """ Cost of a single pair, has to be consistent with `matrix`. """
+        raise NotImplementedError
+
+    def to_spec(self) -> dict:
+        return {'name': self.name, 'weight': self.weight}
+
+
+class WinDifference(Criterion):
+    """ Players with the same number of wins should play against each other (squared, i.e. large gaps are avoided). """
+    name = 'win_difference'
+
+    def matrix(self, features):
+        return pairwise_difference(features.wins) ** 2
+
+    def cost(self, player, opponent):
+        return abs(len(player.wins) - len(opponent.wins)) ** 2
+
+
+class HandicapDifference(Criterion):
+    name = 'handicap_difference'
+
+    def matrix(self, features):
+        return pairwise_difference(features.handicaps)
+
+    def cost(self, player, opponent):
+        return abs(player.handicap - opponent.handicap)
+
+
+class TtrDifference(Criterion):
+    name = 'ttr_difference'
+
+    def __init__(self, weight: float, max_diff: int = 1000):
+        super().__init__(weight)
+
+        # larger differences are considered equally bad
+        self.max_diff = max_diff
+
+    def matrix(self, features):
+        return np.minimum(pairwise_difference(features.ttr), self.max_diff)
+
+    def cost(self, player, opponent):
+        return min(abs(player.ttr - opponent.ttr), self.max_diff)
+
+    def to_spec(self):
+        return {**super().to_spec(), 'max_diff': self.max_diff}
+
+
+class ClubAvoidance(Criterion):
+    """ Players of the same club (or family) should not play against each other. """
+    name = 'club_avoidance'
+
+    def matrix(self, features):
+        clubs = features.clubs
+        return ((clubs[:, None] == clubs[None, :]) & (clubs[:, None] >= 0)).astype(np.int64)
+
+    def cost(self, player, opponent):
+        return int(player.club is not None and player.club == opponent.club)
+
+
+class ByeHistory(Criterion):
+    """ The bye should go to a player that has not had one yet. """
+    name = 'bye_history'
+
+    def matrix(self, features):
+        return ((features.is_bye[:, None] & features.had_bye[None, :]) |
+                (features.had_bye[:, None] & features.is_bye[None, :])).astype(np.int64)
+
+    def cost(self, player, opponent):
+        return int((player.is_bye() and opponent.had_bye()) or (player.had_bye() and opponent.is_bye()))
+
+
+CRITERIA = {criterion.name: criterion for criterion in
+            [WinDifference, HandicapDifference, TtrDifference, ClubAvoidance, ByeHistory]}
+
+
+def default_criteria(with_handicaps: bool) -> List[Criterion]:
+    criteria = [
+        # dominates all other criteria
+        WinDifference(weight=10000),
+
+        # only relevant if clubs are given within the player database
+        ClubAvoidance(weight=5000),
+    ]
+
+    if with_handicaps:
+        criteria.append(HandicapDifference(weight=1000))
+    else:
+        criteria.append(TtrDifference(weight=1))
+
+    return criteria
+
+
+def criteria_from_spec(spec: List[dict]) -> List[Criterion]:
+    criteria = []
+
+    for entry in spec:
+        params = dict(entry)
+        criteria.append(CRITERIA[params.pop('name')](**params))
+
+    return criteria
+
+
+class PairingCostModel:
+    def __init__(self, criteria: List[Criterion]):
+        self.criteria = criteria
+
+        # disabled criteria do not cost anything
+        self._enabled = [c for c in criteria if c.weight != 0]
+
+    def to_spec(self) -> List[dict]:
+        return [c.to_spec() for c in self.criteria]
+
+    def pair_cost(self, player, opponent):
+        return sum(c.weight * c.cost(player, opponent) for c in self._enabled)
+
+    def cost_matrix(self, players: List):
+        """ Cost of each pairing as numpy array (row / column: position of the player within the given list). """
+        features = PlayerFeatures(players)
+        costs = np.zeros((len(players), len(players)), dtype=np.int64)
+
+        for criterion in self._enabled:
+            costs = costs + criterion.weight * criterion.matrix(features)
+
+        return costs
+
+    def edges(self, players: List, ignore_weights: bool = False, use_numpy: bool = True) -> list:
+        """ Returns (player id, opponent id, cost) for each pair of players that have not yet played each other.
+
+        The edges are listed in the order of the players (i.e. row by row of the upper triangle of the cost matrix).
+        """
+        if use_numpy and np is not None:
+            return self._edges_numpy(players, ignore_weights)
+
+        return self._edges_python(players, ignore_weights)
+
+    def _edges_python(self, players: List, ignore_weights: bool) -> list:
+        edges = []
+
+        for i, player in enumerate(players):
+            for opponent in players[i + 1:]:
+                if player.has_played_against(opponent.id) or opponent.has_played_against(player.id):
+                    continue
+
+                edges.append((player.id, opponent.id, 1 if ignore_weights else self.pair_cost(player, opponent)))
+
+        return edges
+
+    def _edges_numpy(self, players: List, ignore_weights: bool) -> list:
+        ids = np.array([p.id for p in players], dtype=np.int64)
+
+        rows, cols = np.triu_indices(len(players), k=1)
+        allowed = ~played_mask(players)[rows, cols]
+        rows = rows[allowed]
+        cols = cols[allowed]
+
+        if ignore_weights:
+            weights = np.ones(len(rows), dtype=np.int64)
+        else:
+            weights = self.cost_matrix(players)[rows, cols]
+
+        # plain python numbers, numpy scalars would make the matching considerably slower
+        return list(zip(ids[rows].tolist(), ids[cols].tolist(), weights.tolist()))
+
+
+def played_mask(players: List):
+    """ Boolean matrix marking the pairs that have already played against each other (and the diagonal). """
+    positions = {p.id: i for i, p in enumerate(players)}
+
+    rows = []
+    cols = []
+    for i, player in enumerate(players):
+        for opponent_id in player.wins | player.losses:
+            if opponent_id in positions:
+                rows.append(i)
+                cols.append(positions[opponent_id])
+
+    mask = np.eye(len(players), dtype=bool)
+    mask[rows, cols] = True
+
+    # the relationship is symmetric, but only one side may be up to date while a result is being changed
+    return mask | mask.T
@@ -0,0 +1,200 @@
+""" Anytime optimizer for the pairings of large fields (the exact matching takes several seconds for hundreds of players).
+
+Starts from a greedy pairing (best ranked players first, each with the cheapest available opponent) and improves it by
+exchanging the opponents of two pairs (2-opt) as long as this lowers the total cost. Local optima are left by rotating
+the opponents of three random pairs. The best pairing found is returned as soon as the time budget is used up, hence,
+the result is not necessarily optimal and may depend on the speed of the device.
+
+Pairs of players that have already played against each other are only used if there is no other option. They are
+left out of the result, i.e. an incomplete result means that no valid pairing has been found (like an incomplete
+matching).
+"""
+import collections
+import random
+import time
+
+from typing import List
+
+from model.pairing_criteria import PairingCostModel, np, played_mask
+
+# cost of pairing players that have already played against each other, exceeds the cost of any valid pairing
+FORBIDDEN_COST = 10 ** 12
+
+
+class PairingOptimizer:
+    def __init__(self, cost_model: PairingCostModel, time_budget: float = 0.2, rng: random.Random = None,
+                 max_kicks_without_improvement: int = 200):
+        self._cost_model = cost_model
+
+        # seconds, including the computation of the costs
+        self.time_budget = time_budget
+
+        self._rng = rng if rng is not None else random.Random()
+
+        # the search stops early if the pairing has not been improved for a while
+        self._max_kicks_without_improvement = max_kicks_without_improvement
+
+    def optimize(self, players: List, time_budget: float = None, excluded_pairs: List[tuple] = None,
+                 required_ids: set = None) -> dict:
+        """ Pairs the given players, returns player id -> opponent id (one entry per pair, like `find_pairings`).
+
+        The excluded pairs (player ids) and pairs without any of the required players are treated like pairs that have
+        already played against each other (e.g. for the endgame of the rolling mode).
+        """
+        deadline = time.perf_counter() + (self.time_budget if time_budget is None else time_budget)
+
+        costs = self.get_costs(players)
+        self._forbid(players, costs, excluded_pairs or [], required_ids)
+
+        # an odd player is paired with a placeholder (i.e. has to wait)
+        if len(players) % 2 != 0:
+            for row in costs:
+                row.append(0)
+            costs.append([0] * (len(players) + 1))
+
+        pairs = self._pair_greedily(players, costs)
+
+        # each exchange lowers the cost, hence, even an interrupted search is an improvement
+        self._improve(pairs, costs, range(len(pairs)), deadline)
+
+        best_pairs = list(pairs)
+        best_cost = self._total_cost(pairs, costs)
+
+        kicks_without_improvement = 0
+        while (len(pairs) >= 3 and kicks_without_improvement < self._max_kicks_without_improvement
+               and time.perf_counter() < deadline):
+            kicked = self._kick(pairs)
+            self._improve(pairs, costs, kicked, deadline)
+
+            cost = self._total_cost(pairs, costs)
+            if cost < best_cost:
+                best_pairs = list(pairs)
+                best_cost = cost
+                kicks_without_improvement = 0
+            else:
+                pairs = list(best_pairs)
+                kicks_without_improvement += 1
+
+        return {players[a].id: players[b].id for a, b in best_pairs
+                if a < len(players) and b < len(players) and costs[a][b] < FORBIDDEN_COST}
+
+    def get_costs(self, players: List) -> list:
+        """ Cost of each pairing as nested lists (plain python numbers are considerably faster to access). """
+        if np is not None:
+            costs = self._cost_model.cost_matrix(players)
+            costs[played_mask(players)] = FORBIDDEN_COST
+            return costs.tolist()
+
+        costs = [[FORBIDDEN_COST] * len(players) for _ in players]
+        for i, player in enumerate(players):
+            for j in range(i + 1, len(players)):
+                opponent = players[j]
+                if player.has_played_against(opponent.id) or opponent.has_played_against(player.id):
+                    continue
+
+                costs[i][j] = costs[j][i] = self._cost_model.pair_cost(player, opponent)
+
+        return costs
+
+    @staticmethod
+    def _forbid(players: List, costs: list, excluded_pairs: List[tuple], required_ids: set):
+        positions = {p.id: i for i, p in enumerate(players)}
+
+        for p1_id, p2_id in excluded_pairs:
+            if p1_id in positions and p2_id in positions:
+                costs[positions[p1_id]][positions[p2_id]] = costs[positions[p2_id]][positions[p1_id]] = FORBIDDEN_COST
+
+        if required_ids is not None:
+            others = [i for i, p in enumerate(players) if p.id not in required_ids]
+            for i in others:
+                for j in others:
+                    costs[i][j] = FORBIDDEN_COST
+
+    @staticmethod
+    def _pair_greedily(players: List, costs: list) -> list:
+        # best ranked players first, they are the most constrained by the win difference
+        order = sorted(range(len(players)), key=lambda i: (-len(players[i].wins), -players[i].ttr))
+        order += range(len(players), len(costs))
+
+        unpaired = set(order)
+        pairs = []
+
+        for i in order:
+            if i not in unpaired:
+                continue
+            unpaired.remove(i)
+
+            row = costs[i]
+            opponent = min(unpaired, key=lambda j: (row[j], j))
+            unpaired.remove(opponent)
+
+            pairs.append((i, opponent))
+
+        return pairs
+
+    @staticmethod
+    def _total_cost(pairs: list, costs: list):
+        return sum(costs[a][b] for a, b in pairs)
+
+    def _kick(self, pairs: list) -> list:
+        """ Rotates the opponents of three random pairs, returns their positions. """
+        indices = self._rng.sample(range(len(pairs)), 3)
+        (a, b), (c, d), (e, f) = [pairs[i] for i in indices]
+
+        pairs[indices[0]] = (a, d)
+        pairs[indices[1]] = (c, f)
+        pairs[indices[2]] = (e, b)
+
+        return indices
+
+    @staticmethod
+    def _improve(pairs: list, costs: list, changed, deadline: float) -> bool:
+        """ 2-opt local search starting with the changed pairs, returns False if it has been stopped by the deadline.
+
+        Only pairs involved in an exchange have to be checked again, hence, the search is cheap after a kick.
+        """
+        queue = collections.deque(changed)
+        queued = set(queue)
+
+        while len(queue) > 0:
+            if time.perf_counter() > deadline:
+                return False
+
+            i = queue.popleft()
+            queued.remove(i)
+
+            a, b = pairs[i]
+            exchanged = False
+
+            for j in range(len(pairs)):
+                if j == i:
+                    continue
+
+                c, d = pairs[j]
+                row_a = costs[a]
+                row_b = costs[b]
+
+                current = row_a[b] + costs[c][d]
+                swap_1 = row_a[c] + row_b[d]
+                swap_2 = row_a[d] + row_b[c]
+
+                if swap_1 < current and swap_1 <= swap_2:
+                    pairs[i], pairs[j] = (a, c), (b, d)
+                elif swap_2 < current:
+                    pairs[i], pairs[j] = (a, d), (b, c)
+                else:
+                    continue
+
+                a, b = pairs[i]
+                exchanged = True
+
+                if j not in queued:
+                    queue.append(j)
+                    queued.add(j)
+
+            # the pairs scanned before the exchange have to be checked against the new opponent
+            if exchanged:
+                queue.append(i)
+                queued.add(i)
+
+        return True
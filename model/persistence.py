@@ -0,0 +1,105 @@
+import contextlib
+import os
+import threading
+import time
+
+from model.profiling import measure
+
+
+class DebouncedFileWriter:
+    """ Coalesces frequent writes of the same files and performs them on a background thread.
+
+    All writes issued within `delay` seconds after the first pending write are merged so that only the latest content
+    of each file ends up on disk. Files are replaced atomically, hence, a crash never leaves a half-written file.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self._delay = delay
+
+        # path -> latest content that has not yet been written
+        self._pending = {}
+        self._deadline = None
+        self._stopped = False
+
+        self._condition = threading.Condition()
+
+        # serializes the actual file accesses between the writer thread and explicit flushes
+        self._io_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name='DebouncedFileWriter', daemon=True)
+        self._thread.start()
+
+    def write(self, path: str, content: str):
+        with self._condition:
+            self._pending[path] = content
+
+            # the first write opens the window, later writes only replace the content
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self._delay
+                self._condition.notify()
+
+    def flush(self):
+        """ Synchronously writes all pending content (e.g. at the end of a round or when the app is closed). """
+        with self._io_lock:
+            self._write_pending()
+
+    def close(self):
+        self.flush()
+
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._condition.wait(timeout)
+
+                if self._stopped:
+                    return
+
+            with self._io_lock:
+                self._write_pending()
+
+    def _write_pending(self):
+        with self._condition:
+            pending = self._pending
+            self._pending = {}
+            self._deadline = None
+
+        for path, content in pending.items():
+            try:
+                with measure('file_write'):
+                    write_atomically(path, content)
+            except OSError as e:
+                print(f"Warning: could not write '{path}': {e}")
+
+
+@contextlib.contextmanager
+def open_atomically(path: str, **kwargs):
+    """ File to be written step by step (e.g. streamed), replaces the target only once everything has been written.
+    The keyword arguments are passed to `open` (e.g. the encoding).
+    """
+    # write into a temporary file next to the target as a rename is only atomic within the same file system
+    tmp_path = path + '.tmp'
+
+    try:
+        with open(tmp_path, 'w', **kwargs) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+
+
+def write_atomically(path: str, content: str):
+    with open_atomically(path) as file:
+        file.write(content)
@@ -0,0 +1,162 @@
+""" Timing of the critical operations (pairing, ranking, file writes, widget rebuilds) while the app is running.
+
+Each operation is aggregated into a histogram (fixed buckets, i.e. constant memory however long the evening takes),
+hence, the measurements can stay enabled on the device and slow evenings can be diagnosed afterwards via the report:
+    @timed('generate_graph')
+    def generate_graph(self, ...):
+
+    with measure('check_for_updates.write'):
+        ...
+
+The overhead is two clock reads and a lock per measurement. Measurements may be taken on any thread (e.g. the file
+writer).
+"""
+import bisect
+import contextlib
+import functools
+import json
+import threading
+import time
+
+from datetime import datetime
+
+# upper bounds of the histogram buckets in ms, the last bucket takes everything above
+BUCKET_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+
+    def copy(self):
+        histogram = Histogram()
+        histogram.__dict__.update(self.__dict__)
+        histogram.buckets = list(self.buckets)
+
+        return histogram
+
+    def get_mean(self) -> float:
+        return self.total_ms / self.count if self.count > 0 else 0.0
+
+    def get_percentile(self, percentile: float) -> float:
+        """ Upper bound of the bucket containing the given percentile (the maximum for the last bucket). """
+        threshold = percentile / 100 * self.count
+        accumulated = 0
+
+        for i, num in enumerate(self.buckets):
+            accumulated += num
+            if num > 0 and accumulated >= threshold:
+                return min(BUCKET_BOUNDS_MS[i], self.max_ms) if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.get_mean(), 3),
+            'p50_ms': round(self.get_percentile(50), 3),
+            'p95_ms': round(self.get_percentile(95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'total_ms': round(self.total_ms, 3),
+            'buckets_ms': {f"<={bound}" if i < len(BUCKET_BOUNDS_MS) else f">{BUCKET_BOUNDS_MS[-1]}": num
+                           for i, (bound, num) in enumerate(zip(BUCKET_BOUNDS_MS + [None], self.buckets))},
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+# the measurements can be switched off completely (e.g. for benchmarks of the raw operations)
+enabled = True
+
+
+def add(name: str, elapsed_ms: float):
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram()
+
+        _histograms[name].add(elapsed_ms)
+
+
+@contextlib.contextmanager
+def measure(name: str):
+    if not enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name: str):
+    """ Decorator measuring each call of the function. """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(name, (time.perf_counter() - start) * 1000)
+
+        return wrapper
+
+    return decorator
+
+
+def get_histograms() -> dict:
+    """ Copy of all histograms (name -> Histogram), e.g. to be displayed. """
+    with _lock:
+        return {name: histogram.copy() for name, histogram in _histograms.items()}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def report(max_entries: int = None) -> str:
+    """ One line per operation, the most expensive (total time) first. """
+    histograms = sorted(get_histograms().items(), key=lambda item: item[1].total_ms, reverse=True)[:max_entries]
+
+    lines = [f"{'operation'.ljust(40)} {'count':>6} {'mean':>8} {'p95':>8} {'max':>8}"]
+    for name, h in histograms:
+        lines.append(f"{name.ljust(40)} {h.count:6d} {h.get_mean():6.1f}ms {h.get_percentile(95):6.0f}ms "
+                     f"{h.max_ms:6.0f}ms")
+
+    return '\n'.join(lines)
+
+
+def to_dict(extra: dict = None) -> dict:
+    data = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'operations': {name: h.to_dict() for name, h in sorted(get_histograms().items())},
+    }
+    data.update(extra or {})
+
+    return data
+
+
+def store_report(path: str, extra: dict = None):
+    """ Writes the report as json (e.g. together with the startup timing as `extra`). """
+    # imported here as the persistence measures its own writes
+    from model.persistence import write_atomically
+
+    write_atomically(path, json.dumps(to_dict(extra), indent=2))
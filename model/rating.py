@@ -0,0 +1,362 @@
+""" Club ratings learned from all matches of the stored tournaments (instead of the static ttr of the player database).
+
+The matches of the archive are read only once into a compact store (one row per match, players as indices) which is
+cached next to the tournament files, hence, later starts only read the tournaments that have been added since. The
+matches of the running tournament are applied incrementally as soon as they are finished.
+
+The ratings follow the elo system on the scale of the ttr (i.e. starting with the ttr of the player database): a
+player is expected to win with a probability of 1 / (1 + 10^((opponent rating - rating) / 150)). Like the deviation of
+glicko, the first matches of a player count more as the initial rating is still uncertain. All matches of a round
+are rated simultaneously, hence, the whole history is recomputed round by round (vectorized with numpy for large
+rounds) whenever the parameters change.
+"""
+import json
+import os
+
+from array import array
+from datetime import date
+from typing import List
+
+from model.archive import BYE_NAME, get_winner, iter_records
+from model.pairing_criteria import np
+from model.persistence import write_atomically
+
+STORE_FILE_NAME = 'rating_store.json'
+
+# stores of another version are built once again
+STORE_VERSION = 2
+
+# numpy only pays off for large rounds, the overhead per call exceeds the plain python loop for a few matches per round
+MIN_VECTORIZED_BATCH_SIZE = 32
+
+
+class MatchStore:
+    """ Finished matches of the archive as columns, in chronological order. """
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+        self.first = array('l')
+        self.second = array('l')
+        self.first_won = array('b')
+
+        # consecutive matches with the same batch are rated simultaneously (one round of a tournament)
+        self.batch = array('l')
+        self._num_batches = 0
+
+        # day of the tournaments -> number of matches, tournaments are only read once (a day is always read completely
+        # as today's tournaments are not part of the store)
+        self.sources = {}
+
+    def __len__(self):
+        return len(self.first)
+
+    def get_index(self, name: str) -> int:
+        if name not in self._index:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+
+        return self._index[name]
+
+    def find(self, name: str) -> int or None:
+        return self._index.get(name)
+
+    def ingest(self, directory: str, before: date = None) -> int:
+        """ Adds the tournaments before the given day (default: today) that have not yet been read, returns the number
+        of added matches. Today's tournament is still running, its matches are applied by the `RatingEngine`.
+        """
+        if before is None:
+            before = date.today()
+
+        num_matches = len(self)
+
+        processed_days = {date.fromisoformat(day) for day in self.sources}
+
+        for file_date, record in iter_records(directory, before=before, skip_days=processed_days):
+            indices = {p['id']: self.get_index(p['name']) for p in record['players']}
+            num_tournament_matches = len(self)
+
+            for matches in record['rounds']:
+                self._num_batches += 1
+
+                for match in matches:
+                    # the bye is not rated, unfinished matches (e.g. of an aborted tournament) are skipped
+                    winner = get_winner(record, match)
+                    if match['second'] is None or winner is None:
+                        continue
+
+                    self.first.append(indices[match['first']])
+                    self.second.append(indices[match['second']])
+                    self.first_won.append(int(winner == match['first']))
+                    self.batch.append(self._num_batches)
+
+            self.sources[file_date.isoformat()] = (self.sources.get(file_date.isoformat(), 0) + len(self) -
+                                                   num_tournament_matches)
+
+        return len(self) - num_matches
+
+    def to_dict(self) -> dict:
+        return {
+            'version': STORE_VERSION,
+            'names': self.names,
+            'first': self.first.tolist(),
+            'second': self.second.tolist(),
+            'first_won': self.first_won.tolist(),
+            'batch': self.batch.tolist(),
+            'sources': self.sources,
+        }
+
+    @staticmethod
+    def from_dict(data: dict):
+        if data.get('version') != STORE_VERSION:
+            raise ValueError(f"version {data.get('version')} instead of {STORE_VERSION}")
+
+        store = MatchStore()
+
+        for name in data['names']:
+            store.get_index(name)
+
+        store.first = array('l', data['first'])
+        store.second = array('l', data['second'])
+        store.first_won = array('b', data['first_won'])
+        store.batch = array('l', data['batch'])
+        store._num_batches = max(store.batch, default=0)
+        store.sources = dict(data['sources'])
+
+        return store
+
+
+def load_match_store(directory: str) -> MatchStore:
+    """ Cached store of the tournaments within the given folder, updated with the tournaments added since. """
+    path = os.path.join(directory, STORE_FILE_NAME)
+
+    store = MatchStore()
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as file:
+                store = MatchStore.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: rating store could not be loaded, the tournaments are read once again: {e}")
+            store = MatchStore()
+
+    if store.ingest(directory) > 0 or not os.path.exists(path):
+        try:
+            write_atomically(path, json.dumps(store.to_dict()))
+        except OSError as e:
+            print(f"Warning: rating store could not be written: {e}")
+
+    return store
+
+
+class RatingEngine:
+    def __init__(self, store: MatchStore, initial_ratings: dict = None, default_rating: float = 1000,
+                 k_factor: float = 16, provisional_k_factor: float = 32, provisional_matches: int = 10,
+                 scale: float = 150):
+        self._store = store
+
+        # name -> rating the player starts with (e.g. the ttr), unknown players start with the default rating
+        self._initial_ratings = initial_ratings or {}
+        self.default_rating = default_rating
+
+        # the first `provisional_matches` matches of a player are rated with the larger k factor
+        self.k_factor = k_factor
+        self.provisional_k_factor = provisional_k_factor
+        self.provisional_matches = provisional_matches
+
+        self.scale = scale
+
+        # match of the running tournament -> (set results, applied changes), see `update`
+        self._live = {}
+
+        # name -> index of the players without any match in the archive, only known to this engine as the store may be
+        # shared by several tournaments (indices following the players of the store)
+        self._live_index = {}
+
+        self.recompute()
+
+    def recompute(self):
+        """ Rates the whole archive once again (e.g. after the parameters have been changed). """
+        names = self._store.names
+        self._ratings = [self._initial_ratings.get(name, self.default_rating) for name in names]
+        self._games = [0] * len(names)
+        self._live_index = {}
+
+        batches = self._get_batches()
+        if np is not None and len(self._store) >= MIN_VECTORIZED_BATCH_SIZE * len(batches):
+            self._rate_archive_vectorized(batches)
+        else:
+            self._rate_archive(batches)
+
+        # the ratings before today's tournament, e.g. to display today's changes
+        self._archive_ratings = list(self._ratings)
+
+        live_matches = list(self._live)
+        self._live = {}
+        self.sync(live_matches)
+
+    def get_rating(self, name: str) -> float:
+        index = self._find(name)
+        if index is None:
+            return self._initial_ratings.get(name, self.default_rating)
+
+        return self._ratings[index]
+
+    def get_change(self, name: str) -> float:
+        """ Change of the rating within today's tournament. """
+        index = self._find(name)
+        if index is None:
+            return 0
+
+        # players without any match in the archive
+        if index >= len(self._archive_ratings):
+            return self._ratings[index] - self._initial_ratings.get(name, self.default_rating)
+
+        return self._ratings[index] - self._archive_ratings[index]
+
+    def sync(self, matches: List):
+        """ Has to be called with all matches of the running tournament whenever results have changed.
+
+        Only finished matches count. Matches whose results have changed are rated once again with the current ratings
+        (i.e. a correction does not replay the matches played since), matches that are no longer part of the
+        tournament (e.g. undone) are removed.
+        """
+        # ordered like the given matches
+        matches = dict.fromkeys(matches)
+
+        for match in [m for m in self._live if m not in matches]:
+            self._revert(match)
+
+        for match in matches:
+            self.update(match)
+
+    def update(self, match):
+        """ Applies the result of the given match of the running tournament (once it is finished). """
+        previous = self._live.get(match)
+
+        # the set results are immutable tuples, i.e. unchanged as long as it is the same tuple
+        if previous is not None and previous[0] is match.set_results:
+            return
+
+        self._revert(match)
+
+        # the bye is not rated
+        if not match.is_finished() or BYE_NAME in (match.first_player_name, match.second_player_name):
+            self._live[match] = (match.set_results, None)
+            return
+
+        i = self._get_player(match.first_player_name)
+        j = self._get_player(match.second_player_name)
+
+        delta_i, delta_j = self._get_changes(self._ratings[i], self._ratings[j], self._games[i], self._games[j],
+                                             int(match.sets_won() > match.sets_lost()))
+
+        self._apply(i, j, delta_i, delta_j, 1)
+        self._live[match] = (match.set_results, (i, j, delta_i, delta_j))
+
+    def _revert(self, match):
+        _, applied = self._live.pop(match, (None, None))
+
+        if applied is not None:
+            i, j, delta_i, delta_j = applied
+            self._apply(i, j, -delta_i, -delta_j, -1)
+
+    def _apply(self, i: int, j: int, delta_i: float, delta_j: float, sign: int):
+        self._ratings[i] += delta_i
+        self._ratings[j] += delta_j
+        self._games[i] += sign
+        self._games[j] += sign
+
+    def _find(self, name: str) -> int or None:
+        index = self._store.find(name)
+        if index is not None and index < len(self._archive_ratings):
+            return index
+
+        return self._live_index.get(name)
+
+    def _get_player(self, name: str) -> int:
+        index = self._find(name)
+
+        # players without any match in the archive
+        if index is None:
+            index = len(self._ratings)
+            self._live_index[name] = index
+            self._ratings.append(self._initial_ratings.get(name, self.default_rating))
+            self._games.append(0)
+
+        return index
+
+    def _get_k(self, games: int) -> float:
+        return self.provisional_k_factor if games < self.provisional_matches else self.k_factor
+
+    def _get_changes(self, rating_i: float, rating_j: float, games_i: int, games_j: int, first_won: int) -> tuple:
+        expected = 1 / (1 + 10 ** ((rating_j - rating_i) / self.scale))
+
+        return self._get_k(games_i) * (first_won - expected), self._get_k(games_j) * (expected - first_won)
+
+    def _get_batches(self) -> list:
+        """ (start, end) of the rows of each batch. """
+        batch = self._store.batch
+        if len(batch) == 0:
+            return []
+
+        if np is not None:
+            ends = (np.flatnonzero(np.diff(np.asarray(batch))) + 1).tolist() + [len(batch)]
+        else:
+            ends = [end for end in range(1, len(batch)) if batch[end] != batch[end - 1]] + [len(batch)]
+
+        return list(zip([0] + ends[:-1], ends))
+
+    def _rate_archive(self, batches: list):
+        first, second, first_won = self._store.first, self._store.second, self._store.first_won
+
+        for start, end in batches:
+            # all matches of the round are rated with the ratings before the round
+            changes = [(first[m], second[m]) + self._get_changes(self._ratings[first[m]], self._ratings[second[m]],
+                                                                 self._games[first[m]], self._games[second[m]],
+                                                                 first_won[m])
+                       for m in range(start, end)]
+
+            for i, j, delta_i, delta_j in changes:
+                self._apply(i, j, delta_i, delta_j, 1)
+
+    def _rate_archive_vectorized(self, batches: list):
+        first = np.asarray(self._store.first, dtype=np.int64)
+        second = np.asarray(self._store.second, dtype=np.int64)
+        first_won = np.asarray(self._store.first_won, dtype=np.float64)
+
+        batch = np.asarray(self._store.batch, dtype=np.int64)
+
+        ratings = np.array(self._ratings, dtype=np.float64)
+        games = np.zeros(len(ratings), dtype=np.int64)
+
+        # a player takes part in at most one match per round, otherwise the changes have to be accumulated (slower)
+        players = np.concatenate([first, second])
+        player_batches = np.concatenate([batch, batch])
+        order = np.lexsort((players, player_batches))
+        repeated = (np.diff(players[order]) == 0) & (np.diff(player_batches[order]) == 0)
+        accumulated_batches = set(player_batches[order][1:][repeated].tolist())
+
+        for start, end in batches:
+            i = first[start:end]
+            j = second[start:end]
+
+            expected = 1 / (1 + 10 ** ((ratings[j] - ratings[i]) / self.scale))
+            k_i = np.where(games[i] < self.provisional_matches, self.provisional_k_factor, self.k_factor)
+            k_j = np.where(games[j] < self.provisional_matches, self.provisional_k_factor, self.k_factor)
+            delta_i = k_i * (first_won[start:end] - expected)
+            delta_j = k_j * (expected - first_won[start:end])
+
+            if batch[start] in accumulated_batches:
+                np.add.at(ratings, i, delta_i)
+                np.add.at(ratings, j, delta_j)
+                np.add.at(games, i, 1)
+                np.add.at(games, j, 1)
+            else:
+                ratings[i] += delta_i
+                ratings[j] += delta_j
+                games[i] += 1
+                games[j] += 1
+
+        self._ratings = ratings.tolist()
+        self._games = games.tolist()
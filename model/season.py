@@ -0,0 +1,63 @@
+""" Season ranking accumulated over all tournaments of a season (september - august of next year).
+
+Points are assigned for the first CONSIDERED_RANKS places of each tournament (points = CONSIDERED_RANKS + 1 - place).
+"""
+import functools
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List
+
+from model.archive import get_names, iter_records
+
+# only first five players are awared with points
+CONSIDERED_RANKS = 5
+
+
+@dataclass
+@functools.total_ordering
+class SeasonRanking:
+    total_points: int = 0
+
+    placement_histogram: List[int] = field(default_factory=list)
+
+    def __lt__(self, other):
+        return self.total_points < other.total_points
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.total_points == other.total_points
+
+
+def get_season(day: date = None) -> tuple:
+    """ First and last day of the season of the given day (default: today). """
+    if day is None:
+        day = date.today()
+
+    start_year = day.year if day >= date(day.year, 9, 1) else day.year - 1
+
+    return date(start_year, 9, 1), date(start_year + 1, 8, 31)
+
+
+def read_season_ranking(directory: str, first_day: date = None, last_day: date = None) -> OrderedDict:
+    """ Player name -> SeasonRanking of the tournaments between the given days (both inclusive), best first. """
+    after = None if first_day is None else first_day - timedelta(days=1)
+    before = None if last_day is None else last_day + timedelta(days=1)
+
+    # extract ranking from the stored tournament history (one tournament at a time)
+    season_ranking = {}
+    for _, record in iter_records(directory, after=after, before=before):
+        names = get_names(record)
+
+        for rank, player_id in enumerate(record['ranking'], 1):
+            player_name = names[player_id]
+            if player_name not in season_ranking:
+                season_ranking[player_name] = SeasonRanking()
+                season_ranking[player_name].placement_histogram = [0] * CONSIDERED_RANKS
+
+            if rank <= CONSIDERED_RANKS:
+                season_ranking[player_name].total_points += CONSIDERED_RANKS + 1 - rank
+                season_ranking[player_name].placement_histogram[rank - 1] += 1
+
+    # sort the dict based on total points
+    return OrderedDict(sorted(season_ranking.items(), key=lambda elem: elem[1].total_points, reverse=True))
@@ -0,0 +1,144 @@
+""" Seeding of the first round: instead of a single random draw, many candidate draws are generated and rated.
+
+Each candidate is drawn like the classic first round (upper half by TTR is seated, lower half randomly assigned), but
+with its own seed, hence, the same candidate can always be reproduced from its seed. The candidates are evaluated one
+after another until all candidates have been rated or the time budget is used up. The draw with the lowest score wins
+(on equal scores the lower seed).
+
+The candidates are evaluated within the calling process: a process pool does not pay off for a few thousand cheap
+candidates (about 0.1 s in total) and forking the multithreaded app may deadlock.
+"""
+import collections
+import math
+import random
+import time
+
+from typing import List
+
+# plain data is sufficient for rating a draw (and independent of the tournament players)
+SeedingPlayer = collections.namedtuple('SeedingPlayer', ['id', 'name', 'ttr', 'handicap', 'is_bye'])
+
+
+class SeedingMetric:
+    """ Base class of the quality metrics of a draw (0: ideal), a weight of 0 disables the metric. """
+    name = None
+
+    def __init__(self, weight: float):
+        self.weight = weight
+
+    def score(self, pairs: List[tuple]) -> float:
+        """ Rates the given pairs of `SeedingPlayer`s (matches against the bye are not included). """
+        raise NotImplementedError
+
+
+class RatingSpread(SeedingMetric):
+    """ All matches should be similarly unbalanced, i.e. no single match of the best against the worst player. """
+    name = 'rating_spread'
+
+    def score(self, pairs):
+        differences = [abs(p1.ttr - p2.ttr) for p1, p2 in pairs]
+
+        mean = sum(differences) / len(differences)
+        return math.sqrt(sum((d - mean) ** 2 for d in differences) / len(differences))
+
+
+class HandicapBalance(SeedingMetric):
+    """ Large handicaps are the least reliable, hence, the average handicap (in points) should be small. """
+    name = 'handicap_balance'
+
+    def score(self, pairs):
+        return sum(abs(p1.handicap - p2.handicap) for p1, p2 in pairs) / len(pairs)
+
+
+class RepeatAvoidance(SeedingMetric):
+    """ Pairings of the previous tournament (see `model.archive.read_previous_pairings`) should not be repeated. """
+    name = 'repeat_avoidance'
+
+    def __init__(self, weight: float, previous_pairings: set):
+        super().__init__(weight)
+
+        # frozensets of the names of both players
+        self.previous_pairings = previous_pairings
+
+    def score(self, pairs):
+        return sum(frozenset((p1.name, p2.name)) in self.previous_pairings for p1, p2 in pairs)
+
+
+def default_metrics(with_handicaps: bool, previous_pairings: set = None) -> List[SeedingMetric]:
+    metrics = [
+        # dominates the other metrics
+        RepeatAvoidance(weight=1000, previous_pairings=previous_pairings or set()),
+
+        RatingSpread(weight=1),
+    ]
+
+    if with_handicaps:
+        metrics.append(HandicapBalance(weight=10))
+
+    return metrics
+
+
+def draw_candidate(players: List[SeedingPlayer], rng) -> List[tuple]:
+    """ Classic first round: the upper half by TTR is seated, the lower half is randomly assigned. """
+    sorted_players = sorted(players, key=lambda p: p.ttr, reverse=True)
+
+    seated_players = sorted_players[:len(sorted_players)//2]
+    players_to_assign = sorted_players[len(sorted_players)//2:]
+
+    pairs = []
+    for first_player in seated_players:
+        index = rng.randint(0, len(players_to_assign) - 1)
+
+        pairs.append((first_player, players_to_assign[index]))
+        del players_to_assign[index]
+
+    return pairs
+
+
+def score_candidate(pairs: List[tuple], metrics: List[SeedingMetric]) -> float:
+    pairs = [(p1, p2) for p1, p2 in pairs if not p1.is_bye and not p2.is_bye]
+
+    if len(pairs) == 0:
+        return 0
+
+    return sum(m.weight * m.score(pairs) for m in metrics if m.weight != 0)
+
+
+def evaluate_candidates(players: List[SeedingPlayer], metrics: List[SeedingMetric], seeds: List[int],
+                        deadline: float):
+    """ Returns (score, seed) of the best of the given candidates, at least one candidate is evaluated. """
+    best = None
+
+    for seed in seeds:
+        result = (score_candidate(draw_candidate(players, random.Random(seed)), metrics), seed)
+
+        if best is None or result < best:
+            best = result
+
+        if time.monotonic() > deadline:
+            break
+
+    return best
+
+
+class PortfolioSeeding:
+    def __init__(self, metrics: List[SeedingMetric], num_candidates: int = 2000, time_budget: float = 0.5):
+        self.metrics = metrics
+        self.num_candidates = num_candidates
+
+        # seconds
+        self.time_budget = time_budget
+
+    def draw(self, players: List, rng) -> List[tuple]:
+        """ Returns (seated player, assigned player) of the best draw for the given tournament players. """
+        deadline = time.monotonic() + self.time_budget
+
+        seeding_players = [SeedingPlayer(p.id, p.name, p.ttr, p.handicap, p.is_bye()) for p in players]
+
+        base_seed = rng.getrandbits(32)
+        seeds = [base_seed + i for i in range(self.num_candidates)]
+
+        _, best_seed = evaluate_candidates(seeding_players, self.metrics, seeds, deadline)
+
+        by_id = {p.id: p for p in players}
+        return [(by_id[p1.id], by_id[p2.id]) for p1, p2 in draw_candidate(seeding_players, random.Random(best_seed))]
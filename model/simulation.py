@@ -0,0 +1,200 @@
+""" Reproducible simulation of complete tournaments, e.g. to tune the handicaps or the number of rounds.
+
+Run from the repository root:
+    python -m model.simulation resources/players.json --tournaments 1000 --rounds 5 --seed 1
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from model.data_classes import GameMode, Match, Player
+from model.swiss_system import Tournament
+
+
+class StrengthModel:
+    """ Derives the probability of winning a single rally from the strength of the two players. """
+
+    def __init__(self, ttr_scale: float = 4000, max_advantage: float = 0.3, handicap_ttr_points: float = 0):
+        self.ttr_scale = ttr_scale
+        self.max_advantage = max_advantage
+
+        # > 0: the handicap is (additionally) interpreted as a strength difference of this many ttr points
+        self.handicap_ttr_points = handicap_ttr_points
+
+    def strength(self, player) -> float:
+        return player.ttr - player.handicap * self.handicap_ttr_points
+
+    def rally_win_probability(self, first_player, second_player) -> float:
+        advantage = (self.strength(first_player) - self.strength(second_player)) / self.ttr_scale
+        return 0.5 + min(max(advantage, -self.max_advantage), self.max_advantage)
+
+
+def simulate_set(rally_win_probability: float, start_offset: int, rng: random.Random) -> float:
+    # handicap points are granted to the weaker player at the beginning of each set
+    points_1 = max(start_offset, 0)
+    points_2 = max(-start_offset, 0)
+
+    while True:
+        if rng.random() < rally_win_probability:
+            points_1 += 1
+        else:
+            points_2 += 1
+
+        if max(points_1, points_2) >= 11 and abs(points_1 - points_2) >= 2:
+            break
+
+    # encoding of the set results as used by `Score`
+    if points_1 > points_2:
+        return float(points_2)
+    return -1.0 * points_1
+
+
+def simulate_match(match: Match, first_player, second_player, strength_model: StrengthModel, rng: random.Random):
+    rally_win_probability = strength_model.rally_win_probability(first_player, second_player)
+
+    idx = 0
+    while not match.is_finished():
+        match.update_set_result(idx, simulate_set(rally_win_probability, match.start_offset, rng))
+        idx += 1
+
+
+def simulate_tournament(players: List[Player], game_mode: GameMode, with_handicaps: bool, num_rounds: int, seed: int,
+                        strength_model: StrengthModel = None) -> dict:
+    if strength_model is None:
+        strength_model = StrengthModel()
+
+    # separate generators for the draw and the results, otherwise changing the pairing would change all results
+    rng = random.Random(seed)
+    tournament = Tournament(game_mode, players, with_handicaps, seed=rng.getrandbits(64))
+
+    played_pairs = set()
+    repeat_pairings = 0
+    num_pairings = 0
+    failed_rounds = 0
+
+    for _ in range(min(num_rounds, tournament.get_max_number_of_rounds())):
+        if not tournament.generate_next_round():
+            failed_rounds += 1
+            break
+
+        tournament_players = tournament.get_players()
+        for match in tournament.get_running_matches():
+            p1 = tournament_players[match.first_player_id]
+            p2 = tournament_players[match.second_player_id]
+
+            if p2.is_bye():
+                continue
+
+            pair = (min(p1.id, p2.id), max(p1.id, p2.id))
+            if pair in played_pairs:
+                repeat_pairings += 1
+            played_pairs.add(pair)
+            num_pairings += 1
+
+            simulate_match(match, p1, p2, strength_model, rng)
+
+    placements = {p.name: rank for rank, p in enumerate(tournament.get_ranking(), 1)}
+
+    return {
+        'placements': placements,
+        'repeat_pairings': repeat_pairings,
+        'num_pairings': num_pairings,
+        'failed_rounds': failed_rounds,
+    }
+
+
+def _simulate_tournament_job(args):
+    # players are passed as plain dicts to keep the pickled payload of the process pool small
+    json_players, game_mode, with_handicaps, num_rounds, seed, strength_model = args
+    players = [Player(**p) for p in json_players]
+    return simulate_tournament(players, game_mode, with_handicaps, num_rounds, seed, strength_model)
+
+
+def run_simulations(players: List[Player], game_mode: GameMode, with_handicaps: bool, num_rounds: int,
+                    num_tournaments: int, seed: int = 0, strength_model: StrengthModel = None,
+                    processes: int = None) -> dict:
+    """ Simulates `num_tournaments` independent tournaments in a process pool and aggregates their statistics.
+
+    The result only depends on the seed, i.e. not on the number of processes.
+    """
+    if strength_model is None:
+        strength_model = StrengthModel()
+
+    seed_rng = random.Random(seed)
+    json_players = [dict(p) for p in players]
+    jobs = [(json_players, game_mode, with_handicaps, num_rounds, seed_rng.getrandbits(64), strength_model)
+            for _ in range(num_tournaments)]
+
+    if processes == 1:
+        results = [_simulate_tournament_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_simulate_tournament_job, jobs, chunksize=max(1, num_tournaments // 64)))
+
+    return aggregate_results(results, [p.name for p in players])
+
+
+def aggregate_results(results: List[dict], player_names: List[str]) -> dict:
+    placements = {name: [] for name in player_names}
+
+    for result in results:
+        for name, rank in result['placements'].items():
+            placements[name].append(rank)
+
+    players = {}
+    for name, ranks in placements.items():
+        if len(ranks) == 0:
+            continue
+
+        players[name] = {
+            'expected_placement': statistics.mean(ranks),
+            'placement_stdev': statistics.pstdev(ranks),
+            'win_rate': ranks.count(1) / len(ranks),
+            'podium_rate': sum(1 for r in ranks if r <= 3) / len(ranks),
+        }
+
+    num_pairings = sum(r['num_pairings'] for r in results)
+
+    return {
+        'num_tournaments': len(results),
+        'players': dict(sorted(players.items(), key=lambda elem: elem[1]['expected_placement'])),
+        'repeat_pairing_rate': sum(r['repeat_pairings'] for r in results) / num_pairings if num_pairings > 0 else 0,
+        'failed_round_rate': sum(r['failed_rounds'] for r in results) / len(results) if len(results) > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('players', help='player database (json)')
+    parser.add_argument('--tournaments', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=None, help='defaults to the upper end of the recommendation')
+    parser.add_argument('--best-of', type=int, choices=[2, 3], default=3)
+    parser.add_argument('--no-handicap', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--ttr-scale', type=float, default=4000)
+    parser.add_argument('--handicap-ttr-points', type=float, default=0)
+    args = parser.parse_args()
+
+    with open(args.players, 'r') as file:
+        players = [Player(**p) for p in json.load(file)]
+
+    num_rounds = args.rounds
+    if num_rounds is None:
+        num_rounds = min(math.ceil(math.log2(len(players))) + 2, len(players) - 1)
+
+    aggregated = run_simulations(players, GameMode(args.best_of), not args.no_handicap, num_rounds, args.tournaments,
+                                 seed=args.seed, processes=args.processes,
+                                 strength_model=StrengthModel(ttr_scale=args.ttr_scale,
+                                                              handicap_ttr_points=args.handicap_ttr_points))
+
+    print(json.dumps(aggregated, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,80 @@
+import collections
 import copy
 import random
 import networkx as nx
 
-from model.data_classes import TournamentPlayer, PlayerBye, Match, initialize_field_of_participants
+from model.data_classes import (GameMode, Player, TournamentPlayer, PlayerBye, Match, DisplayNameIndex,
+                                initialize_field_of_participants)
+from model.pairing_criteria import PairingCostModel, criteria_from_spec, default_criteria
+from model.pairing_optimizer import PairingOptimizer
+from model.profiling import measure, timed
+from model.tie_breaks import TieBreakEngine
+
+# snapshot of everything that changes while the tournament is running (see `Tournament.get_state`)
+TournamentState = collections.namedtuple('TournamentState', ['round_count', 'player_rounds', 'finished_matches',
+                                                             'round_matches', 'results'])
+
+# larger fields are paired by the anytime optimizer as the exact matching would take too long (several seconds)
+MAX_PLAYERS_EXACT_PAIRING = 64
 
 
 class Tournament:
-    def __init__(self, win_condition, players, with_handicaps):
+    def __init__(self, win_condition, players, with_handicaps, seed=None, rolling_rounds=0, max_round_lead=1,
+                 rolling_min_free=4, criteria=None, pairing_time_budget=0.2, seeding=None,
+                 tie_breaks=None):
         self._win_condition = win_condition
         self._with_handicaps = with_handicaps
+
+        # criteria defining the cost of pairing two players (see model/pairing_criteria.py)
+        if criteria is None:
+            criteria = default_criteria(with_handicaps)
+        self._cost_model = PairingCostModel(criteria)
+
+        # order of the tie-breaks of the ranking (see model/tie_breaks.py), None -> default order
+        self._tie_breaks = TieBreakEngine(tie_breaks)
+
+        # own random number generator to be able to reproduce the draw (e.g. for simulations)
+        self._rng = random.Random(seed)
+
+        # seconds the optimizer may take for large fields (None -> always exact pairing)
+        self._pairing_time_budget = pairing_time_budget
+        self._optimizer = PairingOptimizer(self._cost_model, pairing_time_budget or 0, rng=self._rng)
+
+        # selects the best of many candidate draws for the first round (see model/seeding.py), None -> single draw
+        self._seeding = seeding
+
+        # rolling mode: instead of waiting for the whole round, players that have finished their match are paired
+        # among themselves until each player has played `rolling_rounds` rounds (0 -> disabled)
+        self._rolling_rounds = rolling_rounds
+
+        # players may only be paired if they are at most this many rounds ahead of the slowest player
+        self._max_round_lead = max_round_lead
+
+        # minimum number of waiting players before a pairing is generated (as long as further players may finish)
+        self._rolling_min_free = rolling_min_free
+
         self._round_count = 0
         self._finished_matches = []
         self._round_matches = []
 
-        self._players = initialize_field_of_participants(players, add_bye=True)
+        # finished rounds as tuples, shared by all snapshots as long as the round does not change
+        self._frozen_rounds = []
+
+        # late entries are only checked against the display names of the other players
+        self._display_names = DisplayNameIndex(players)
+        self._players = initialize_field_of_participants(players, add_bye=True, display_names=self._display_names)
+
+        # the bye keeps its id once created (also if an entry or withdrawal makes the field even again)
+        self._bye = self._players[-1] if self._players[-1].is_bye() else None
+
+        # players that have left the tournament (not paired any longer, their results stay valid)
+        self._withdrawn = set()
+
+        # rolling mode: players that received a bye in the last pairing as no valid opponent was left for them
+        self._stalled_players = []
+
+        # number of rounds each player has been paired for, the overall round count is the maximum of it
+        self._player_rounds = [0] * len(self._players)
 
     def get_running_matches(self):
         return self._round_matches
@@ -22,43 +83,218 @@ class Tournament:
         return self._round_count
 
     def get_max_number_of_rounds(self):
-        return len(self._players) - 1
+        # every player (and the bye in case of an odd field) once against each other
+        num_players = len(self.get_active_players())
+        max_rounds = num_players if num_players % 2 != 0 else num_players - 1
+
+        if self.is_rolling():
+            return min(self._rolling_rounds, max_rounds)
+
+        return max_rounds
+
+    def get_player_round(self, player_id: int):
+        return self._player_rounds[player_id]
+
+    def get_active_players(self):
+        """ Players that are paired for the next rounds (i.e. neither the bye nor withdrawn). """
+        return [p for p in self._players if not p.is_bye() and p.id not in self._withdrawn]
+
+    def is_withdrawn(self, player_id: int):
+        return player_id in self._withdrawn
+
+    def add_player(self, player: Player):
+        """ Late entry: the player is paired from the next round on, missed rounds simply count as not played.
+
+        Only the display name of the new player is checked against the others, names of other players are only
+        extended if they collide with it. Returns the new tournament player.
+        """
+        changed_indices = self._display_names.add(player)
+
+        # the display name index only contains the real players (in the order of their ids)
+        real_players = [p for p in self._players if not p.is_bye()]
+
+        new_player = TournamentPlayer(len(self._players), **player,
+                                      display_name=self._display_names.get_display_name(len(real_players)))
+
+        for index in changed_indices:
+            self._update_display_name(real_players[index], self._display_names.get_display_name(index))
+
+        # the new player starts with the round of the slowest player (relevant for the rolling mode)
+        start_round = min((self._player_rounds[p.id] for p in self.get_active_players()), default=0)
+
+        self._players.append(new_player)
+        self._player_rounds.append(start_round)
+
+        return new_player
+
+    def withdraw_player(self, player_id: int):
+        """ The player is not paired any longer, previous results stay valid (e.g. for the buchholz of the opponents).
+
+        A running match is lost by walkover, i.e. the remaining sets are won 11:0 by the opponent. Returns the matches
+        that have been changed.
+        """
+        self._withdrawn.add(player_id)
+
+        changed_matches = []
+        for match in self._round_matches:
+            if match.is_finished() or player_id not in (match.first_player_id, match.second_player_id):
+                continue
+
+            # results are stored from the view of the first player (-0.0 -> 0:11)
+            result = -0.0 if match.first_player_id == player_id else 0.0
+
+            for idx, previous in enumerate(match.set_results):
+                if match.is_finished():
+                    break
+
+                if previous is None:
+                    match.update_set_result(idx, result)
+
+            match.walkover = True
+            changed_matches.append(match)
+
+        self.update_player_statistics(changed_matches)
+
+        return changed_matches
+
+    def _update_display_name(self, player, display_name):
+        player.display_name = display_name
+
+        for match in self._round_matches:
+            if match.first_player_id == player.id:
+                match.first_player_display_name = display_name
+            elif match.second_player_id == player.id:
+                match.second_player_display_name = display_name
+
+    def is_rolling(self):
+        return self._rolling_rounds > 0
+
+    def get_rolling_rounds(self):
+        return self._rolling_rounds
+
+    def has_handicaps(self):
+        return self._with_handicaps
+
+    def get_stalled_players(self):
+        """ Rolling mode: players that received a bye in the last call of `pair_free_players` as all remaining
+        players had already played against them (i.e. the tournament could not have been finished otherwise).
+        """
+        return self._stalled_players
 
     def generate_first_round(self):
         self._round_count = 1
 
+        field = self.get_active_players()
+        if len(field) % 2 != 0:
+            field.append(self._get_bye())
+
+        if self._seeding is not None:
+            pairs = self._seeding.draw(field, self._rng)
+        else:
+            pairs = self._draw_first_round(field)
+
+        # create matches
+        for first_player, second_player in pairs:
+            match = self._generate_match(first_player, second_player)
+
+            self._round_matches.append(match)
+
+    def _draw_first_round(self, players):
         # sort players by TTR and seat the upper half, lower half is randomly assigned
-        sorted_players = sorted(self._players, key=lambda p: p.ttr, reverse=True)
+        sorted_players = sorted(players, key=lambda p: p.ttr, reverse=True)
 
         seated_players = sorted_players[:len(sorted_players)//2]
         players_to_assign = sorted_players[len(sorted_players)//2:]
 
-        # create matches
+        pairs = []
         for first_player in seated_players:
-            index = random.randint(0, len(players_to_assign) - 1)
+            index = self._rng.randint(0, len(players_to_assign) - 1)
 
-            second_player = players_to_assign[index]
+            pairs.append((first_player, players_to_assign[index]))
             del players_to_assign[index]
 
-            match = self._generate_match(first_player, second_player)
+        return pairs
 
-            self._round_matches.append(match)
 
+    @timed('generate_next_round')
+    def generate_next_round(self) -> bool:
+        """ Returns whether new matches have been generated, otherwise (no valid draw) nothing has been changed.
 
-    def generate_next_round(self):
+        Withdrawals may leave the remaining players without enough opponents they have not played yet, hence, the
+        draw may fail before the maximum number of rounds has been reached.
+        """
         if self._round_count == 0:
             self.generate_first_round()
-            return
+            return True
 
-        self._finished_matches.append(self._round_matches)
+        if self.is_rolling():
+            return len(self.pair_free_players()) > 0
 
-        # ensure that finished matches are reflected in the win-lose relationships of the players
+        # ensure that finished matches are reflected in the win-lose relationships of the players (the statistics
+        # already include the running matches, i.e. nothing changes if no valid draw is found below)
         self.update_player_statistics(self._round_matches)
 
+        # the bye is assigned beforehand, hence, the matching only has to deal with an even field of real players
+        field = self.get_active_players()
+
+        bye_player = None
+        if len(field) % 2 != 0 and self.get_max_number_of_rounds() - self._round_count > 3:
+            for bye_player in self.get_bye_candidates(field):
+                pairings = self.find_pairings([p for p in field if p is not bye_player])
+                if len(pairings) == (len(field) - 1) // 2:
+                    break
+            else:
+                # the current round is kept as it is
+                return False
+        else:
+            # close to a complete round robin the choice of the bye decides whether the remaining rounds are still
+            # possible, hence, the bye has to take part in the matching
+            if len(field) % 2 != 0:
+                field.append(self._get_bye())
+
+            pairings = self.find_pairings(field)
+
+            if len(pairings) != len(field) // 2:
+                return False
+
+        # create the proposed matches
+        matches = []
+
+        for p1_id, p2_id in pairings.items():
+            # bye player should always be listed as second player
+            if p1_id > p2_id:
+                p2_id, p1_id = (p1_id, p2_id)
+
+            p1 = self._players[p1_id]
+            p2 = self._players[p2_id]
+
+            match = self._generate_match(p1, p2)
+            matches.append(match)
+
+        if bye_player is not None:
+            matches.append(self._generate_match(bye_player, self._get_bye()))
+
+        # the current round is only moved into the history once the next one has been drawn
+        self._finished_matches.append(self._round_matches)
+
+        self._round_matches = matches
+        self._round_count += 1
+
+        return True
+
+    def find_pairings(self, players) -> dict:
+        """ Pairs the given players (even number) with each other, an incomplete result means there is no valid draw. """
+        if self._use_optimizer(players):
+            pairings = self._optimizer.optimize(players)
+
+            # the exact matching is only needed if the optimizer could not find a valid draw in time
+            if len(pairings) == len(players) // 2:
+                return pairings
+
         # match generation via solving a graph based optimization problem
         # --> node: player
         # --> edge: two players have not yet played against each other
-        graph = self.generate_graph()
+        graph = self.generate_graph(players=players)
 
         # we need to keep track of the original graph as the connectivity has to be tested with all
         # edges
@@ -70,13 +306,8 @@ class Tournament:
         pairings = {}
         for attempt in range(3):
             # generate the pairings
-            pairings = dict(nx.min_weight_matching(graph))
-
-            # from matplotlib import pyplot as plt
-            # plt.figure()
-            # plt.title(f"Round {self._round_count + 1}, attempt: {attempt}")
-            # nx.draw(graph, with_labels=True)
-            # plt.show()
+            with measure('min_weight_matching'):
+                pairings = dict(nx.min_weight_matching(graph))
 
             if 1 < self.get_max_number_of_rounds() - self._round_count <= 3:
                 # check if we would still be able to find valid pairings in the next round
@@ -87,7 +318,7 @@ class Tournament:
                 if not nx.is_connected(next_round_graph):
                     # ignore weights + try again
                     if attempt == 0:
-                        graph = self.generate_graph(ignore_weights=True)
+                        graph = self.generate_graph(ignore_weights=True, players=players)
                     else:
                         # remove first pairing and try again
                         for p1, p2 in pairings.items():
@@ -99,68 +330,213 @@ class Tournament:
             # if reached the attempt was successful
             break
 
-        if len(pairings.keys()) != len(self._players) / 2:
-            # should not be reached, otherwise we simply offer to launch the generation of the next round once again
+        return pairings
+
+    def get_bye_candidates(self, players):
+        """ Players that may receive the bye, starting with the preferred one (lowest rank without a previous bye).
+
+        Only the number of wins and the ttr (cf. `TournamentPlayer.__lt__`) are considered, hence, the first candidate
+        is found in a single pass. The remaining candidates are only needed if no valid draw exists without the first.
+        """
+        candidates = [p for p in players if not p.is_bye() and not p.had_bye()]
 
-            # for graph in self._graphs:
-            #     nx.draw(graph)
-            #     from matplotlib import pyplot as plt
-            #     plt.show()
-            # import sys
-            # sys.exit(0)
+        if len(candidates) == 0:
             return
 
-        # create the proposed matches
-        matches = []
+        def rank_key(p):
+            # lowest rank: fewest wins, on equal wins the higher ttr
+            return len(p.wins), -p.ttr
+
+        first = min(candidates, key=rank_key)
+        yield first
+
+        for candidate in sorted(candidates, key=rank_key):
+            if candidate is not first:
+                yield candidate
+
+    @timed('pair_free_players')
+    def pair_free_players(self):
+        """ Rolling mode: pairs the players that are currently not playing based on the current standings.
+
+        Finished matches are moved into the history (i.e. their results are final afterwards). Returns the new matches.
+        """
+        finished_matches = [m for m in self._round_matches if m.is_finished()]
+
+        self.update_player_statistics(finished_matches)
+
+        self._stalled_players = []
+
+        free_players = self.get_free_players()
+
+        running_matches = [m for m in self._round_matches if not m.is_finished()]
 
+        # as long as further players will become available, wait for enough players to have a choice of opponents
+        if len(running_matches) > 0 and len(free_players) < self._rolling_min_free:
+            return []
+
+        bye_player, pairings = self._pair_rolling(free_players, running_matches)
+
+        # look-ahead: the pairing must not leave players behind that cannot be paired anymore at the end (e.g. the
+        # last two players of the field that have already played against each other), hence, the free players rather
+        # wait for the running matches to have a larger choice of opponents or another pairing is chosen
+        if len(pairings) > 0 and not self._can_be_finished(pairings, running_matches, bye_player):
+            if len(running_matches) > 0:
+                if self._can_be_finished({}, running_matches):
+                    return []
+            else:
+                for pair in list(pairings.items()):
+                    other_bye_player, other_pairings = self._pair_rolling(free_players, running_matches,
+                                                                          excluded_pair=pair)
+                    if len(other_pairings) == len(pairings) and \
+                            self._can_be_finished(other_pairings, running_matches, other_bye_player):
+                        bye_player, pairings = other_bye_player, other_pairings
+                        break
+
+        if len(pairings) == 0 and len(running_matches) == 0:
+            # the waiting players have already played against each other, hence, players that are further ahead have
+            # to step in as otherwise the tournament would be stuck (only as opponents of the waiting players, the
+            # others are still needed as opponents later on)
+            bye_player, pairings = self._pair_rolling(self.get_free_players(ignore_round_lead=True), running_matches,
+                                                      required_players=free_players)
+
+            if len(pairings) == 0 and bye_player is None:
+                # nobody is left to play against (can only occur at the end), the remaining players receive a bye
+                # instead of staying a round short
+                self._stalled_players = free_players
+
+        if len(pairings) == 0 and bye_player is None and len(self._stalled_players) == 0:
+            return []
+
+        # results of the finished matches are final as soon as their players are paired again
+        for match in finished_matches:
+            self._round_matches.remove(match)
+
+            while len(self._finished_matches) < match.round_number:
+                self._finished_matches.append([])
+            self._finished_matches[match.round_number - 1].append(match)
+
+        matches = []
         for p1_id, p2_id in pairings.items():
             # bye player should always be listed as second player
             if p1_id > p2_id:
                 p2_id, p1_id = (p1_id, p2_id)
 
-            p1 = self._players[p1_id]
-            p2 = self._players[p2_id]
+            matches.append(self._generate_match(self._players[p1_id], self._players[p2_id]))
 
-            match = self._generate_match(p1, p2)
-            matches.append(match)
+        if bye_player is not None:
+            matches.append(self._generate_match(bye_player, self._get_bye()))
 
-        self._round_matches = matches
-        self._round_count += 1
+        for player in self._stalled_players:
+            matches.append(self._generate_match(player, self._get_bye()))
+
+        self._round_matches += matches
+        self._round_count = max(self._player_rounds)
+
+        return matches
+
+    def _pair_rolling(self, free_players, running_matches, required_players=None, excluded_pair=None):
+        # once nobody else can join, the remaining odd player receives the bye
+        bye_player = None
+        if len(running_matches) == 0 and len(free_players) % 2 != 0 and required_players is None:
+            bye_player = next(self.get_bye_candidates(free_players), None)
+            free_players = [p for p in free_players if p is not bye_player]
+
+        required_ids = None if required_players is None else {p.id for p in required_players}
+
+        # players without any valid opponent are simply left waiting
+        if self._use_optimizer(free_players):
+            pairings = self._optimizer.optimize(free_players, excluded_pairs=None if excluded_pair is None
+                                                else [excluded_pair], required_ids=required_ids)
+        else:
+            graph = self.generate_graph(players=free_players)
+
+            if excluded_pair is not None:
+                graph.remove_edge(*excluded_pair)
+
+            # only pairings with at least one of the required players
+            if required_ids is not None:
+                graph.remove_edges_from([(u, v) for u, v in graph.edges if u not in required_ids
+                                         and v not in required_ids])
+
+            with measure('min_weight_matching'):
+                pairings = dict(nx.min_weight_matching(graph))
+
+        if required_ids is not None:
+            pairings = {p1_id: p2_id for p1_id, p2_id in pairings.items()
+                        if p1_id in required_ids or p2_id in required_ids}
+
+        return bye_player, pairings
+
+    def _can_be_finished(self, pairings, running_matches, bye_player=None):
+        """ Rolling mode: whether the players can still play all of their remaining rounds against players they have
+        not played yet once the given pairings have been added (at most a single bye).
+
+        Only checked close to the end (at most two remaining rounds per player), a player with several remaining
+        rounds is represented by one node per round, i.e. a repeated pairing between such players is not detected.
+        """
+        player_rounds = list(self._player_rounds)
+        played = {frozenset((p.id, opponent)) for p in self.get_active_players() for opponent in p.wins | p.losses}
+
+        for match in running_matches:
+            played.add(frozenset((match.first_player_id, match.second_player_id)))
+
+        for p1_id, p2_id in pairings.items():
+            player_rounds[p1_id] += 1
+            player_rounds[p2_id] += 1
+            played.add(frozenset((p1_id, p2_id)))
+
+        if bye_player is not None:
+            player_rounds[bye_player.id] += 1
+
+        remaining = {p.id: self.get_max_number_of_rounds() - player_rounds[p.id] for p in self.get_active_players()}
+        if max(remaining.values(), default=0) > 2:
+            return True
+
+        nodes = [(player_id, i) for player_id, num in remaining.items() for i in range(num)]
 
-    def generate_graph(self, ignore_weights: bool=False):
         graph = nx.Graph()
+        graph.add_nodes_from(nodes)
+        graph.add_edges_from((u, v) for i, u in enumerate(nodes) for v in nodes[i + 1:]
+                             if u[0] != v[0] and frozenset((u[0], v[0])) not in played)
 
-        for player in self._players:
-            graph.add_node(player.id)
+        with measure('look_ahead_matching'):
+            matching = nx.max_weight_matching(graph, maxcardinality=True)
 
-        for player in self._players:
-            for opponent in self._players:
-                if player == opponent or player.has_played_against(opponent.id) \
-                        or graph.has_edge(player.id, opponent.id):
-                    continue
+        return len(nodes) - 2 * len(matching) <= 1
 
-                if player == opponent or player.has_played_against(opponent.id):
-                    continue
+    def _use_optimizer(self, players):
+        return self._pairing_time_budget is not None and len(players) > MAX_PLAYERS_EXACT_PAIRING
 
-                if graph.has_edge(player.id, opponent.id):
-                    continue
+    def get_free_players(self, ignore_round_lead=False):
+        """ Rolling mode: players that are currently not playing and may be paired for their next round. """
+        busy_players = set()
+        for match in self._round_matches:
+            if not match.is_finished():
+                busy_players.add(match.first_player_id)
+                busy_players.add(match.second_player_id)
 
-                if ignore_weights:
-                    edge_weight = 1
-                else:
-                    diff_wins = abs(len(player.wins) - len(opponent.wins))
+        active_players = self.get_active_players()
+        slowest_round = min(self._player_rounds[p.id] for p in active_players)
 
-                    if self._with_handicaps:
-                        additional_diff = abs(player.handicap - opponent.handicap) * 1000
-                    else:
-                        additional_diff = min(abs(player.ttr - opponent.ttr), 1000)
+        return [p for p in active_players if p.id not in busy_players
+                and self._player_rounds[p.id] < self.get_max_number_of_rounds()
+                and (ignore_round_lead or self._player_rounds[p.id] < slowest_round + self._max_round_lead)]
 
-                    edge_weight = (diff_wins ** 2) * 10000 + additional_diff
+    @timed('generate_graph')
+    def generate_graph(self, ignore_weights: bool=False, players=None):
+        graph = nx.Graph()
 
-                graph.add_edge(player.id, opponent.id, weight=edge_weight)
+        # the bye is never part of the matching (see `get_bye_candidates`)
+        if players is None:
+            players = self.get_active_players()
 
-        return graph
+        for player in players:
+            graph.add_node(player.id)
+
+        # edges: pairs of players that have not yet played against each other, weighted by the cost of the pairing
+        graph.add_weighted_edges_from(self._cost_model.edges(players, ignore_weights=ignore_weights))
 
+        return graph
 
     def update_player_statistics(self, matches):
         for match in matches:
@@ -188,31 +564,149 @@ class Tournament:
             if not winner.id in loser.losses:
                 loser.losses.add(winner.id)
 
+        self._tie_breaks.update(matches, self._players)
+
+    @timed('get_ranking')
     def get_ranking(self):
         self.update_player_statistics(self._round_matches)
 
-        min_wins = min([len(p.wins) for p in self._players if not p.is_bye()])
+        players_without_freilos = [p for p in self._players if not p.is_bye()]
+        ranking = self._tie_breaks.get_ranking(players_without_freilos)
 
-        # update buchholz values for "fine" ranking
-        for p in self._players:
-            p.buchholz = 0
-            for loser_id in p.wins:
-                loser = self._players[loser_id]
-                if loser.is_bye():
-                    p.buchholz += min_wins
-                else:
-                    p.buchholz += len(loser.wins)
+        # accumulation of the number of wins across each opponent a player has won against (as displayed)
+        for p in players_without_freilos:
+            p.buchholz = self._tie_breaks.get_value(p.id, 'sonneborn_berger')
 
-        players_without_freilos = [p for p in self._players if not p.is_bye()]
+        return ranking
 
-        return sorted(players_without_freilos)
+    def get_player_statistics(self, player_id: int):
+        """ Sets, points and tie-break sums of the player (see `model.tie_breaks.PlayerStatistics`). """
+        return self._tie_breaks.get_statistics(player_id)
 
     def get_all_matches(self):
-        return self._finished_matches + [self._round_matches]
+        if not self.is_rolling():
+            return self._finished_matches + [self._round_matches]
+
+        # running matches may belong to different rounds
+        rounds = [list(matches) for matches in self._finished_matches]
+        for match in self._round_matches:
+            while len(rounds) < match.round_number:
+                rounds.append([])
+            rounds[match.round_number - 1].append(match)
+
+        return rounds
 
     def get_players(self):
         return self._players
 
+    def get_state(self) -> TournamentState:
+        """ Snapshot of the rounds and results, restored by `restore_state` (e.g. for undo / redo).
+
+        Nothing is copied deeply: finished rounds are shared between the snapshots and the set results of the matches
+        are immutable tuples, hence, the snapshot only references them. Changes of the field (late entries,
+        withdrawals) are not part of the snapshot.
+        """
+        for i, matches in enumerate(self._finished_matches):
+            if i == len(self._frozen_rounds):
+                self._frozen_rounds.append(tuple(matches))
+            elif len(self._frozen_rounds[i]) != len(matches):
+                # rolling mode: matches are added to previous rounds as soon as their results are final
+                self._frozen_rounds[i] = tuple(matches)
+
+        del self._frozen_rounds[len(self._finished_matches):]
+
+        return TournamentState(self._round_count, tuple(self._player_rounds), tuple(self._frozen_rounds),
+                               tuple(self._round_matches), tuple(m.set_results for m in self._round_matches))
+
+    def restore_state(self, state: TournamentState):
+        self._round_count = state.round_count
+        self._player_rounds = list(state.player_rounds)
+        self._finished_matches = [list(matches) for matches in state.finished_matches]
+        self._frozen_rounds = list(state.finished_matches)
+        self._round_matches = list(state.round_matches)
+
+        for match, results in zip(self._round_matches, state.results):
+            match.restore_results(results)
+
+        self._rebuild_player_statistics()
+
+    def _rebuild_player_statistics(self):
+        # wins, losses and byes of the players are derived from the matches
+        for p in self._players:
+            p.wins.clear()
+            p.losses.clear()
+            p.hadByeInRound = -1
+
+        self._tie_breaks.reset()
+
+        for matches in self._finished_matches + [self._round_matches]:
+            self.update_player_statistics(matches)
+
+            for match in matches:
+                if self._players[match.second_player_id].is_bye():
+                    self._players[match.first_player_id].hadByeInRound = match.round_number
+
+    def to_dict(self) -> dict:
+        """ Complete state of the tournament as plain (json serializable) data, see `from_dict`. """
+        return {
+            'game_mode': int(self._win_condition),
+            'with_handicaps': self._with_handicaps,
+            'rolling_rounds': self._rolling_rounds,
+            'max_round_lead': self._max_round_lead,
+            'rolling_min_free': self._rolling_min_free,
+            'criteria': self._cost_model.to_spec(),
+            'pairing_time_budget': self._pairing_time_budget,
+            'tie_breaks': self._tie_breaks.tie_breaks,
+            'players': [dict(p) for p in self._players if not p.is_bye()],
+            'bye_id': None if self._bye is None else self._bye.id,
+            'withdrawn': sorted(self._withdrawn),
+            'round_count': self._round_count,
+            'player_rounds': list(self._player_rounds),
+            'finished_matches': [[m.to_dict() for m in matches] for matches in self._finished_matches],
+            'running_matches': [m.to_dict() for m in self._round_matches],
+        }
+
+    @staticmethod
+    def from_dict(data: dict, seed=None):
+        tournament = Tournament(GameMode(data['game_mode']), [Player(**p) for p in data['players']],
+                                data['with_handicaps'], seed=seed, rolling_rounds=data['rolling_rounds'],
+                                max_round_lead=data['max_round_lead'], rolling_min_free=data['rolling_min_free'],
+                                criteria=criteria_from_spec(data['criteria']) if 'criteria' in data else None,
+                                pairing_time_budget=data.get('pairing_time_budget', 0.2),
+                                tie_breaks=data.get('tie_breaks'))
+
+        # late entries: the bye is not necessarily the last player (or may even exist for an even field)
+        num_players = len(data['players'])
+        bye_id = data.get('bye_id', num_players if num_players % 2 != 0 else None)
+
+        if bye_id != (None if tournament._bye is None else tournament._bye.id):
+            players = [p for p in tournament._players if not p.is_bye()]
+            tournament._bye = None
+
+            if bye_id is not None:
+                tournament._bye = PlayerBye(bye_id)
+                players.insert(bye_id, tournament._bye)
+
+            for i, p in enumerate(players):
+                p.id = i
+
+            tournament._players = players
+
+        tournament._withdrawn = set(data.get('withdrawn', []))
+
+        players = tournament._players
+        game_mode = tournament._win_condition
+
+        tournament._round_count = data['round_count']
+        tournament._player_rounds = list(data['player_rounds'])
+        tournament._finished_matches = [[Match.from_dict(m, game_mode, players) for m in matches]
+                                        for matches in data['finished_matches']]
+        tournament._round_matches = [Match.from_dict(m, game_mode, players) for m in data['running_matches']]
+
+        tournament._rebuild_player_statistics()
+
+        return tournament
+
     def num_sets_for_win(self):
         return int(self._win_condition)
 
@@ -222,15 +716,31 @@ class Tournament:
         else:
             start_offset = 0
 
+        # the bye is not counted, it takes part whenever there is an odd number of players
+        self._player_rounds[p1.id] += 1
+        if not p2.is_bye():
+            self._player_rounds[p2.id] += 1
+
+        round_number = max(self._player_rounds[p1.id], self._player_rounds[p2.id])
+
         match = Match(game_mode=self._win_condition, first_player=p1, second_player=p2,
-                      start_offset=start_offset)
+                      start_offset=start_offset, round_number=round_number)
 
         if p2.is_bye():
-            p1.hadByeInRound = self._round_count
+            p1.hadByeInRound = round_number
 
-            idx = 0
-            while not match.is_finished():
-                match.update_set_result(idx, 0)
-                idx += 1
+            # recorded as won without playing (11:0 in the sets necessary for the win)
+            for idx in range(self.num_sets_for_win()):
+                match.update_set_result(idx, 0.0)
 
         return match
+
+    def _get_bye(self):
+        # only part of the field of participants in case of an uneven number of players, hence, created as soon as it
+        # is needed for the first time (e.g. after a late entry)
+        if self._bye is None:
+            self._bye = PlayerBye(len(self._players))
+            self._players.append(self._bye)
+            self._player_rounds.append(0)
+
+        return self._bye
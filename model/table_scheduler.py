@@ -0,0 +1,125 @@
+import time
+
+from typing import Dict, List
+
+
+class TableScheduler:
+    """ Assigns the running matches of a tournament to a limited number of tables.
+
+    As soon as a match is finished, its table is handed to the next waiting match. Matches of older rounds are
+    preferred since they block the generation of the next round, otherwise the matches are served in the order they
+    have been waiting.
+    """
+
+    def __init__(self, tournament, num_tables: int, default_match_duration: float = 20 * 60, clock=time.time):
+        self._tournament = tournament
+        self._num_tables = num_tables
+        self._default_match_duration = default_match_duration
+        self._clock = clock
+
+        # index: table number - 1
+        self._tables = [None] * num_tables
+        self._start_times = {}
+
+        # match -> (round of the match, position within the queue)
+        self._queue: Dict[object, tuple] = {}
+        self._queue_counter = 0
+
+        self._durations = []
+
+    def update(self) -> List[tuple]:
+        """ Frees the tables of finished matches and assigns waiting matches to them.
+
+        Returns the new assignments as list of (table number, match).
+        """
+        now = self._clock()
+
+        running_matches = self._tournament.get_running_matches()
+        is_running = set(running_matches)
+
+        # free tables (matches that are no longer running have been undone)
+        for i, match in enumerate(self._tables):
+            if match is None:
+                continue
+
+            if match.is_finished():
+                self._durations.append(now - self._start_times.pop(match))
+                self._tables[i] = None
+            elif match not in is_running:
+                del self._start_times[match]
+                self._tables[i] = None
+
+        # matches that have already been finished before they got a table (e.g. entered by hand) are not waiting any
+        # longer
+        for match in [m for m in self._queue if m.is_finished() or m not in is_running]:
+            del self._queue[match]
+
+        # enqueue new matches (or matches that are open again after a result has been undone)
+        on_table = set(self._tables)
+        for match in running_matches:
+            # bye matches are finished right away and do not need a table
+            if match.is_finished() or match in self._queue or match in on_table:
+                continue
+
+            self._queue[match] = (match.round_number, self._queue_counter)
+            self._queue_counter += 1
+
+        # assign tables
+        assignments = []
+        waiting_matches = self.get_waiting_matches()
+
+        for i in range(self._num_tables):
+            if len(waiting_matches) == 0:
+                break
+
+            if self._tables[i] is not None:
+                continue
+
+            match = waiting_matches.pop(0)
+            del self._queue[match]
+
+            self._tables[i] = match
+            self._start_times[match] = now
+            assignments.append((i + 1, match))
+
+        return assignments
+
+    def get_table(self, match):
+        """ Table number (starting with 1) of the match or None if the match is not (or no longer) on a table. """
+        for i, m in enumerate(self._tables):
+            if m is match:
+                return i + 1
+
+        return None
+
+    def get_waiting_matches(self) -> List:
+        return sorted(self._queue.keys(), key=lambda m: self._queue[m])
+
+    def get_num_tables(self):
+        return self._num_tables
+
+    def get_expected_match_duration(self) -> float:
+        if len(self._durations) == 0:
+            return self._default_match_duration
+
+        return sum(self._durations) / len(self._durations)
+
+    def get_expected_round_completion(self) -> float:
+        """ Expected point in time (same unit as the clock) at which all running and waiting matches are finished. """
+        now = self._clock()
+        duration = self.get_expected_match_duration()
+
+        # remaining time until each table becomes available
+        table_free_times = []
+        for match in self._tables:
+            if match is None:
+                table_free_times.append(0.0)
+            else:
+                table_free_times.append(max(duration - (now - self._start_times[match]), 0.0))
+
+        # waiting matches are always handed to the table that becomes available first
+        for _ in self.get_waiting_matches():
+            idx = table_free_times.index(min(table_free_times))
+            table_free_times[idx] += duration
+
+        return now + max(table_free_times, default=0.0)
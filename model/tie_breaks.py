@@ -0,0 +1,286 @@
+""" Tie-breaks of the ranking, maintained incrementally while the results are entered.
+
+The contribution of each match (win / loss, sets, points) is remembered, hence, an update of a match only removes its
+previous contribution and adds the new one. The sums that depend on the number of wins of the opponents (buchholz,
+sonneborn-berger) are updated along the opponents of the players whose number of wins has changed, i.e. nothing is
+recomputed from scratch for the ranking.
+
+The ranking is sorted by a single key per player: the number of wins followed by the configured tie-breaks, e.g.:
+    TieBreakEngine(['buchholz', 'median_buchholz', 'sonneborn_berger', 'direct_encounter', 'ttr'])
+
+A match against the bye counts as won against an opponent with as many wins as the weakest player.
+"""
+import collections
+import math
+
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class PlayerStatistics:
+    wins: int = 0
+    losses: int = 0
+
+    sets_won: int = 0
+    sets_lost: int = 0
+
+    points_won: int = 0
+    points_lost: int = 0
+
+    # accumulated point difference within sets (ignoring bye)
+    acc_point_diff_won: int = 0
+    acc_point_diff_lost: int = 0
+
+    has_played_bye: bool = False
+
+    # opponent id -> number of matches played / won against this opponent (the bye is counted separately)
+    opponents: collections.Counter = field(default_factory=collections.Counter)
+    beaten: collections.Counter = field(default_factory=collections.Counter)
+    bye_matches: int = 0
+    bye_wins: int = 0
+
+    # sums of the wins of all opponents / of the beaten opponents (without the bye)
+    buchholz: int = 0
+    sonneborn_berger: int = 0
+
+    # sum of the round numbers of all wins (progressive score)
+    win_rounds: int = 0
+
+
+def quotient(won: int, lost: int) -> float:
+    if lost == 0:
+        return math.inf if won > 0 else 0
+
+    return won / lost
+
+
+def opponent_scores(engine, statistics: PlayerStatistics) -> List[int]:
+    scores = [engine.get_statistics(o).wins for o, n in statistics.opponents.items() for _ in range(n)]
+    return sorted(scores + [engine.bye_score] * statistics.bye_matches)
+
+
+def median_buchholz(engine, statistics):
+    # without the best and the worst opponent
+    scores = opponent_scores(engine, statistics)
+    return sum(scores[1:-1]) if len(scores) > 2 else 0
+
+
+def cut_buchholz(engine, statistics):
+    # without the worst opponent
+    scores = opponent_scores(engine, statistics)
+    return sum(scores[1:]) if len(scores) > 1 else 0
+
+
+def progressive(engine, statistics):
+    # sum of the number of wins after each round
+    return statistics.wins * (engine.rounds + 1) - statistics.win_rounds
+
+
+# tie-break name -> value of a player (higher is better), direct encounter and ttr are handled by the engine itself
+TIE_BREAKS = {
+    'buchholz': lambda engine, s: s.buchholz + engine.bye_score * s.bye_matches,
+    'median_buchholz': median_buchholz,
+    'cut_buchholz': cut_buchholz,
+    'sonneborn_berger': lambda engine, s: s.sonneborn_berger + engine.bye_score * s.bye_wins,
+    'progressive': progressive,
+    'set_quotient': lambda engine, s: quotient(s.sets_won, s.sets_lost),
+    'point_quotient': lambda engine, s: quotient(s.points_won, s.points_lost),
+}
+
+DIRECT_ENCOUNTER = 'direct_encounter'
+TTR = 'ttr'
+
+# the ranking as it has always been: wins of the beaten opponents, direct encounter and the lower ttr
+DEFAULT_TIE_BREAKS = ['sonneborn_berger', DIRECT_ENCOUNTER, TTR]
+
+
+class TieBreakEngine:
+    def __init__(self, tie_breaks: List[str] = None):
+        if tie_breaks is None:
+            tie_breaks = DEFAULT_TIE_BREAKS
+
+        for name in tie_breaks:
+            if name not in TIE_BREAKS and name not in (DIRECT_ENCOUNTER, TTR):
+                raise ValueError(f"unknown tie-break: {name}")
+
+        self.tie_breaks = list(tie_breaks)
+
+        self.reset()
+
+    def reset(self):
+        self._statistics = collections.defaultdict(PlayerStatistics)
+
+        # match -> (set results, contribution as added to the statistics), see `_get_contribution`
+        self._contributions = {}
+
+        # highest round number of all finished matches (progressive score), derived from the number of finished
+        # matches per round as a result may be undone
+        self.rounds = 0
+        self._finished_per_round = collections.Counter()
+
+        # wins credited for a match against the bye (the wins of the weakest player, updated with each ranking)
+        self.bye_score = 0
+
+    def get_statistics(self, player_id: int) -> PlayerStatistics:
+        return self._statistics[player_id]
+
+    def get_value(self, player_id: int, tie_break: str):
+        return TIE_BREAKS[tie_break](self, self._statistics[player_id])
+
+    def update(self, matches: list, players: list):
+        """ Has to be called with each match whose results have changed (calls for unchanged matches are cheap). """
+        for match in matches:
+            previous_results, previous = self._contributions.get(match, (None, None))
+
+            # the set results are immutable tuples, i.e. unchanged as long as it is the same tuple
+            if previous_results is match.set_results:
+                continue
+
+            contribution = self._get_contribution(match, players)
+            self._contributions[match] = (match.set_results, contribution)
+
+            if previous == contribution:
+                continue
+
+            if previous is not None:
+                self._apply(previous, -1)
+
+            self._apply(contribution, 1)
+
+    def get_ranking(self, players: list) -> list:
+        """ Sorts the given players (without the bye) by the number of wins and the tie-breaks. """
+        self.bye_score = min((self._statistics[p.id].wins for p in players), default=0)
+
+        keys = {p.id: (-self._statistics[p.id].wins,) for p in players}
+
+        for name in self.tie_breaks:
+            if name == DIRECT_ENCOUNTER:
+                self._add_direct_encounter(players, keys)
+                continue
+
+            for p in players:
+                value = p.ttr if name == TTR else -TIE_BREAKS[name](self, self._statistics[p.id])
+                keys[p.id] += (value,)
+
+        # equal keys keep the order of the players
+        return sorted(players, key=lambda p: keys[p.id])
+
+    def _add_direct_encounter(self, players: list, keys: dict):
+        # wins against the players with the same key so far (i.e. a mini table of the tied players)
+        groups = collections.defaultdict(list)
+        for p in players:
+            groups[keys[p.id]].append(p.id)
+
+        for group in groups.values():
+            for player_id in group:
+                beaten = self._statistics[player_id].beaten
+                keys[player_id] += (-sum(beaten[o] for o in group),)
+
+    def _get_contribution(self, match, players: list) -> tuple:
+        """ (first player, second player, winner, round, per player: sets won / lost, points won / lost, accumulated
+        point difference won / lost). The winner is None as long as the match is not finished.
+        """
+        p1 = match.first_player_id
+        p2 = match.second_player_id
+        is_bye_match = players[p2].is_bye()
+
+        values_1 = [0] * 6
+        values_2 = [0] * 6
+
+        for res in match.set_results:
+            if res is None:
+                break
+
+            abs_res = abs(res)
+
+            # the average set difference is intended to give an impression whether the handicaps are fairly
+            # distributed, hence, it ignores any 'bye' matches
+            set_difference = 0 if is_bye_match else int(11 - abs_res if abs_res <= 9 else 2)
+            winner_points = int(max(11, abs_res + 2))
+            loser_points = int(abs_res)
+
+            # needed for 11:0 and 0:11 edge case
+            winner_values, loser_values = (values_1, values_2) if math.copysign(1, res) > 0 else (values_2, values_1)
+
+            winner_values[0] += 1
+            winner_values[2] += winner_points
+            winner_values[3] += loser_points
+            winner_values[4] += set_difference
+
+            loser_values[1] += 1
+            loser_values[2] += loser_points
+            loser_values[3] += winner_points
+            loser_values[5] += set_difference
+
+        winner = None
+        if match.is_finished():
+            winner = p1 if match.sets_won() > match.sets_lost() else p2
+
+        return p1, p2, winner, match.round_number, is_bye_match, tuple(values_1), tuple(values_2)
+
+    def _apply(self, contribution: tuple, sign: int):
+        p1, p2, winner, round_number, is_bye_match, values_1, values_2 = contribution
+
+        for player_id, values in ((p1, values_1), (p2, values_2)):
+            s = self._statistics[player_id]
+            s.sets_won += sign * values[0]
+            s.sets_lost += sign * values[1]
+            s.points_won += sign * values[2]
+            s.points_lost += sign * values[3]
+            s.acc_point_diff_won += sign * values[4]
+            s.acc_point_diff_lost += sign * values[5]
+
+        if winner is None:
+            return
+
+        loser = p2 if winner == p1 else p1
+
+        # the pairing is linked with the number of wins before the win is counted (and unlinked before it is removed)
+        if sign < 0:
+            self._link(p1, p2, winner, is_bye_match, sign)
+
+        self._statistics[loser].losses += sign
+        self._add_win(winner, round_number, sign)
+
+        if sign > 0:
+            self._link(p1, p2, winner, is_bye_match, sign)
+
+        self._finished_per_round[round_number] += sign
+        if self._finished_per_round[round_number] == 0:
+            del self._finished_per_round[round_number]
+        self.rounds = max(self._finished_per_round, default=0)
+
+    def _add_win(self, player_id: int, round_number: int, sign: int):
+        s = self._statistics[player_id]
+        s.wins += sign
+        s.win_rounds += sign * round_number
+
+        for opponent_id, num_matches in s.opponents.items():
+            opponent = self._statistics[opponent_id]
+            opponent.buchholz += sign * num_matches
+            opponent.sonneborn_berger += sign * opponent.beaten[player_id]
+
+    def _link(self, p1: int, p2: int, winner: int, is_bye_match: bool, sign: int):
+        if is_bye_match:
+            s = self._statistics[p1]
+            s.bye_matches += sign
+            s.bye_wins += sign * int(winner == p1)
+            s.has_played_bye = s.bye_matches > 0
+            return
+
+        for player_id, opponent_id in ((p1, p2), (p2, p1)):
+            s = self._statistics[player_id]
+            opponent_wins = self._statistics[opponent_id].wins
+
+            s.opponents[opponent_id] += sign
+            s.buchholz += sign * opponent_wins
+
+            if player_id == winner:
+                s.beaten[opponent_id] += sign
+                s.sonneborn_berger += sign * opponent_wins
+
+            # the counters must not keep opponents without any match (e.g. for the median buchholz)
+            for counter in (s.opponents, s.beaten):
+                if counter[opponent_id] == 0:
+                    del counter[opponent_id]
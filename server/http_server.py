@@ -0,0 +1,393 @@
+""" Minimal asyncio based HTTP/1.1 and WebSocket server (standard library only, as buildozer has to package it). """
+import asyncio
+import base64
+import hashlib
+import ipaddress
+import json
+import socket
+import struct
+import threading
+
+from urllib.parse import urlsplit, parse_qs
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# further tournaments running in parallel use the following ports
+DEFAULT_PORT = 8080
+
+STATUS_TEXTS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+MAX_BODY_SIZE = 64 * 1024
+
+
+def get_lan_address():
+    # no packet is sent, connecting a udp socket only determines the interface used for the local network
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.connect(('10.255.255.255', 1))
+            return s.getsockname()[0]
+        except OSError:
+            return '127.0.0.1'
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: dict, body: bytes, peer: str):
+        url = urlsplit(target)
+
+        self.method = method
+        self.path = url.path
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        self.peer = peer
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class Response:
+    def __init__(self, status: int = 200, body: bytes = b'', content_type: str = 'text/plain; charset=utf-8',
+                 headers: dict = None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers if headers is not None else {}
+
+    @staticmethod
+    def json(data, status: int = 200):
+        return Response(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    @staticmethod
+    def html(text: str):
+        return Response(200, text.encode('utf-8'), 'text/html; charset=utf-8')
+
+
+class StreamResponse:
+    """ Response of unknown length, the handler writes the body itself (e.g. server-sent events). """
+
+    def __init__(self, content_type: str, writer_callback):
+        self.content_type = content_type
+
+        # async def writer_callback(writer: asyncio.StreamWriter)
+        self.writer_callback = writer_callback
+
+
+class WebSocket:
+    """ Server side of a websocket connection (text messages only). """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._send_lock = asyncio.Lock()
+        self.closed = False
+
+    async def receive(self):
+        """ Returns the next text message or None once the connection has been closed. """
+        message = b''
+
+        while not self.closed:
+            try:
+                header = await self._reader.readexactly(2)
+                fin = header[0] & 0x80
+                opcode = header[0] & 0x0F
+                masked = header[1] & 0x80
+                length = header[1] & 0x7F
+
+                if length == 126:
+                    length = struct.unpack('!H', await self._reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack('!Q', await self._reader.readexactly(8))[0]
+
+                if length > MAX_BODY_SIZE:
+                    await self.close()
+                    return None
+
+                mask = await self._reader.readexactly(4) if masked else b'\x00\x00\x00\x00'
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await self._reader.readexactly(length)))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+
+            if opcode == 0x8:
+                await self.close()
+                return None
+            elif opcode == 0x9:
+                await self._send_frame(0xA, payload)
+                continue
+            elif opcode == 0xA:
+                continue
+
+            message += payload
+            if fin:
+                return message.decode('utf-8', errors='replace')
+
+        return None
+
+    async def send(self, text: str):
+        await self._send_frame(0x1, text.encode('utf-8'))
+
+    async def close(self):
+        if self.closed:
+            return
+
+        try:
+            await self._send_frame(0x8, b'')
+        except ConnectionError:
+            pass
+
+        self.closed = True
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 2 ** 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+        async with self._send_lock:
+            self._writer.write(header + payload)
+            await self._writer.drain()
+
+
+class HttpServer:
+    """ Serves the registered routes from an asyncio event loop running in a background thread. """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = DEFAULT_PORT, lan_only: bool = True):
+        self.host = host
+        self.port = port
+
+        # only clients from private networks (or the device itself) are accepted
+        self._lan_only = lan_only
+
+        # (method, path) -> async def handler(request) -> Response / StreamResponse
+        self._routes = {}
+
+        # path prefix -> async def handler(request) (e.g. for ids as part of the path)
+        self._prefix_routes = {}
+
+        # path -> async def handler(websocket, request)
+        self._websocket_routes = {}
+
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def route(self, method: str, path: str, handler, prefix: bool = False):
+        if prefix:
+            self._prefix_routes[(method, path)] = handler
+        else:
+            self._routes[(method, path)] = handler
+
+    def websocket(self, path: str, handler):
+        self._websocket_routes[path] = handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='HttpServer', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+        if self._server is None:
+            raise OSError(f"Could not start the server on port {self.port}")
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop = None
+
+    def call_soon_threadsafe(self, callback, *args):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port, backlog=256))
+
+            # port 0 -> chosen by the operating system
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            print(f"Warning: could not start server: {e}")
+            self._started.set()
+            return
+
+        self._started.set()
+
+        try:
+            self.loop.run_forever()
+        finally:
+            self._server.close()
+
+            # open connections (e.g. event streams or websockets) would never finish by themselves
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+            self.loop.run_until_complete(self._server.wait_closed())
+            self.loop.close()
+
+    def _is_allowed(self, peer: str):
+        if not self._lan_only:
+            return True
+
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return False
+
+        return address.is_private or address.is_loopback or address.is_link_local
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')[0]
+
+        try:
+            if not self._is_allowed(peer):
+                await self._write_response(writer, Response(403, b'LAN only'), keep_alive=False)
+                return
+
+            # keep-alive: serve requests until the client closes the connection
+            while True:
+                request = await self._read_request(reader, peer)
+
+                if request is None:
+                    return
+
+                if isinstance(request, Response):
+                    await self._write_response(writer, request, keep_alive=False)
+                    return
+
+                if request.path in self._websocket_routes and \
+                        request.headers.get('upgrade', '').lower() == 'websocket':
+                    await self._handle_websocket(request, reader, writer)
+                    return
+
+                response = await self._dispatch(request)
+
+                if isinstance(response, StreamResponse):
+                    writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {response.content_type}\r\n"
+                                 f"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n".encode('latin-1'))
+                    await writer.drain()
+                    await response.writer_callback(writer)
+                    return
+
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, response, keep_alive)
+
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # the server is stopped, the connection is closed below
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader, peer: str):
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            return Response(400, b'Request line too long')
+
+        if not request_line:
+            return None
+
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return Response(400, b'Malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        try:
+            content_length = int(headers.get('content-length', 0))
+        except ValueError:
+            return Response(400, b'Invalid content length')
+
+        if content_length > MAX_BODY_SIZE:
+            return Response(413, b'Request too large')
+
+        body = await reader.readexactly(content_length) if content_length > 0 else b''
+
+        return Request(method.upper(), target, headers, body, peer)
+
+    async def _dispatch(self, request: Request):
+        handler = self._routes.get((request.method, request.path))
+
+        if handler is None:
+            for (method, prefix), prefix_handler in self._prefix_routes.items():
+                if method == request.method and request.path.startswith(prefix):
+                    handler = prefix_handler
+                    break
+
+        if handler is None:
+            known_path = any(path == request.path for _, path in self._routes)
+            return Response(405 if known_path else 404, STATUS_TEXTS[405 if known_path else 404].encode())
+
+        try:
+            return await handler(request)
+        except (ValueError, KeyError, TypeError) as e:
+            return Response(400, str(e).encode('utf-8'))
+        except Exception as e:
+            print(f"Warning: server error while handling {request.path}: {e}")
+            return Response(500, b'Internal error')
+
+    async def _handle_websocket(self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        key = request.headers.get('sec-websocket-key')
+
+        if key is None:
+            await self._write_response(writer, Response(400, b'Missing websocket key'), keep_alive=False)
+            return
+
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        websocket = WebSocket(reader, writer)
+        try:
+            await self._websocket_routes[request.path](websocket, request)
+        finally:
+            await websocket.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        headers = {
+            'Content-Type': response.content_type,
+            'Content-Length': str(len(response.body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **response.headers,
+        }
+
+        head = f"HTTP/1.1 {response.status} {STATUS_TEXTS.get(response.status, '')}\r\n"
+        head += ''.join(f"{key}: {value}\r\n" for key, value in headers.items())
+
+        writer.write(head.encode('latin-1') + b'\r\n' + response.body)
+        await writer.drain()
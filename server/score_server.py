@@ -0,0 +1,302 @@
+""" Score entry for the players' own devices within the local network.
+
+The server runs in a background thread and never touches the tournament directly: submissions are queued and applied
+in batches by `process_pending`, which has to be called from the thread owning the tournament (i.e. the kivy main
+loop). The current state of the running matches is published as a pre-serialized snapshot.
+"""
+import asyncio
+import json
+import queue
+
+from model.data_classes import Score, is_same_result, parse_set_results
+from server.http_server import HttpServer, Response, get_lan_address
+
+# time a client waits for its submission to be applied by the main loop
+SUBMISSION_TIMEOUT = 10.0
+
+
+def get_match_key(match):
+    return f"{match.round_number}-{match.first_player_id}-{match.second_player_id}"
+
+
+class ScoreServer:
+    def __init__(self, tournament, port: int = 8080, on_results_applied=None, http_server: HttpServer = None):
+        self._tournament = tournament
+
+        # called with the list of changed matches after a batch of submissions has been applied
+        self._on_results_applied = on_results_applied
+
+        self._http_server = http_server if http_server is not None else HttpServer(port=port)
+        self._http_server.route('GET', '/', self._handle_index)
+        self._http_server.route('GET', '/api/matches', self._handle_get_matches)
+        self._http_server.route('POST', '/api/matches/', self._handle_post_result, prefix=True)
+        self._http_server.websocket('/ws', self._handle_websocket)
+
+        # (match key, version, set results, future) filled by the server thread
+        self._submissions = queue.Queue()
+
+        # match key -> number of changes of the set results (used to detect conflicting submissions)
+        self._versions = {}
+        self._published_results = {}
+        self._snapshot_json = json.dumps({'round': 0, 'matches': []})
+
+        # only accessed from the server thread
+        self._websockets = set()
+
+    def start(self):
+        self.publish()
+        self._http_server.start()
+
+    def stop(self):
+        self._http_server.stop()
+
+    def get_url(self):
+        return f"http://{get_lan_address()}:{self.get_port()}"
+
+    def get_port(self):
+        return self._http_server.port
+
+    def get_snapshot_json(self):
+        return self._snapshot_json
+
+    def publish(self):
+        """ Updates the snapshot of the running matches (has to be called after any local change of the model). """
+        matches = []
+
+        for match in self._tournament.get_running_matches():
+            key = get_match_key(match)
+            results = tuple(match.set_results)
+
+            if key not in self._published_results or \
+                    not all(is_same_result(a, b) for a, b in zip(results, self._published_results[key])):
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._published_results[key] = results
+
+            matches.append(self._match_to_json(match, key))
+
+        snapshot_json = json.dumps({'round': self._tournament.get_current_round(), 'matches': matches})
+
+        if snapshot_json != self._snapshot_json:
+            self._snapshot_json = snapshot_json
+            self._http_server.call_soon_threadsafe(self._broadcast, snapshot_json)
+
+    def process_pending(self):
+        """ Applies all queued submissions at once, hence, has to be called regularly from the main loop. """
+        if self._submissions.empty():
+            return
+
+        changed_matches = []
+        responses = []
+
+        while True:
+            try:
+                key, version, set_results, future = self._submissions.get_nowait()
+            except queue.Empty:
+                break
+
+            status, data, match, changed = self._apply_submission(key, version, set_results)
+            responses.append((future, status, data, match))
+
+            if changed and match not in changed_matches:
+                changed_matches.append(match)
+
+        if len(changed_matches) > 0 and self._on_results_applied is not None:
+            self._on_results_applied(changed_matches)
+
+        self.publish()
+
+        for future, status, data, match in responses:
+            # the match may have been changed by later submissions of the same batch
+            if match is not None:
+                data['match'] = self._match_to_json(match, get_match_key(match))
+
+            self._http_server.call_soon_threadsafe(self._resolve, future, (status, data))
+
+    def _apply_submission(self, key, version, set_results):
+        match = next((m for m in self._tournament.get_running_matches() if get_match_key(m) == key), None)
+
+        if match is None:
+            return 409, {'error': 'Die Begegnung ist bereits abgeschlossen.'}, None, False
+
+        try:
+            new_results = parse_set_results(match, set_results)
+        except ValueError as e:
+            return 400, {'error': str(e)}, match, False
+
+        current_results = match.set_results
+
+        if all(is_same_result(a, b) for a, b in zip(current_results, new_results)):
+            return 200, {}, match, False
+
+        # a stale submission is still accepted as long as it only adds sets to the known results
+        if version != self._versions.get(key, 0):
+            for current, new in zip(current_results, new_results):
+                if current is not None and not is_same_result(current, new):
+                    return 409, {'error': 'Das Ergebnis wurde zwischenzeitlich geändert.'}, match, False
+
+        for i, result in enumerate(new_results):
+            match.update_set_result(i, result)
+
+        # a further submission within the same batch has to see the new version already
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._published_results[key] = tuple(match.set_results)
+
+        return 200, {}, match, True
+
+    def _match_to_json(self, match, key):
+        return {
+            'id': key,
+            'round': match.round_number,
+            'first_player': match.first_player_display_name,
+            'second_player': match.second_player_display_name,
+            'start_offset': match.start_offset,
+            'set_results': [None if r is None else Score.to_str(r) for r in match.set_results],
+            'sets': f"{match.sets_won()} : {match.sets_lost()}",
+            'finished': match.is_finished(),
+            'version': self._versions.get(key, 0),
+        }
+
+    # everything below is executed within the server thread
+    @staticmethod
+    def _resolve(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    async def _submit(self, key, data):
+        future = asyncio.get_running_loop().create_future()
+        self._submissions.put((key, data.get('version'), data.get('set_results'), future))
+
+        try:
+            return await asyncio.wait_for(future, SUBMISSION_TIMEOUT)
+        except asyncio.TimeoutError:
+            return 409, {'error': 'Zeitüberschreitung, bitte erneut versuchen.'}
+
+    async def _handle_index(self, request):
+        return Response.html(SCORE_ENTRY_PAGE)
+
+    async def _handle_get_matches(self, request):
+        return Response(200, self._snapshot_json.encode('utf-8'), 'application/json')
+
+    async def _handle_post_result(self, request):
+        key = request.path[len('/api/matches/'):]
+        status, data = await self._submit(key, request.json())
+        return Response.json(data, status)
+
+    async def _handle_websocket(self, websocket, request):
+        self._websockets.add(websocket)
+
+        try:
+            await websocket.send(self._snapshot_json)
+
+            while True:
+                message = await websocket.receive()
+                if message is None:
+                    break
+
+                try:
+                    data = json.loads(message)
+                    status, result = await self._submit(data['match'], data)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    status, result = 400, {'error': 'Ungültige Nachricht.'}
+
+                await websocket.send(json.dumps({'type': 'result', 'status': status, **result}))
+        finally:
+            self._websockets.discard(websocket)
+
+    def _broadcast(self, snapshot_json):
+        for websocket in list(self._websockets):
+            asyncio.ensure_future(self._send_or_drop(websocket, snapshot_json))
+
+    async def _send_or_drop(self, websocket, text):
+        try:
+            await websocket.send(text)
+        except ConnectionError:
+            self._websockets.discard(websocket)
+
+
+SCORE_ENTRY_PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Ergebniseingabe</title>
+<style>
+body { font-family: sans-serif; margin: 0.5em; }
+.match { border: 1px solid #888; border-radius: 6px; padding: 0.5em; margin-bottom: 0.5em; }
+.finished { background: #e8f5e9; }
+input { width: 4em; font-size: 1.2em; margin: 0.1em; text-align: center; }
+button { font-size: 1.1em; margin-top: 0.3em; }
+.error { color: #b00020; }
+</style>
+</head>
+<body>
+<h2>Ergebniseingabe <span id="round"></span></h2>
+<div id="matches"></div>
+<script>
+let socket = null;
+let matches = {};
+
+function renderMatch(m) {
+    let div = document.getElementById('match-' + m.id);
+    if (!div) {
+        div = document.createElement('div');
+        div.id = 'match-' + m.id;
+        document.getElementById('matches').appendChild(div);
+    }
+    div.className = 'match' + (m.finished ? ' finished' : '');
+    const offset = m.start_offset >= 0 ? m.start_offset + ' : 0' : '0 : ' + (-m.start_offset);
+    let html = '<b>' + m.first_player + ' vs. ' + m.second_player + '</b> (' + m.sets + ', Vorgabe ' + offset + ')<br>';
+    m.set_results.forEach((r, i) => {
+        html += '<input id="' + m.id + '-' + i + '" inputmode="numeric" placeholder="11:x" value="' +
+                (r === null ? '' : r.replace(/ /g, '')) + '">';
+    });
+    html += '<br><button onclick="submitMatch(\\'' + m.id + '\\')">Senden</button> <span class="error"></span>';
+    div.innerHTML = html;
+}
+
+function render(snapshot) {
+    document.getElementById('round').textContent = 'Runde ' + snapshot.round;
+    snapshot.matches.forEach(m => {
+        // matches are only re-rendered on changes to keep the user's input
+        if (!matches[m.id] || matches[m.id].version !== m.version) {
+            matches[m.id] = m;
+            renderMatch(m);
+        }
+    });
+    Object.keys(matches).forEach(id => {
+        if (!snapshot.matches.some(m => m.id === id)) {
+            delete matches[id];
+            document.getElementById('match-' + id).remove();
+        }
+    });
+}
+
+function submitMatch(id) {
+    const m = matches[id];
+    const results = m.set_results.map((_, i) => document.getElementById(id + '-' + i).value.trim() || null);
+    socket.send(JSON.stringify({match: id, version: m.version, set_results: results}));
+}
+
+function connect() {
+    socket = new WebSocket('ws://' + location.host + '/ws');
+    socket.onmessage = event => {
+        const data = JSON.parse(event.data);
+        if (data.type !== 'result') {
+            render(data);
+            return;
+        }
+        if (data.match && matches[data.match.id]) {
+            matches[data.match.id] = data.match;
+            renderMatch(data.match);
+            document.querySelector('#match-' + data.match.id + ' .error').textContent = data.error || '';
+        } else if (data.error) {
+            alert(data.error);
+        }
+    };
+    socket.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script>
+</body>
+</html>
+"""
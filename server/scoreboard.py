@@ -0,0 +1,255 @@
+""" Read-only live scoreboard for spectators within the local network.
+
+The scoreboard is kept as a single pre-serialized snapshot that is only rebuilt by `publish` (i.e. when the model has
+changed). All viewers share this snapshot: plain requests get it with an ETag, the page itself receives every new
+version as a server-sent event, hence, the number of viewers does not affect the work of the main loop.
+"""
+import asyncio
+import json
+
+from model.data_classes import Score
+from server.http_server import HttpServer, Response, StreamResponse, get_lan_address
+
+# interval of comments sent to idle event streams, keeps proxies and mobile browsers from closing them
+KEEP_ALIVE_INTERVAL = 15.0
+
+
+def match_to_json(match, table=None):
+    return {
+        'round': match.round_number,
+        'first_player': match.first_player_display_name,
+        'second_player': match.second_player_display_name,
+        'start_offset': match.start_offset,
+        'set_results': [Score.to_str(r).replace(' ', '') for r in match.set_results if r is not None],
+        'sets': [match.sets_won(), match.sets_lost()],
+        'finished': match.is_finished(),
+        'table': table,
+    }
+
+
+class Scoreboard:
+    def __init__(self, tournament, port: int = 8080, http_server: HttpServer = None, table_scheduler=None):
+        self._tournament = tournament
+        self._table_scheduler = table_scheduler
+
+        self._http_server = http_server if http_server is not None else HttpServer(port=port)
+        self._http_server.route('GET', '/scoreboard', self._handle_page)
+        self._http_server.route('GET', '/api/scoreboard', self._handle_get_snapshot)
+        self._http_server.route('GET', '/api/scoreboard/events', self._handle_events)
+
+        # match -> (set results, json) of the finished matches, the set results are immutable tuples, hence, a
+        # corrected result or an undo (see `Tournament.restore_state`) is detected by the identity of the tuple
+        self._finished_match_json = {}
+
+        # (version, json, encoded event) replaced as a whole, so the server thread always sees a consistent state
+        self._version = 0
+        self._content_json = None
+        self._snapshot = (0, json.dumps({'version': 0}), b'')
+
+        # only accessed from the server thread, set (and replaced) whenever a new snapshot is available
+        self._update_event = None
+
+    def start(self):
+        self.publish()
+        self._http_server.start()
+
+    def stop(self):
+        self._http_server.stop()
+
+    def get_url(self):
+        return f"http://{get_lan_address()}:{self._http_server.port}/scoreboard"
+
+    def get_version(self):
+        return self._snapshot[0]
+
+    def get_snapshot_json(self):
+        return self._snapshot[1]
+
+    def publish(self):
+        """ Rebuilds the snapshot, has to be called from the thread owning the tournament after each change. """
+        content = {
+            'round': self._tournament.get_current_round(),
+            'standings': self._standings_to_json(),
+            'running': [match_to_json(m, self._get_table(m)) for m in self._tournament.get_running_matches()],
+            'rounds': self._previous_rounds_to_json(),
+        }
+
+        content_json = json.dumps(content)
+        if content_json == self._content_json:
+            return
+
+        self._content_json = content_json
+        self._version += 1
+
+        snapshot_json = json.dumps({'version': self._version, **content})
+        event = f"id: {self._version}\nevent: snapshot\ndata: {snapshot_json}\n\n".encode('utf-8')
+        self._snapshot = (self._version, snapshot_json, event)
+
+        self._http_server.call_soon_threadsafe(self._notify)
+
+    def _standings_to_json(self):
+        return [{
+            'rank': rank,
+            'name': p.display_name,
+            'wins': len(p.wins),
+            'losses': len(p.losses),
+            'buchholz': p.buchholz,
+        } for rank, p in enumerate(self._tournament.get_ranking(), 1)]
+
+    def _previous_rounds_to_json(self):
+        running = set(self._tournament.get_running_matches())
+        rounds = []
+
+        # only the current matches are kept (e.g. a round generated once again replaces the previous matches)
+        finished_match_json = {}
+
+        for matches in self._tournament.get_all_matches():
+            round_json = []
+
+            for match in matches:
+                if match in running:
+                    continue
+
+                cached = self._finished_match_json.get(match)
+                if cached is None or cached[0] is not match.set_results:
+                    cached = (match.set_results, match_to_json(match))
+
+                finished_match_json[match] = cached
+                round_json.append(cached[1])
+
+            rounds.append(round_json)
+
+        self._finished_match_json = finished_match_json
+
+        return rounds
+
+    def _get_table(self, match):
+        if self._table_scheduler is None:
+            return None
+
+        return self._table_scheduler.get_table(match)
+
+    # everything below is executed within the server thread
+    def _notify(self):
+        if self._update_event is not None:
+            self._update_event.set()
+            self._update_event = None
+
+    def _wait_for_update(self):
+        if self._update_event is None:
+            self._update_event = asyncio.Event()
+
+        return self._update_event.wait()
+
+    async def _handle_page(self, request):
+        return Response.html(SCOREBOARD_PAGE)
+
+    async def _handle_get_snapshot(self, request):
+        version, snapshot_json, _ = self._snapshot
+        etag = f'"{version}"'
+
+        if request.headers.get('if-none-match') == etag:
+            return Response(304, b'', 'application/json', {'ETag': etag})
+
+        return Response(200, snapshot_json.encode('utf-8'), 'application/json', {'ETag': etag})
+
+    async def _handle_events(self, request):
+        try:
+            last_version = int(request.headers.get('last-event-id', 0))
+        except ValueError:
+            last_version = 0
+
+        async def write_events(writer):
+            sent_version = last_version
+
+            while True:
+                version, _, event = self._snapshot
+
+                if version != sent_version:
+                    writer.write(event)
+                    sent_version = version
+                else:
+                    try:
+                        await asyncio.wait_for(self._wait_for_update(), KEEP_ALIVE_INTERVAL)
+                        continue
+                    except asyncio.TimeoutError:
+                        writer.write(b': keep-alive\n\n')
+
+                await writer.drain()
+
+        return StreamResponse('text/event-stream; charset=utf-8', write_events)
+
+
+SCOREBOARD_PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Live-Ergebnisse</title>
+<style>
+body { font-family: sans-serif; margin: 0.5em; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+td, th { padding: 0.2em 0.6em; text-align: left; }
+tr:nth-child(even) { background: #f0f0f0; }
+.match { border: 1px solid #888; border-radius: 6px; padding: 0.4em; margin: 0.3em 0; }
+.finished { background: #e8f5e9; }
+.sets { font-size: 1.3em; font-weight: bold; }
+#state { color: #888; font-size: 0.8em; }
+</style>
+</head>
+<body>
+<h2>Live-Ergebnisse <span id="round"></span> <span id="state"></span></h2>
+<h3>Ranking</h3>
+<table id="standings"></table>
+<h3>Laufende Begegnungen</h3>
+<div id="running"></div>
+<h3>Vorherige Runden</h3>
+<div id="rounds"></div>
+<script>
+function escape(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function matchHtml(m) {
+    let html = '<div class="match' + (m.finished ? ' finished' : '') + '">';
+    if (m.table !== null) {
+        html += 'Tisch ' + m.table + ': ';
+    }
+    html += '<b>' + escape(m.first_player) + '</b> vs. <b>' + escape(m.second_player) + '</b> ';
+    html += '<span class="sets">' + m.sets[0] + ' : ' + m.sets[1] + '</span> ';
+    html += '(' + m.set_results.map(escape).join(', ') + ')</div>';
+    return html;
+}
+
+function render(snapshot) {
+    document.getElementById('round').textContent = '- Runde ' + snapshot.round;
+
+    let standings = '<tr><th></th><th>Spieler</th><th>Bilanz</th><th>Buchholz</th></tr>';
+    snapshot.standings.forEach(p => {
+        standings += '<tr><td>' + p.rank + '</td><td>' + escape(p.name) + '</td><td>' + p.wins + ' : ' + p.losses +
+                     '</td><td>' + p.buchholz + '</td></tr>';
+    });
+    document.getElementById('standings').innerHTML = standings;
+
+    document.getElementById('running').innerHTML = snapshot.running.map(matchHtml).join('');
+
+    let rounds = '';
+    for (let i = snapshot.rounds.length - 1; i >= 0; i--) {
+        if (snapshot.rounds[i].length > 0) {
+            rounds += '<h4>Runde ' + (i + 1) + '</h4>' + snapshot.rounds[i].map(matchHtml).join('');
+        }
+    }
+    document.getElementById('rounds').innerHTML = rounds;
+}
+
+// the browser reconnects by itself and sends the last received version
+const events = new EventSource('/api/scoreboard/events');
+events.addEventListener('snapshot', event => render(JSON.parse(event.data)));
+events.onopen = () => document.getElementById('state').textContent = '';
+events.onerror = () => document.getElementById('state').textContent = '(Verbindung unterbrochen)';
+</script>
+</body>
+</html>
+"""
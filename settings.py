@@ -6,4 +6,22 @@ class Settings:
     match_mode = GameMode.BEST_OF_THREE
     handicap_enabled = True
     players = []
-    storage_path = None
\ No newline at end of file
+    storage_path = None
+
+    # 0 -> as many tables as matches, i.e. no table assignment necessary
+    num_tables = 0
+
+    # 0 -> classic rounds, otherwise the number of rounds each player plays in the rolling mode
+    rolling_rounds = 0
+
+    # results may be submitted from the players' devices within the local network
+    score_server_enabled = False
+
+    # standings and running matches are shown read-only to spectators within the local network
+    scoreboard_enabled = False
+
+    # the first round is the best of many random draws (e.g. avoiding the pairings of the previous tournament)
+    optimized_seeding = False
+
+    # timing histograms of the critical operations on top of all screens (see model/profiling.py)
+    performance_overlay = False
\ No newline at end of file
@@ -0,0 +1,39 @@
+import json
+import os
+import time
+
+from datetime import datetime
+
+# reference point for all measurements, i.e. this module should be the very first import of the app
+_start_time = time.perf_counter()
+_marks = []
+
+
+def mark(label: str):
+    _marks.append((label, time.perf_counter() - _start_time))
+
+
+def get_marks():
+    return list(_marks)
+
+
+def report() -> str:
+    lines = ["Startup timing:"]
+
+    previous = 0.0
+    for label, elapsed in _marks:
+        lines.append(f" - {label.ljust(30)} {elapsed * 1000:8.1f} ms (+{(elapsed - previous) * 1000:.1f} ms)")
+        previous = elapsed
+
+    return '\n'.join(lines)
+
+
+def store_report(storage_path: str):
+    # one json object per line, hence, the history of all app starts can be compared later on
+    entry = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'marks': {label: round(elapsed * 1000, 1) for label, elapsed in _marks},
+    }
+
+    with open(os.path.join(storage_path, 'startup_timing.jsonl'), 'a') as file:
+        file.write(json.dumps(entry) + '\n')
@@ -0,0 +1,128 @@
+""" Archive of the stored tournaments: text reports, structured records and their conversion (see model/archive.py).
+"""
+import json
+import os
+
+from datetime import date
+
+from model.archive import (convert_text_archive, get_record_path, get_winner, iter_records, list_tournament_files,
+                           list_unconverted_files, read_previous_pairings, read_record, record_from_tournament)
+from model.data_classes import GameMode, Player
+from model.swiss_system import Tournament
+
+# as written by the tournament window
+REPORT = """Handicap: True
+
+Teilnehmer:
+Max Mustermann    , TTR: 1600, 0
+Stefan Mustermann , TTR: 1500, 1
+Annika Musterfrau , TTR: 1480, 1
+Xandi Mustermann  , TTR: 1433, 2
+Günther Mustermann, TTR: 988, 7
+
+Runde: 1
+ - Max Mustermann     vs. Freilos            | 3:0 |  11:0 11:0 11:0
+ - Stefan Mustermann  vs. Xandi Mustermann   | 1:3 |  5:11 11:5 5:11 5:11
+ - Annika Musterfrau  vs. Günther Mustermann | 3:0 |  11:5 12:10 11:5
+
+Runde: 2
+ - Max Mustermann     vs. Annika Musterfrau  | 1:3 |  5:11 11:5 5:11 5:11
+ - Xandi Mustermann   vs. Günther Mustermann | 3:2 |  5:11 12:10 5:11 11:5 11:5
+ - Stefan Mustermann  vs. Freilos            | 3:0 |  11:0 11:0 11:0
+
+Ranking:
+1. \t Annika Musterfrau  2:0 (B: 3)
+2. \t Xandi Mustermann   2:0 (B: 1)
+3. \t Max Mustermann     1:1 (B: 2)
+4. \t Stefan Mustermann  1:1 (B: 0)
+5. \t Günther Mustermann 0:2 (B: 0)
+"""
+
+
+def write_report(directory, name):
+    with open(os.path.join(directory, f'{name}.txt'), 'w', encoding='utf-8') as file:
+        file.write(REPORT)
+
+
+def test_text_report_round_trip(tmp_path):
+    write_report(tmp_path, '2024-01-26')
+
+    # reading never writes anything, the text report is only part of the analytics once it has been converted
+    assert list(iter_records(str(tmp_path))) == []
+    assert read_previous_pairings(str(tmp_path)) == set()
+    assert sorted(os.listdir(tmp_path)) == ['2024-01-26.txt']
+    assert list_unconverted_files(str(tmp_path)) == [os.path.join(str(tmp_path), '2024-01-26.txt')]
+
+    assert convert_text_archive(str(tmp_path)) == 1
+    assert convert_text_archive(str(tmp_path)) == 0
+    assert list_unconverted_files(str(tmp_path)) == []
+
+    [(file_date, record)] = list(iter_records(str(tmp_path)))
+    assert file_date == date(2024, 1, 26)
+    assert record['date'] == '2024-01-26'
+    assert record['game_mode'] == 3 and record['with_handicaps']
+
+    assert [(p['name'], p['ttr'], p['handicap']) for p in record['players']] == [
+        ('Max Mustermann', 1600, 0), ('Stefan Mustermann', 1500, 1), ('Annika Musterfrau', 1480, 1),
+        ('Xandi Mustermann', 1433, 2), ('Günther Mustermann', 988, 7)]
+
+    assert [[(m['first'], m['second'], m['sets']) for m in matches] for matches in record['rounds']] == [
+        [(0, None, [[11, 0]] * 3), (1, 3, [[5, 11], [11, 5], [5, 11], [5, 11]]), (2, 4, [[11, 5], [12, 10], [11, 5]])],
+        [(0, 2, [[5, 11], [11, 5], [5, 11], [5, 11]]), (3, 4, [[5, 11], [12, 10], [5, 11], [11, 5], [11, 5]]),
+         (1, None, [[11, 0]] * 3)]]
+
+    # start offsets from the handicaps of the participants (the player with the larger handicap gets a head start)
+    assert [m['start_offset'] for m in record['rounds'][0][1:]] == [-1, -6]
+
+    assert [get_winner(record, m) for m in record['rounds'][1]] == [2, 3, 1]
+    assert record['ranking'] == [2, 3, 0, 1, 4]
+
+    assert read_previous_pairings(str(tmp_path)) == {
+        frozenset(pair) for pair in [('Stefan Mustermann', 'Xandi Mustermann'),
+                                     ('Annika Musterfrau', 'Günther Mustermann'),
+                                     ('Max Mustermann', 'Annika Musterfrau'),
+                                     ('Xandi Mustermann', 'Günther Mustermann')]}
+
+
+def test_tournament_record_round_trip(tmp_path):
+    players = [Player(name, ttr, handicap) for name, ttr, handicap in [('Anna', 1500, 0), ('Bernd', 1400, 2),
+                                                                       ('Clara', 1300, 3), ('Dieter', 1200, 5)]]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, True, seed=1)
+    tournament.generate_next_round()
+
+    first_match, second_match = tournament.get_running_matches()
+    first_match.update_set_result(0, 5.0)
+    first_match.update_set_result(1, -9.0)
+    for idx in range(2):
+        second_match.update_set_result(idx, -0.0)
+
+    day = date(2024, 1, 26)
+    record = record_from_tournament(tournament, day, tournament.get_ranking())
+
+    path = get_record_path(str(tmp_path), day)
+    with open(path, 'w') as file:
+        json.dump(record, file)
+
+    assert read_record(path) == record
+    assert [(d, r) for d, r in iter_records(str(tmp_path))] == [(day, record)]
+
+    # first match not yet finished (one set each)
+    [first, second] = record['rounds'][0]
+    assert first['sets'] == [[11, 5], [9, 11]] and get_winner(record, first) is None
+    assert second['sets'] == [[0, 11], [0, 11]] and get_winner(record, second) == second_match.second_player_id
+    assert first['start_offset'] == first_match.start_offset
+
+
+def test_order_of_the_files(tmp_path):
+    for name in ['2024-01-26_10', '2024-01-26_2', '2024-01-26', '2023-12-01', 'notizen']:
+        write_report(tmp_path, name)
+
+    assert [os.path.basename(path) for _, path in list_tournament_files(str(tmp_path))] == [
+        '2023-12-01.txt', '2024-01-26.txt', '2024-01-26_2.txt', '2024-01-26_10.txt']
+
+    convert_text_archive(str(tmp_path))
+
+    # only the days between both (exclusive)
+    assert [d for d, _ in iter_records(str(tmp_path), after=date(2023, 12, 1))] == [date(2024, 1, 26)] * 3
+    assert [d for d, _ in iter_records(str(tmp_path), before=date(2024, 1, 26))] == [date(2023, 12, 1)]
+    assert [d for d, _ in iter_records(str(tmp_path), skip_days={date(2024, 1, 26)})] == [date(2023, 12, 1)]
@@ -0,0 +1,106 @@
+""" Import of the results of many matches at once (see model/bulk_import.py). """
+import pytest
+
+from model.bulk_import import import_results, parse_score
+from model.data_classes import GameMode, Player
+from model.swiss_system import Tournament
+
+
+def create_tournament():
+    players = [Player(name, 1500 - 10 * i, 0) for i, name in enumerate(['Anna', 'Bernd', 'Clara', 'Dieter'])]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, False, seed=1)
+    tournament.generate_next_round()
+
+    return tournament
+
+
+def get_results(tournament):
+    return [list(m.set_results) for m in tournament.get_running_matches()]
+
+
+@pytest.mark.parametrize('value, expected', [('11:5', 5.0), ('5:11', -5.0), ('11:0', 0.0), ('12:10', 10.0),
+                                             ('10:12', -10.0)])
+def test_parse_score(value, expected):
+    result, reason = parse_score(value)
+
+    assert reason is None
+    assert result == expected and str(result) == str(expected)
+
+
+@pytest.mark.parametrize('value', ['11-5', '10:8', '13:10', '11:10'])
+def test_parse_invalid_score(value):
+    result, reason = parse_score(value)
+
+    assert result is None and reason is not None
+
+
+def test_import_by_number_and_names():
+    tournament = create_tournament()
+    first, second = tournament.get_running_matches()
+
+    changed_matches, errors = import_results(tournament, [
+        '# Runde 1',
+        '1; 11:5; 11:7',
+        '',
+        f'{second.second_player_name}; {second.first_player_name}; 11:9 5:11 11:3',
+    ])
+
+    assert errors == []
+    assert changed_matches == [first, second]
+    assert first.set_results[:2] == (5.0, 7.0)
+
+    # sets from the second player's view
+    assert second.set_results == (-9.0, 5.0, -3.0)
+
+
+def test_import_by_table():
+    tournament = create_tournament()
+    first, second = tournament.get_running_matches()
+    tables = {first: 2, second: 1}
+
+    changed_matches, errors = import_results(tournament, ['1, 11:5, 11:7'], tables.get)
+
+    assert errors == []
+    assert changed_matches == [second]
+
+
+def test_import_is_all_or_nothing():
+    tournament = create_tournament()
+    first, second = tournament.get_running_matches()
+    previous_results = get_results(tournament)
+
+    changed_matches, errors = import_results(tournament, [
+        '1; 11:5; 11:7',
+        f'{second.first_player_name}; 11:5 10:8',
+        'Niemand; 11:5 11:5',
+        '3; 11:5 11:5',
+        f'{first.first_player_name}; 5:11 5:11',
+    ])
+
+    assert changed_matches == []
+    assert [line_number for line_number, _ in errors] == [2, 3, 4, 5]
+    assert get_results(tournament) == previous_results
+
+    # the corrected file is applied completely
+    changed_matches, errors = import_results(tournament, [
+        '1; 11:5; 11:7',
+        f'{second.first_player_name}; 11:5 12:10',
+    ])
+
+    assert errors == []
+    assert changed_matches == [first, second]
+    assert all(m.is_finished() for m in tournament.get_running_matches())
+
+
+def test_import_keeps_entered_results():
+    tournament = create_tournament()
+    first, _ = tournament.get_running_matches()
+    first.update_set_result(0, 5.0)
+
+    # the same result again is fine, a different one is reported
+    assert import_results(tournament, ['1; 11:5 11:7'])[1] == []
+
+    changed_matches, errors = import_results(tournament, ['1; 11:6 11:7'])
+
+    assert changed_matches == []
+    assert len(errors) == 1
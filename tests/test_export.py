@@ -0,0 +1,67 @@
+""" Export of the stored tournaments (see model/export.py). """
+import csv
+import json
+import os
+
+from datetime import date
+
+from model.archive import get_record_path, record_from_tournament
+from model.data_classes import GameMode, Player
+from model.export import WALKOVER_RESULT, export_archive, iter_match_rows
+from model.swiss_system import Tournament
+
+
+def write_tournament(directory, day, withdraw: bool = False):
+    players = [Player(name, 1500 - 10 * i, 0) for i, name in enumerate(['Anna', 'Bernd', 'Clara', 'Dieter', 'Emil'])]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, False, seed=1)
+    tournament.generate_next_round()
+
+    matches = [m for m in tournament.get_running_matches() if not m.is_finished()]
+    for match in matches[:-1] if withdraw else matches:
+        match.update_set_result(0, 5.0)
+        match.update_set_result(1, 9.0)
+
+    if withdraw:
+        tournament.withdraw_player(matches[-1].second_player_id)
+
+    with open(get_record_path(str(directory), day), 'w') as file:
+        json.dump(record_from_tournament(tournament, day, tournament.get_ranking()), file)
+
+    return tournament
+
+
+def test_match_rows(tmp_path):
+    write_tournament(tmp_path, date(2024, 1, 19))
+    write_tournament(tmp_path, date(2024, 1, 26), withdraw=True)
+
+    rows = list(iter_match_rows(str(tmp_path)))
+    assert [row['date'] for row in rows] == ['2024-01-19'] * 3 + ['2024-01-26'] * 3
+
+    # two matches and the bye each
+    assert sorted(row['result'] for row in rows[:3]) == ['11:0 11:0', '11:5 11:9', '11:5 11:9']
+    assert sorted(row['result'] for row in rows[3:]) == ['11:0 11:0', '11:5 11:9', WALKOVER_RESULT]
+
+    # only the given days (both inclusive)
+    assert len(list(iter_match_rows(str(tmp_path), first_day=date(2024, 1, 26)))) == 3
+    assert len(list(iter_match_rows(str(tmp_path), last_day=date(2024, 1, 25)))) == 3
+
+
+def test_export_formats(tmp_path):
+    archive = tmp_path / 'tournaments'
+    archive.mkdir()
+    write_tournament(archive, date(2024, 1, 26))
+
+    paths = export_archive(str(archive), str(tmp_path / 'export'))
+    assert sorted(os.path.basename(p) for p in paths) == ['platzierungen.csv', 'saison.csv', 'spiele.csv',
+                                                       'turniere.html', 'turniere.json']
+
+    with open(tmp_path / 'export' / 'turniere.json', encoding='utf-8') as file:
+        data = json.load(file)
+
+    with open(tmp_path / 'export' / 'platzierungen.csv', encoding='utf-8', newline='') as file:
+        placements = list(csv.reader(file, delimiter=';'))
+
+    assert len(data['spiele']) == 3
+    assert [row['rank'] for row in data['platzierungen']] == [1, 2, 3, 4, 5]
+    assert [row[1:3] for row in placements[1:]] == [[str(r['rank']), r['name']] for r in data['platzierungen']]
+    assert data['saison'][0]['points'] == 5
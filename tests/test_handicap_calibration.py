@@ -0,0 +1,89 @@
+""" Calibration of the handicaps from the point differences of the stored sets (see model/handicap_calibration.py). """
+import json
+
+from datetime import date, timedelta
+
+from model.archive import get_record_path, record_from_tournament
+from model.data_classes import GameMode, Player
+from model.handicap_calibration import calibrate_handicaps, read_set_observations
+from model.swiss_system import Tournament
+
+TODAY = date(2024, 1, 26)
+
+
+def write_record(directory, day, players, rounds):
+    record = {
+        'format': 1,
+        'date': day.isoformat(),
+        'game_mode': 2,
+        'with_handicaps': True,
+        'rolling_rounds': 0,
+        'players': [{'id': i, 'name': p.name, 'ttr': p.ttr, 'handicap': p.handicap, 'nickname': None, 'club': None}
+                    for i, p in enumerate(players)],
+        'withdrawn': [],
+        'rounds': rounds,
+        'ranking': list(range(len(players))),
+    }
+
+    with open(get_record_path(str(directory), day), 'w') as file:
+        json.dump(record, file)
+
+
+def get_proposals(directory, players):
+    return {p.name: p for p in calibrate_handicaps(str(directory), players)}
+
+
+def test_stronger_player_gets_smaller_handicap(tmp_path):
+    # Anna gets a head start of 6 points against Bernd but still wins each set 11:3
+    players = [Player('Anna', 1300, 6), Player('Bernd', 1600, 0)]
+
+    for i in range(10):
+        write_record(tmp_path, TODAY - timedelta(days=7 * i), players,
+                     [[{'first': 0, 'second': 1, 'start_offset': 6, 'sets': [[11, 3], [11, 4]]}]])
+
+    proposals = get_proposals(tmp_path, players)
+
+    assert proposals['Anna'].num_sets == 20
+    assert proposals['Anna'].adjustment > 0 > proposals['Bernd'].adjustment
+    assert proposals['Anna'].proposed_handicap < 6
+    assert proposals['Bernd'].proposed_handicap > 0
+
+
+def test_balanced_sets_keep_the_handicaps(tmp_path):
+    players = [Player('Anna', 1300, 6), Player('Bernd', 1600, 0)]
+
+    for i in range(10):
+        write_record(tmp_path, TODAY - timedelta(days=7 * i), players,
+                     [[{'first': 0, 'second': 1, 'start_offset': 6, 'sets': [[11, 9], [9, 11], [11, 9], [9, 11]]}]])
+
+    proposals = get_proposals(tmp_path, players)
+
+    assert abs(proposals['Anna'].adjustment) < 1e-9
+    assert proposals['Anna'].proposed_handicap == 6
+    assert proposals['Bernd'].proposed_handicap == 0
+
+
+def test_walkovers_are_skipped(tmp_path):
+    players = [Player(name, 1500, handicap) for name, handicap in [('Anna', 0), ('Bernd', 2), ('Clara', 4),
+                                                                   ('Dieter', 6)]]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, True, seed=1)
+    tournament.generate_next_round()
+
+    # first set played, afterwards the first player of the first match withdraws
+    first_match, second_match = tournament.get_running_matches()
+    first_match.update_set_result(0, 7.0)
+    for idx in range(2):
+        second_match.update_set_result(idx, -4.0)
+
+    tournament.withdraw_player(first_match.first_player_id)
+    assert first_match.is_finished() and first_match.walkover and not second_match.walkover
+
+    record = record_from_tournament(tournament, TODAY, tournament.get_ranking())
+    assert [m.get('walkover', False) for m in record['rounds'][0]] == [True, False]
+
+    with open(get_record_path(str(tmp_path), TODAY), 'w') as file:
+        json.dump(record, file)
+
+    observations = read_set_observations(str(tmp_path), today=TODAY)
+    assert len(observations) == 2
+    assert observations.point_difference == [-7, -7]
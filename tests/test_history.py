@@ -0,0 +1,105 @@
+""" Undo / redo of result entries and generated rounds (see model/history.py). """
+import json
+
+from model.data_classes import GameMode, Player
+from model.history import TournamentHistory
+from model.swiss_system import Tournament
+from server.http_server import HttpServer
+from server.scoreboard import Scoreboard
+
+
+def create_tournament():
+    players = [Player(f'Spieler {i}', 1600 - 50 * i, 0) for i in range(6)]
+    tournament = Tournament(GameMode.BEST_OF_THREE, players, False, seed=3)
+    tournament.generate_next_round()
+
+    return tournament
+
+
+def enter_result(history, match, first_player_wins: bool):
+    # results from the view of the first player (-0.0 -> lost 0:11)
+    for idx in range(2):
+        match.update_set_result(idx, 5.0 if first_player_wins else -5.0)
+
+    history.record_results([match])
+
+
+def get_standings(tournament):
+    return [(p.name, len(p.wins), len(p.losses), p.buchholz) for p in tournament.get_ranking()]
+
+
+def get_rebuilt_standings(tournament):
+    # everything derived from the matches once again from scratch
+    return get_standings(Tournament.from_dict(json.loads(json.dumps(tournament.to_dict()))))
+
+
+def get_previous_rounds(scoreboard):
+    return json.loads(scoreboard.get_snapshot_json())['rounds']
+
+
+def test_undo_redo_of_results_and_rounds():
+    tournament = create_tournament()
+    history = TournamentHistory(tournament)
+
+    for match in tournament.get_running_matches():
+        enter_result(history, match, True)
+
+    state = tournament.get_state()
+    tournament.generate_next_round()
+    history.record_round(state)
+
+    standings = get_standings(tournament)
+    round_2 = list(tournament.get_running_matches())
+
+    # round and the last result
+    assert history.undo() and history.undo()
+    assert tournament.get_current_round() == 1
+    assert get_standings(tournament) == get_rebuilt_standings(tournament)
+
+    assert history.redo() and history.redo()
+    assert tournament.get_running_matches() == round_2
+    assert get_standings(tournament) == standings
+    assert get_standings(tournament) == get_rebuilt_standings(tournament)
+
+
+def test_scoreboard_after_regenerated_round():
+    tournament = create_tournament()
+    history = TournamentHistory(tournament)
+    scoreboard = Scoreboard(tournament, http_server=HttpServer(port=0))
+
+    for match in tournament.get_running_matches():
+        enter_result(history, match, True)
+
+    state = tournament.get_state()
+    tournament.generate_next_round()
+    history.record_round(state)
+    scoreboard.publish()
+
+    assert [m['sets'] for m in get_previous_rounds(scoreboard)[0]] == [[2, 0]] * 3
+
+    # a result of the previous round is corrected, afterwards the round is generated once again
+    assert history.undo_round()
+    corrected_match = tournament.get_running_matches()[0]
+    enter_result(history, corrected_match, False)
+
+    state = tournament.get_state()
+    tournament.generate_next_round()
+    history.record_round(state)
+    scoreboard.publish()
+
+    assert [m['sets'] for m in get_previous_rounds(scoreboard)[0]] == [[0, 2], [2, 0], [2, 0]]
+
+    snapshot = json.loads(scoreboard.get_snapshot_json())
+    assert [s['name'] for s in snapshot['standings']] == [p.display_name for p in tournament.get_ranking()]
+    assert get_standings(tournament) == get_rebuilt_standings(tournament)
+
+    # undo of the round and the correction, the round is generated once again with the previous results
+    assert history.undo() and history.undo()
+
+    state = tournament.get_state()
+    tournament.generate_next_round()
+    history.record_round(state)
+    scoreboard.publish()
+
+    assert [m['sets'] for m in get_previous_rounds(scoreboard)[0]] == [[2, 0]] * 3
+    assert get_standings(tournament) == get_rebuilt_standings(tournament)
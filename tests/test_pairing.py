@@ -0,0 +1,150 @@
+""" Pairing criteria and the anytime optimizer for large fields (see model/pairing_criteria.py and
+model/pairing_optimizer.py).
+"""
+import random
+
+import pytest
+
+from model import pairing_criteria
+from model.data_classes import GameMode, Player
+from model.pairing_criteria import (CRITERIA, ByeHistory, ClubAvoidance, HandicapDifference, PairingCostModel,
+                                    TtrDifference, WinDifference, criteria_from_spec)
+from model.pairing_optimizer import FORBIDDEN_COST, PairingOptimizer
+from model.swiss_system import Tournament
+
+
+def all_criteria():
+    return [WinDifference(10000), ClubAvoidance(5000), HandicapDifference(1000), TtrDifference(1, max_diff=300),
+            ByeHistory(20000)]
+
+
+def play_rounds(num_players, num_rounds, seed=0):
+    """ Players of a tournament after the given number of rounds (including the bye of an odd field). """
+    rng = random.Random(seed)
+    clubs = [None, 'TTC', 'SV']
+    players = [Player(f'Spieler {i}', rng.randint(900, 1900), rng.randint(0, 6), club=clubs[i % 3])
+               for i in range(num_players)]
+
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, True, seed=seed, criteria=all_criteria())
+    for _ in range(num_rounds):
+        tournament.generate_next_round()
+
+        for match in tournament.get_running_matches():
+            if not match.is_finished():
+                sign = rng.choice([1.0, -1.0])
+                match.update_set_result(0, sign * 5)
+                match.update_set_result(1, sign * 7)
+
+        tournament.get_ranking()
+
+    return tournament.get_players()
+
+
+def test_matrix_matches_single_costs():
+    players = play_rounds(11, 3)
+
+    for criterion in all_criteria():
+        matrix = criterion.matrix(pairing_criteria.PlayerFeatures(players))
+
+        for i, player in enumerate(players):
+            for j, opponent in enumerate(players):
+                assert matrix[i][j] == criterion.cost(player, opponent), criterion.name
+
+
+def test_edges_with_and_without_numpy():
+    players = play_rounds(11, 3)
+    cost_model = PairingCostModel(all_criteria())
+
+    edges = cost_model.edges(players)
+    assert edges == cost_model.edges(players, use_numpy=False)
+    assert cost_model.edges(players, ignore_weights=True) == \
+        cost_model.edges(players, ignore_weights=True, use_numpy=False)
+
+    # no pair plays twice
+    by_id = {p.id: p for p in players}
+    assert all(not by_id[a].has_played_against(b) for a, b, _ in edges)
+    assert len(edges) == len(players) * (len(players) - 1) // 2 - 3 * len(players) // 2
+
+
+def test_spec_round_trip():
+    criteria = all_criteria()
+    spec = PairingCostModel(criteria).to_spec()
+
+    assert PairingCostModel(criteria_from_spec(spec)).to_spec() == spec
+    assert set(c['name'] for c in spec) == set(CRITERIA)
+
+
+def get_minimum_cost(costs, indices):
+    """ Cost of the optimal pairing by enumerating all pairings. """
+    if len(indices) == 0:
+        return 0
+
+    first, rest = indices[0], indices[1:]
+    return min(costs[first][other] + get_minimum_cost(costs, rest[:k] + rest[k + 1:])
+               for k, other in enumerate(rest))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_optimizer_finds_the_optimum_of_small_fields(seed):
+    players = play_rounds(10, 2, seed)
+    optimizer = PairingOptimizer(PairingCostModel(all_criteria()), time_budget=5, rng=random.Random(seed))
+
+    costs = optimizer.get_costs(players)
+    pairings = optimizer.optimize(players)
+    positions = {p.id: i for i, p in enumerate(players)}
+
+    assert len(pairings) == 5
+    assert len(set(pairings) | set(pairings.values())) == 10
+    assert sum(costs[positions[a]][positions[b]] for a, b in pairings.items()) == \
+        get_minimum_cost(costs, list(range(len(players))))
+
+
+def test_optimizer_costs_without_numpy(monkeypatch):
+    players = play_rounds(11, 3)
+    optimizer = PairingOptimizer(PairingCostModel(all_criteria()))
+    costs = optimizer.get_costs(players)
+
+    monkeypatch.setattr('model.pairing_optimizer.np', None)
+
+    # the diagonal is irrelevant
+    python_costs = optimizer.get_costs(players)
+    for i in range(len(players)):
+        python_costs[i][i] = costs[i][i] = FORBIDDEN_COST
+
+    assert python_costs == costs
+
+
+def test_optimizer_leaves_out_forbidden_pairs():
+    # a field of four after three rounds: everybody has played everybody else
+    players = play_rounds(4, 3)
+    pairings = PairingOptimizer(PairingCostModel(all_criteria()), time_budget=1).optimize(players)
+
+    assert pairings == {}
+
+
+def test_optimizer_with_an_odd_field():
+    players = [p for p in play_rounds(13, 2) if not p.is_bye()]
+    pairings = PairingOptimizer(PairingCostModel(all_criteria()), time_budget=1).optimize(players)
+
+    # one player has to wait
+    assert len(pairings) == 6
+    assert len(set(pairings) | set(pairings.values())) == 12
+
+
+def test_optimizer_respects_excluded_pairs_and_required_players():
+    players = [p for p in play_rounds(16, 1) if not p.is_bye()]
+    optimizer = PairingOptimizer(PairingCostModel(all_criteria()), time_budget=1, rng=random.Random(1))
+
+    pairings = optimizer.optimize(players)
+    excluded_pairs = list(pairings.items())[:3]
+
+    pairings = optimizer.optimize(players, excluded_pairs=excluded_pairs)
+    assert len(pairings) == 8
+    assert all(frozenset(pair) not in {frozenset(p) for p in excluded_pairs} for pair in pairings.items())
+
+    # rolling mode: only pairs with at least one of the required players (i.e. the others stay free)
+    required_ids = {p.id for p in players[:3]}
+    pairings = optimizer.optimize(players, required_ids=required_ids)
+
+    assert all(a in required_ids or b in required_ids for a, b in pairings.items())
+    assert required_ids <= set(pairings) | set(pairings.values())
@@ -0,0 +1,88 @@
+""" Ratings learned from the archive and the matches of the running tournaments (see model/rating.py). """
+import pytest
+
+from model.data_classes import GameMode, Player
+from model.rating import STORE_VERSION, MatchStore, RatingEngine
+from model.swiss_system import Tournament
+
+
+def create_store():
+    # two rounds of a stored tournament: Anna beats Bernd and Clara, Bernd beats Clara
+    return MatchStore.from_dict({
+        'version': STORE_VERSION,
+        'names': ['Anna', 'Bernd', 'Clara'],
+        'first': [0, 1, 0],
+        'second': [1, 2, 2],
+        'first_won': [1, 1, 1],
+        'batch': [1, 1, 2],
+        'sources': {'2024-01-26': 3},
+    })
+
+
+def play_first_round(names):
+    players = [Player(name, 1500, 0) for name in names]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, False, seed=1)
+    tournament.generate_next_round()
+
+    for match in tournament.get_running_matches():
+        for idx in range(2):
+            match.update_set_result(idx, 5.0)
+
+    return tournament
+
+
+def test_archive_ratings():
+    engine = RatingEngine(create_store(), initial_ratings={'Anna': 1500, 'Bernd': 1500, 'Clara': 1500})
+
+    assert engine.get_rating('Anna') > engine.get_rating('Bernd') > engine.get_rating('Clara')
+    assert engine.get_rating('Anna') + engine.get_rating('Bernd') + engine.get_rating('Clara') == pytest.approx(4500)
+
+    # unknown players keep their initial rating
+    assert engine.get_rating('Dieter') == 1000
+    assert engine.get_change('Anna') == 0
+
+
+def test_live_matches_are_reverted():
+    engine = RatingEngine(create_store())
+    tournament = play_first_round(['Anna', 'Bernd', 'Dieter', 'Emil'])
+    ratings = {name: engine.get_rating(name) for name in ['Anna', 'Bernd', 'Dieter', 'Emil']}
+
+    matches = tournament.get_running_matches()
+    engine.sync(matches)
+    assert sum(engine.get_change(name) for name in ratings) == pytest.approx(0)
+    assert any(engine.get_change(name) != 0 for name in ratings)
+
+    # e.g. undone
+    engine.sync([])
+    for name, rating in ratings.items():
+        assert engine.get_rating(name) == pytest.approx(rating)
+        assert engine.get_change(name) == pytest.approx(0)
+
+
+def test_shared_store():
+    # several tournaments of the same evening share the store (see gui/tournament_registry.py)
+    store = create_store()
+    num_names = len(store.names)
+
+    first_engine = RatingEngine(store, initial_ratings={'Dieter': 1400})
+    second_engine = RatingEngine(store, initial_ratings={'Franz': 1300, 'Gerd': 1200})
+
+    # players without any stored match are only known to the engine rating their matches
+    second_engine.sync(play_first_round(['Franz', 'Gerd', 'Hans', 'Ida']).get_running_matches())
+    first_engine.sync(play_first_round(['Anna', 'Dieter', 'Emil', 'Clara']).get_running_matches())
+
+    assert len(store.names) == num_names
+
+    assert first_engine.get_rating('Franz') == 1000
+    assert first_engine.get_change('Franz') == 0
+    assert second_engine.get_rating('Dieter') == 1000
+    assert second_engine.get_change('Emil') == 0
+
+    assert first_engine.get_change('Dieter') != 0
+    assert second_engine.get_change('Franz') != 0
+    assert first_engine.get_rating('Bernd') == second_engine.get_rating('Bernd')
+
+    # the ratings of the archive are computed once again, the matches of the running tournament are kept
+    change = first_engine.get_change('Dieter')
+    first_engine.recompute()
+    assert first_engine.get_change('Dieter') == pytest.approx(change)
@@ -0,0 +1,104 @@
+""" Rolling mode: players are paired as soon as they are free, every player has to reach the number of rounds. """
+import random
+
+import pytest
+
+from model.data_classes import GameMode, Player
+from model.swiss_system import MAX_PLAYERS_EXACT_PAIRING, Tournament
+
+
+def finish_match(match, rng):
+    idx = 0
+    while not match.is_finished():
+        # results from the view of the first player (-0.0 -> lost 0:11)
+        points = float(rng.randint(0, 9))
+        match.update_set_result(idx, points if rng.random() < 0.5 else -points)
+        idx += 1
+
+
+def play_rolling_tournament(num_players, rolling_rounds, seed, pairing_time_budget=0.2):
+    rng = random.Random(seed)
+    players = [Player(f'Spieler {i}', rng.randint(1000, 2000), 0) for i in range(num_players)]
+
+    tournament = Tournament(GameMode.BEST_OF_THREE, players, False, seed=seed, rolling_rounds=rolling_rounds,
+                            pairing_time_budget=pairing_time_budget)
+    tournament.generate_next_round()
+
+    num_stalled = 0
+    while True:
+        # the matches finish one after another in random order
+        running_matches = [m for m in tournament.get_running_matches() if not m.is_finished()]
+        if len(running_matches) > 0:
+            finish_match(rng.choice(running_matches), rng)
+
+        new_matches = tournament.pair_free_players()
+        num_stalled += len(tournament.get_stalled_players())
+
+        if len(new_matches) == 0 and all(m.is_finished() for m in tournament.get_running_matches()):
+            return tournament, num_stalled
+
+
+@pytest.mark.parametrize('num_players', [6, 7, 8, 9, 10, 12, 16, 19, 20])
+@pytest.mark.parametrize('rolling_rounds', [3, 4, 5])
+def test_every_player_reaches_the_number_of_rounds(num_players, rolling_rounds):
+    for seed in range(10):
+        tournament, _ = play_rolling_tournament(num_players, rolling_rounds, seed)
+
+        for player in tournament.get_active_players():
+            assert tournament.get_player_round(player.id) == rolling_rounds, (seed, player.name)
+
+
+def test_even_fields_are_finished_without_emergency_byes():
+    # the look-ahead has to keep the last players pairable (formerly the last two players of even fields were often
+    # left a round short as they had already played against each other)
+    num_stalled = sum(play_rolling_tournament(num_players, rolling_rounds, seed)[1]
+                      for num_players in [6, 8, 10, 12, 16, 20] for rolling_rounds in [3, 4, 5] for seed in range(10))
+
+    assert num_stalled == 0
+
+
+def test_stalled_players_receive_a_bye():
+    # odd field close to the maximum number of rounds: at the end the last player has already played against all
+    # remaining opponents (and received the bye), hence, another bye is the only way to finish the tournament
+    total_stalled = 0
+
+    for seed in range(20):
+        tournament, num_stalled = play_rolling_tournament(7, 6, seed)
+        total_stalled += num_stalled
+
+        for player in tournament.get_active_players():
+            assert tournament.get_player_round(player.id) == 6
+
+    assert total_stalled > 0
+
+
+def get_pairs(tournament):
+    return [frozenset((m.first_player_id, m.second_player_id)) for matches in tournament.get_all_matches()
+            for m in matches]
+
+
+def test_large_fields_reach_the_number_of_rounds():
+    # the anytime optimizer pairs the free players as long as there are more than `MAX_PLAYERS_EXACT_PAIRING`
+    for seed in range(2):
+        tournament, num_stalled = play_rolling_tournament(MAX_PLAYERS_EXACT_PAIRING + 6, 4, seed,
+                                                          pairing_time_budget=0.02)
+
+        assert num_stalled == 0
+        assert all(tournament.get_player_round(p.id) == 4 for p in tournament.get_active_players())
+        assert len(get_pairs(tournament)) == len(set(get_pairs(tournament)))
+
+
+def test_optimizer_keeps_the_endgame_pairable(monkeypatch):
+    # the endgame constraints (excluded pairs, required players) are passed to the optimizer as well
+    monkeypatch.setattr('model.swiss_system.MAX_PLAYERS_EXACT_PAIRING', 0)
+
+    num_stalled = 0
+    for num_players in [6, 8, 10, 12]:
+        for seed in range(10):
+            tournament, stalled = play_rolling_tournament(num_players, 5, seed, pairing_time_budget=0.02)
+            num_stalled += stalled
+
+            assert all(tournament.get_player_round(p.id) == 5 for p in tournament.get_active_players())
+            assert len(get_pairs(tournament)) == len(set(get_pairs(tournament)))
+
+    assert num_stalled == 0
@@ -0,0 +1,61 @@
+""" Seeding of the first round by the best of many candidate draws (see model/seeding.py). """
+import random
+
+from model.data_classes import Player, initialize_field_of_participants
+from model.seeding import PortfolioSeeding, RepeatAvoidance, default_metrics
+
+
+def create_players(num_players):
+    return initialize_field_of_participants(
+        [Player(f'Spieler {i}', 1000 + 37 * i, i % 3) for i in range(num_players)], add_bye=num_players % 2 == 1)
+
+
+def get_names(pairs):
+    return [(p1.name, p2.name) for p1, p2 in pairs]
+
+
+def test_draw_is_reproducible():
+    players = create_players(11)
+    seeding = PortfolioSeeding(default_metrics(True), num_candidates=200, time_budget=10)
+
+    assert get_names(seeding.draw(players, random.Random(3))) == get_names(seeding.draw(players, random.Random(3)))
+
+
+def test_draw_seats_the_upper_half():
+    players = create_players(10)
+    pairs = PortfolioSeeding(default_metrics(True), num_candidates=50).draw(players, random.Random(1))
+
+    assert len(pairs) == 5
+    assert sorted(p1.name for p1, _ in pairs) == sorted(p.name for p in players if p.ttr >= 1000 + 37 * 5)
+    assert {p.name for pair in pairs for p in pair} == {p.name for p in players}
+
+
+def test_draw_avoids_the_previous_pairings():
+    players = create_players(8)
+
+    # the pairings of an unrestricted draw are all forbidden afterwards
+    first_pairs = PortfolioSeeding(default_metrics(False), num_candidates=1).draw(players, random.Random(5))
+    previous_pairings = {frozenset(names) for names in get_names(first_pairs)}
+
+    pairs = PortfolioSeeding(default_metrics(False, previous_pairings), num_candidates=500, time_budget=10) \
+        .draw(players, random.Random(5))
+
+    assert all(frozenset(names) not in previous_pairings for names in get_names(pairs))
+
+
+def test_draw_respects_the_time_budget():
+    players = create_players(9)
+
+    class SlowMetric(RepeatAvoidance):
+        calls = 0
+
+        def score(self, pairs):
+            SlowMetric.calls += 1
+            return super().score(pairs)
+
+    metric = SlowMetric(weight=1, previous_pairings=set())
+    pairs = PortfolioSeeding([metric], num_candidates=10 ** 6, time_budget=0).draw(players, random.Random(2))
+
+    # at least one candidate is evaluated, but not all of them
+    assert len(pairs) == 5
+    assert 1 <= SlowMetric.calls < 10 ** 6
@@ -0,0 +1,125 @@
+""" Pairing of the rounds with changes of the field (see model/swiss_system.py). """
+import random
+
+from model.data_classes import GameMode, Player
+from model.swiss_system import Tournament
+
+
+def create_tournament(num_players, seed=3):
+    players = [Player(f'Spieler {i}', 1000 + 10 * i, 0) for i in range(num_players)]
+    tournament = Tournament(GameMode.BEST_OF_TWO, players, False, seed=seed)
+    tournament.generate_next_round()
+
+    return tournament
+
+
+def finish_round(tournament, rng):
+    for match in tournament.get_running_matches():
+        if not match.is_finished():
+            sign = rng.choice([1.0, -1.0])
+            match.update_set_result(0, sign * 5)
+            match.update_set_result(1, sign * 7)
+
+
+def test_failed_generation_keeps_the_rounds():
+    # after a withdrawal, the remaining players run out of opponents before the maximum number of rounds
+    rng = random.Random(3)
+    tournament = create_tournament(6)
+
+    for round_number in range(1, 4):
+        finish_round(tournament, rng)
+        if round_number == 2:
+            tournament.withdraw_player(0)
+        tournament.generate_next_round()
+
+    finish_round(tournament, rng)
+    assert tournament.get_current_round() == 4 < tournament.get_max_number_of_rounds()
+
+    state = tournament.get_state()
+    ranking = [(p.name, len(p.wins), p.buchholz) for p in tournament.get_ranking()]
+
+    # launching the generation once again must not change anything either
+    for _ in range(2):
+        tournament.generate_next_round()
+
+        assert tournament.get_state() == state
+        assert len(tournament.get_all_matches()) == 4
+        assert [(p.name, len(p.wins), p.buchholz) for p in tournament.get_ranking()] == ranking
+
+
+def get_paired_ids(tournament):
+    return {player_id for m in tournament.get_running_matches() for player_id in (m.first_player_id,
+                                                                                  m.second_player_id)}
+
+
+def test_late_entry_is_paired_from_the_next_round():
+    rng = random.Random(1)
+    tournament = create_tournament(5)
+    finish_round(tournament, rng)
+
+    bye_id = next(p.id for p in tournament.get_players() if p.is_bye())
+    new_player = tournament.add_player(Player('Erika Musterfrau', 1350, 0))
+
+    assert new_player.id not in get_paired_ids(tournament)
+    assert tournament.get_max_number_of_rounds() == 5
+
+    # an even field now, hence, the bye is not needed any longer
+    assert tournament.generate_next_round()
+    assert new_player.id in get_paired_ids(tournament)
+    assert bye_id not in get_paired_ids(tournament)
+    assert len(tournament.get_running_matches()) == 3
+
+    # the missed round counts as not played
+    finish_round(tournament, rng)
+    tournament.get_ranking()
+    assert len(new_player.wins) + len(new_player.losses) == 1
+
+
+def test_withdrawal_is_a_walkover():
+    tournament = create_tournament(4)
+    match = tournament.get_running_matches()[0]
+    match.update_set_result(0, 5.0)
+
+    changed_matches = tournament.withdraw_player(match.first_player_id)
+
+    # the first set stays as played, the remaining set is won 11:0 by the opponent
+    assert changed_matches == [match]
+    assert match.walkover
+    assert match.set_results == (5.0, -0.0, -0.0)
+    assert match.is_finished() and match.sets_lost() == 2
+
+    ranking = tournament.get_ranking()
+    assert tournament.get_players()[match.second_player_id] in ranking[:2]
+    assert tournament.get_players()[match.first_player_id] in ranking
+
+    # further matches of the player are not touched
+    assert tournament.withdraw_player(match.first_player_id) == []
+
+
+def test_rounds_after_withdrawal():
+    rng = random.Random(3)
+    tournament = create_tournament(6)
+    finish_round(tournament, rng)
+
+    withdrawn = tournament.get_running_matches()[0].first_player_id
+    tournament.withdraw_player(withdrawn)
+
+    assert tournament.get_max_number_of_rounds() == 5
+
+    num_rounds = 1
+    while tournament.get_current_round() < tournament.get_max_number_of_rounds():
+        if not tournament.generate_next_round():
+            break
+
+        num_rounds += 1
+        assert withdrawn not in get_paired_ids(tournament)
+
+        # one bye per round for the odd field
+        assert len(tournament.get_running_matches()) == 3
+        finish_round(tournament, rng)
+
+    # nobody plays twice against the same opponent, even if the maximum cannot be reached
+    pairs = [frozenset((m.first_player_id, m.second_player_id)) for matches in tournament.get_all_matches()
+             for m in matches]
+    assert len(pairs) == len(set(pairs))
+    assert num_rounds == tournament.get_current_round() <= 5
@@ -0,0 +1,99 @@
+""" Assignment of the running matches to a limited number of tables (see model/table_scheduler.py). """
+from model.data_classes import GameMode, Match, Player, initialize_field_of_participants
+from model.table_scheduler import TableScheduler
+
+
+class FakeTournament:
+    def __init__(self, matches):
+        self.matches = matches
+
+    def get_running_matches(self):
+        return self.matches
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_matches(num_matches, round_number=1, first_id=0):
+    players = initialize_field_of_participants([Player(f'Spieler {i}', 1000, 0)
+                                                for i in range(first_id + 2 * num_matches)])
+    return [Match(GameMode.BEST_OF_TWO, players[i], players[i + 1], round_number=round_number)
+            for i in range(first_id, first_id + 2 * num_matches, 2)]
+
+
+def finish(match):
+    match.update_set_result(0, 5.0)
+    match.update_set_result(1, 5.0)
+
+
+def test_assignment_and_release():
+    matches = create_matches(5)
+    clock = FakeClock()
+    scheduler = TableScheduler(FakeTournament(matches), 2, clock=clock)
+
+    assert scheduler.update() == [(1, matches[0]), (2, matches[1])]
+    assert scheduler.get_waiting_matches() == matches[2:]
+    assert [scheduler.get_table(m) for m in matches] == [1, 2, None, None, None]
+
+    # the table of a finished match is handed to the longest waiting match
+    clock.now = 600
+    finish(matches[1])
+    assert scheduler.update() == [(2, matches[2])]
+    assert scheduler.get_table(matches[1]) is None
+    assert scheduler.get_expected_match_duration() == 600
+
+    # nothing changes without a finished match
+    assert scheduler.update() == []
+
+
+def test_waiting_matches_of_older_rounds_first():
+    matches = create_matches(3, round_number=2)
+    tournament = FakeTournament(matches)
+    scheduler = TableScheduler(tournament, 1, clock=FakeClock())
+    scheduler.update()
+
+    # rolling mode: a match of an older round is enqueued later but served first
+    old_match = create_matches(1, round_number=1, first_id=6)[0]
+    tournament.matches = matches + [old_match]
+    scheduler.update()
+
+    assert scheduler.get_waiting_matches() == [old_match, matches[1], matches[2]]
+
+    finish(matches[0])
+    assert scheduler.update() == [(1, old_match)]
+
+
+def test_finished_and_undone_matches():
+    matches = create_matches(4)
+    tournament = FakeTournament(matches)
+    scheduler = TableScheduler(tournament, 2, clock=FakeClock())
+    scheduler.update()
+
+    # entered by hand before a table was free, hence, it does not need a table any longer
+    finish(matches[3])
+
+    # a match that is no longer running (e.g. the round has been undone) releases its table
+    tournament.matches = matches[1:]
+    assert scheduler.update() == [(1, matches[2])]
+    assert scheduler.get_waiting_matches() == []
+
+    # the result of a match has been undone, it waits for a table again
+    matches[3].update_set_result(1, None)
+    assert scheduler.update() == []
+    assert scheduler.get_waiting_matches() == [matches[3]]
+
+
+def test_expected_round_completion():
+    matches = create_matches(3)
+    clock = FakeClock()
+    scheduler = TableScheduler(FakeTournament(matches), 2, default_match_duration=100, clock=clock)
+    scheduler.update()
+
+    # two matches on the tables, the third one starts once the first table is free
+    clock.now = 40
+    assert scheduler.get_expected_round_completion() == 40 + 60 + 100
@@ -0,0 +1,124 @@
+""" Tie-breaks of the ranking maintained incrementally (see model/tie_breaks.py). """
+import random
+
+import pytest
+
+from model.data_classes import GameMode, Match, Player, initialize_field_of_participants
+from model.tie_breaks import TIE_BREAKS, TieBreakEngine
+
+
+def create_players():
+    # Anna has the lowest ttr, Dieter the highest
+    return initialize_field_of_participants([Player(name, 1300 + 100 * i, 0)
+                                             for i, name in enumerate(['Anna', 'Bernd', 'Clara', 'Dieter'])])
+
+
+def play(players, first, second, round_number):
+    """ Match won 2:0 by the first player. """
+    match = Match(GameMode.BEST_OF_TWO, players[first], players[second], round_number=round_number)
+    match.update_set_result(0, 5.0)
+    match.update_set_result(1, 7.0)
+
+    return match
+
+
+def get_names(ranking):
+    return [p.name for p in ranking]
+
+
+@pytest.fixture
+def two_rounds():
+    # Anna beats Bernd and Clara, Clara beats Dieter in round 1, Bernd beats Dieter in round 2
+    players = create_players()
+    matches = [play(players, 0, 1, 1), play(players, 2, 3, 1), play(players, 0, 2, 2), play(players, 1, 3, 2)]
+
+    return players, matches
+
+
+def test_sums(two_rounds):
+    players, matches = two_rounds
+    engine = TieBreakEngine(['buchholz'])
+    engine.update(matches, players)
+
+    assert [engine.get_statistics(p.id).wins for p in players] == [2, 1, 1, 0]
+    assert [engine.get_value(p.id, 'buchholz') for p in players] == [2, 2, 2, 2]
+    assert [engine.get_value(p.id, 'sonneborn_berger') for p in players] == [2, 0, 0, 0]
+    assert [engine.get_value(p.id, 'progressive') for p in players] == [3, 1, 2, 0]
+
+    statistics = engine.get_statistics(0)
+    assert (statistics.sets_won, statistics.sets_lost) == (4, 0)
+    assert (statistics.points_won, statistics.points_lost) == (44, 24)
+
+
+def test_ranking_by_tie_breaks(two_rounds):
+    players, matches = two_rounds
+
+    # Bernd and Clara are tied, the lower ttr is ranked first by default
+    engine = TieBreakEngine()
+    engine.update(matches, players)
+    assert get_names(engine.get_ranking(players)) == ['Anna', 'Bernd', 'Clara', 'Dieter']
+
+    # the earlier win counts more
+    engine = TieBreakEngine(['progressive'])
+    engine.update(matches, players)
+    assert get_names(engine.get_ranking(players)) == ['Anna', 'Clara', 'Bernd', 'Dieter']
+
+    engine = TieBreakEngine(['direct_encounter'])
+    engine.update(matches + [play(players, 1, 2, 3), play(players, 3, 0, 3)], players)
+    assert get_names(engine.get_ranking(players)) == ['Anna', 'Bernd', 'Clara', 'Dieter']
+
+
+def test_unknown_tie_break():
+    with pytest.raises(ValueError):
+        TieBreakEngine(['buchholz', 'coin_toss'])
+
+
+def test_corrections_match_a_recomputation():
+    rng = random.Random(4)
+    players = initialize_field_of_participants([Player(f'Spieler {i}', 1000 + i, 0) for i in range(9)])
+
+    matches = []
+    for round_number in range(1, 5):
+        order = list(range(len(players)))
+        rng.shuffle(order)
+        matches += [Match(GameMode.BEST_OF_THREE, players[a], players[b], round_number=round_number)
+                    for a, b in zip(order[::2], order[1::2])]
+
+    engine = TieBreakEngine(list(TIE_BREAKS))
+
+    # results are entered, corrected and deleted in random order, the engine is updated after each change
+    for _ in range(400):
+        match = rng.choice(matches)
+        index = rng.randrange(len(match.set_results))
+        match.update_set_result(index, rng.choice([None, 0.0, -0.0, 5.0, -7.0, 12.0]))
+        engine.update([match], players)
+
+    recomputed = TieBreakEngine(list(TIE_BREAKS))
+    recomputed.update(matches, players)
+
+    field = [p for p in players if not p.is_bye()]
+    assert get_names(engine.get_ranking(field)) == get_names(recomputed.get_ranking(field))
+
+    for p in field:
+        assert engine.get_statistics(p.id) == recomputed.get_statistics(p.id)
+        for name in TIE_BREAKS:
+            assert engine.get_value(p.id, name) == recomputed.get_value(p.id, name)
+
+
+def test_undone_results_are_not_counted(two_rounds):
+    players, matches = two_rounds
+    engine = TieBreakEngine(['progressive'])
+    engine.update(matches[:2], players)
+
+    expected = [(p.name, engine.get_value(p.id, 'progressive')) for p in engine.get_ranking(players)]
+
+    # a result of the next round is entered and undone again (the set results are restored, see model/history.py)
+    results = matches[2].set_results
+    engine.update(matches[2:3], players)
+    assert engine.rounds == 2
+
+    matches[2].restore_results(results[:1] + (None,) * 2)
+    engine.update(matches[2:3], players)
+
+    assert engine.rounds == 1
+    assert [(p.name, engine.get_value(p.id, 'progressive')) for p in engine.get_ranking(players)] == expected